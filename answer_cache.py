@@ -0,0 +1,147 @@
+# answer_cache.py
+"""In-memory cache of final chatbot answers to tool turns.
+
+Many shopper turns end in the same tool calls ("gaming laptop under 80000") and the same tool
+results. The answer the model wrote after those results is cached under the normalized tool
+names and arguments plus a hash of the results, so an identical turn skips the second
+completion. Entries expire after config.ANSWER_CACHE_TTL_SECONDS, the least recently used are
+evicted beyond config.ANSWER_CACHE_SIZE, and the cache is cleared whenever a new catalog is
+published (laptop_data_manager.catalog_version).
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+import config
+import metrics
+import laptop_data_manager
+
+# Turns that are never answered from the cache
+UNCACHED_TOOLS = {"end_conversation"}
+
+
+def _normalize(value):
+    """Canonical form of a tool argument: case/whitespace-insensitive strings, whole floats as ints, sorted lists, no None fields."""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        return sorted((_normalize(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True))
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    return value
+
+def normalize_call(name, arguments):
+    """(tool name, canonical JSON of the arguments), or None if the arguments are not valid JSON."""
+    try:
+        parsed = json.loads(arguments) if arguments else {}
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    if "offset" in parsed and not parsed["offset"]:
+        parsed.pop("offset") # offset=0 is the default
+    return (name or "").strip().lower(), json.dumps(_normalize(parsed), sort_keys=True, ensure_ascii=False)
+
+def turn_key(calls, tool_messages):
+    """Cache key for a tool turn from its (name, arguments) calls and the tool messages sent to the model.
+
+    None when the turn should not be cached: a call the cache cannot normalize, an uncached tool
+    or a tool result that reports an error.
+    """
+    normalized = []
+    for name, arguments in calls:
+        call = normalize_call(name, arguments)
+        if call is None or call[0] in UNCACHED_TOOLS:
+            return None
+        normalized.append(call)
+    digest = hashlib.sha256()
+    for message in tool_messages:
+        content = message.get("content") or ""
+        if '"error"' in content:
+            return None
+        digest.update(content.encode("utf-8"))
+        digest.update(b"\0")
+    return tuple(normalized), digest.hexdigest()
+
+
+class AnswerCache:
+    """Thread-safe LRU of final answers with a TTL, emptied when the catalog version changes."""
+
+    def __init__(self, max_entries=config.ANSWER_CACHE_SIZE, ttl=config.ANSWER_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (answer, stored at)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _check_version(self, catalog_version):
+        """False for a catalog older than the cached one; a newer catalog empties the cache."""
+        if self._version is not None and catalog_version < self._version:
+            return False
+        if catalog_version != self._version:
+            self._entries.clear()
+            self._version = catalog_version
+        return True
+
+    def get(self, key, catalog_version):
+        """The cached answer for `key`, or None (counted as a miss)."""
+        with self._lock:
+            entry = self._entries.get(key) if self._check_version(catalog_version) else None
+            if entry is not None and self.ttl and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.inc("answer_cache_lookups_total", result="miss" if entry is None else "hit")
+        return None if entry is None else entry[0]
+
+    def put(self, key, catalog_version, answer):
+        if not answer:
+            return
+        with self._lock:
+            if not self._check_version(catalog_version):
+                return # Answer to a catalog that has been replaced since
+            self._entries[key] = (answer, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache():
+    """Returns the shared answer cache, or None when it is disabled in config."""
+    global _answer_cache
+    if not config.ANSWER_CACHE_ENABLED:
+        return None
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = AnswerCache()
+        return _answer_cache
+
+
+def lookup(calls, tool_messages):
+    """(key, cached answer) for a tool turn; the key is None if the turn cannot be cached, the answer None on a miss."""
+    cache = get_answer_cache()
+    key = turn_key(calls, tool_messages) if cache is not None else None
+    if key is None:
+        return None, None
+    key = (laptop_data_manager.catalog_version, key) # The catalog the tool results came from
+    return key, cache.get(key[1], key[0])
+
+def store(key, answer):
+    """Caches the answer generated for a turn that lookup() missed."""
+    cache = get_answer_cache()
+    if key is not None and cache is not None:
+        cache.put(key[1], key[0], answer)
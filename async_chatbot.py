@@ -0,0 +1,174 @@
+# async_chatbot.py
+"""Asyncio conversation engine with streaming output.
+
+Tokens are handed to an `on_token` callback as they arrive, and tool-call deltas are assembled
+incrementally from the stream. One engine can drive any number of conversations concurrently in
+a single process. Set config.LLM_BACKEND = "fake" (or point config.OPENAI_BASE_URL at
+openai_stub_server.py) to run it offline.
+"""
+import asyncio
+import logging
+import time
+import config
+import llm_utils
+import llm_backends
+import laptop_data_manager
+import catalog_reloader
+import chatbot_functions
+import main_chatbot
+import metrics
+import tool_dispatch
+import history_manager
+import answer_cache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncChatEngine:
+    """Shared, stateless part of the chatbot: client, tools and model settings."""
+
+    def __init__(self, client=None, model=config.CHATBOT_MODEL_ID):
+        self.client = client or llm_utils.get_async_client()
+        self.model = model
+        self.tools_def = chatbot_functions.get_tools_definition()
+
+    async def stream_completion(self, messages, on_token=None, tools=None, tool_choice="auto"):
+        """Streams one completion and returns the assembled assistant message as a dict."""
+        params = {"model": self.model, "messages": messages, "temperature": 0.7, "stream": True}
+        if tools:
+            params["tools"] = tools
+            params["tool_choice"] = tool_choice
+
+        assembler = llm_backends.MessageAssembler()
+        start = time.perf_counter()
+        first_token = True
+        try:
+            with metrics.span("llm_request", kind="chatbot_stream"):
+                stream = await self.client.chat.completions.create(**params)
+                async for chunk in stream:
+                    token = assembler.add(chunk)
+                    if token and first_token:
+                        metrics.observe("llm_first_token_seconds", time.perf_counter() - start)
+                        first_token = False
+                    if token and on_token is not None:
+                        on_token(token)
+        except Exception:
+            metrics.inc("llm_requests_total", kind="chatbot_stream", status="error")
+            raise
+        metrics.inc("llm_requests_total", kind="chatbot_stream", status="ok")
+        return assembler.message()
+
+    async def run_tool_calls(self, tool_calls):
+        """Executes the tool calls of one assistant message concurrently; returns (tool messages, goodbye message)."""
+        results = await tool_dispatch.dispatch_tool_calls_async(tool_calls)
+        return [result["message"] for result in results], tool_dispatch.find_goodbye(results)
+
+
+class AsyncConversation:
+    """Per-user conversation state driven by a shared AsyncChatEngine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.messages = [
+            {"role": "system", "content": main_chatbot.build_system_prompt()},
+            {"role": "assistant", "content": main_chatbot.INITIAL_GREETING},
+        ]
+        self.ended = False
+        self.last_history_report = None
+
+    async def send(self, user_input, on_token=None):
+        """Handles one user turn and returns the full reply text; sets `ended` when the user said goodbye."""
+        with metrics.turn_trace(mode="async"):
+            return await self._send(user_input, on_token)
+
+    async def _send(self, user_input, on_token):
+        self.messages.append({"role": "user", "content": user_input})
+        try:
+            response_message = await self.engine.stream_completion(self.messages, on_token, tools=self.engine.tools_def)
+            self.messages.append(response_message)
+
+            if response_message.get("tool_calls"):
+                tool_messages, goodbye = await self.engine.run_tool_calls(response_message["tool_calls"])
+                if goodbye is not None:
+                    self.ended = True
+                    if on_token is not None:
+                        on_token(goodbye)
+                    return goodbye
+                self.messages.extend(tool_messages)
+                # The same tool calls with the same results get the answer generated last time
+                calls = [tool_dispatch.tool_call_fields(tool_call)[1:] for tool_call in response_message["tool_calls"]]
+                cache_key, reply = answer_cache.lookup(calls, tool_messages)
+                metrics.annotate(answer_cached=reply is not None)
+                if reply is not None:
+                    if on_token is not None:
+                        on_token(reply)
+                else:
+                    # Get final response from LLM after tool execution
+                    final_message = await self.engine.stream_completion(self.messages, on_token)
+                    reply = final_message["content"] or ""
+                    answer_cache.store(cache_key, reply)
+                self.messages.append({"role": "assistant", "content": reply})
+            else:
+                reply = response_message["content"]
+                if not reply:
+                    reply = "I'm not sure how to respond to that. Can you try rephrasing?"
+                    self.messages[-1] = {"role": "assistant", "content": "I'm not sure how to respond to that."}
+                    if on_token is not None:
+                        on_token(reply)
+            return reply
+        except Exception as e:
+            logger.exception("A critical error occurred in the async loop: %s", e)
+            if self.messages and isinstance(self.messages[-1], dict) and self.messages[-1].get("role") == "user":
+                self.messages.pop()
+            return "I'm having some trouble. Please try rephrasing your request or type 'exit'."
+        finally:
+            self.messages, self.last_history_report = history_manager.compact_history(self.messages)
+            metrics.annotate(history_tokens=self.last_history_report["tokens_after"], tokens_saved=self.last_history_report["tokens_saved"])
+
+
+async def run_conversations(scripts, engine=None, on_token=None):
+    """Drives several scripted conversations concurrently; returns one list of replies per script."""
+    engine = engine or AsyncChatEngine()
+
+    async def run_script(script):
+        conversation = AsyncConversation(engine)
+        replies = []
+        for user_input in script:
+            replies.append(await conversation.send(user_input, on_token))
+            if conversation.ended:
+                break
+        return replies
+
+    return await asyncio.gather(*(run_script(script) for script in scripts))
+
+
+async def run_chatbot_async():
+    """Interactive CLI equivalent of main_chatbot.run_chatbot that prints the reply as it streams in."""
+    metrics.configure_logging()
+    print("Initializing Laptop Advisor Chatbot...")
+    await asyncio.to_thread(laptop_data_manager.initialize_data, config.REPROCESS_DATA)
+    df = laptop_data_manager.get_laptop_dataframe()
+    if df is None or df.empty:
+        logger.error("Exiting: Laptop data could not be loaded or processed.")
+        return
+    catalog_reloader.start_reloader()
+
+    conversation = AsyncConversation(AsyncChatEngine())
+    print(f"Laptop Advisor: {main_chatbot.INITIAL_GREETING}")
+
+    def print_token(token):
+        print(token, end="", flush=True)
+
+    while not conversation.ended:
+        user_input = await asyncio.to_thread(input, "You: ")
+        if not user_input:
+            continue
+        print("Laptop Advisor: ", end="", flush=True)
+        await conversation.send(user_input, print_token)
+        print()
+        if config.HISTORY_REPORT and conversation.last_history_report:
+            print(history_manager.format_report(conversation.last_history_report))
+
+
+if __name__ == "__main__":
+    asyncio.run(run_chatbot_async())
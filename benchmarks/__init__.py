@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Run benchmarks from the repository root, e.g. `python -m benchmarks.bench_batch_classification`.
@@ -0,0 +1,59 @@
+# benchmarks/bench_batch_classification.py
+"""Tokens per laptop and rows per second for batched spec classification at different batch sizes.
+
+Calls the real API (the response cache is disabled so every batch size pays full price):
+    python -m benchmarks.bench_batch_classification --rows 100 --batch-sizes 1,5,10,20
+"""
+import argparse
+import contextlib
+import io
+import time
+import pandas as pd
+import config
+import llm_utils
+import laptop_data_manager
+
+
+def run(descriptions, batch_size, max_workers):
+    """Classifies descriptions once at the given batch size and returns throughput and token stats."""
+    llm_utils.reset_usage_totals()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # The raw LLM responses are printed per request
+        results = laptop_data_manager._classify_descriptions(descriptions, max_workers=max_workers, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    usage = llm_utils.get_usage_totals()
+    rows = len(descriptions)
+    failed = sum(1 for specs, _ in results if not isinstance(specs, dict) or "unknown" in specs.values())
+    return {
+        "batch_size": batch_size,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 2) if elapsed else None,
+        "requests": usage["requests"],
+        "prompt_tokens_per_laptop": round(usage["prompt_tokens"] / rows, 1),
+        "completion_tokens_per_laptop": round(usage["completion_tokens"] / rows, 1),
+        "failed_rows": failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default=config.LAPTOP_DATA_CSV)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--batch-sizes", default="1,5,10,20")
+    parser.add_argument("--workers", type=int, default=config.PREPROCESS_MAX_WORKERS)
+    args = parser.parse_args()
+
+    config.LLM_CACHE_ENABLED = False
+    config.CLASSIFIER_MODE = "llm"
+    descriptions = pd.read_csv(args.csv)['Description'].dropna().head(args.rows).tolist()
+
+    print(f"{'K':>4} {'rows/s':>8} {'requests':>9} {'prompt tok/laptop':>18} {'completion tok/laptop':>22} {'failed':>7}")
+    for batch_size in (int(k) for k in args.batch_sizes.split(",")):
+        stats = run(descriptions, batch_size, args.workers)
+        print(f"{stats['batch_size']:>4} {stats['rows_per_second']:>8} {stats['requests']:>9} "
+              f"{stats['prompt_tokens_per_laptop']:>18} {stats['completion_tokens_per_laptop']:>22} {stats['failed_rows']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/bench_startup.py
+"""Cold-start cost of the CLI chatbot: import time, time to the greeting and time to the first reply.
+
+Every measurement runs in a fresh interpreter on a preprocessed synthetic catalog, with the fake
+LLM backend. The startup modes cross FAST_START (greeting first, catalog loaded in the background)
+with the load path: the CSV export with the model-name index rebuilt, vs. the Parquet cache with
+the prebuilt model-name index (the snapshot). --think-time simulates the user typing the first
+message, which is the time the background load can hide:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --rows 100000 --think-time 2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import config
+import catalog_index
+import catalog_store
+from benchmarks.run_benchmarks import write_preprocessed_catalog
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_MESSAGE = "Hi, I'm a student and my budget is under 60000"
+
+# Imports only: what `import main_chatbot` costs, vs. importing every module a turn needs
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import {modules}
+print(round(1000 * (time.perf_counter() - start), 3))
+"""
+
+# Runs run_chatbot() with input()/print() replaced, timing the greeting and the first reply
+CHAT_SCRIPT = """
+import builtins, json, os, sys, time
+start = time.perf_counter()
+import config
+config.LLM_BACKEND = "fake"
+config.LOG_LEVEL = "WARNING"
+config.FAST_START = {fast_start}
+config.PREPROCESSED_DATA_FORMAT = {data_format!r}
+config.MODEL_NAME_INDEX_PATH = {model_name_index!r}
+import main_chatbot
+timings = {{"import_ms": 1000 * (time.perf_counter() - start)}}
+real_print = print
+inputs = iter([{first_message!r}])
+
+def fake_print(*args, **kwargs):
+    text = " ".join(str(a) for a in args)
+    if text.startswith("Laptop Advisor:"):
+        timings["first_reply_ms" if "greeting_ms" in timings else "greeting_ms"] = 1000 * (time.perf_counter() - start)
+
+def fake_input(prompt=""):
+    if "first_reply_ms" in timings:
+        real_print(json.dumps(timings))
+        sys.stdout.flush()
+        os._exit(0)
+    time.sleep({think_time})
+    return next(inputs)
+
+builtins.print, builtins.input = fake_print, fake_input
+main_chatbot.run_chatbot()
+"""
+
+MODES = {
+    # name: (FAST_START, load path)
+    "baseline": (False, "csv"),
+    "fast_start": (True, "csv"),
+    "snapshot": (False, "snapshot"),
+    "fast_start_snapshot": (True, "snapshot"),
+}
+
+
+def _run(script, cwd):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run([sys.executable, "-c", script], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_imports(cwd, repeats):
+    modules = {
+        "import_main_chatbot_ms": "main_chatbot",
+        "import_turn_modules_ms": "main_chatbot, llm_utils, laptop_data_manager, chatbot_functions, tool_dispatch",
+    }
+    return {name: round(statistics.median(_run(IMPORT_SCRIPT.format(modules=m), cwd) for _ in range(repeats)), 3)
+            for name, m in modules.items()}
+
+
+def bench_mode(cwd, fast_start, load_path, think_time, repeats):
+    script = CHAT_SCRIPT.format(
+        fast_start=fast_start,
+        data_format="parquet" if load_path == "snapshot" else "csv",
+        model_name_index=os.path.join(cwd, config.MODEL_NAME_INDEX_PATH) if load_path == "snapshot" else None,
+        first_message=FIRST_MESSAGE,
+        think_time=think_time,
+    )
+    runs = [_run(script, cwd) for _ in range(repeats)]
+    return {key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000, help="Laptops in the preprocessed catalog")
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh processes per measurement (the median is reported)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds the simulated user takes to type the first message")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    results = {"rows": args.rows, "think_time_s": args.think_time}
+    with tempfile.TemporaryDirectory() as scratch:
+        cwd = os.getcwd()
+        os.chdir(scratch)
+        try:
+            print(f"Writing a preprocessed catalog of {args.rows} laptops...")
+            with contextlib.redirect_stdout(io.StringIO()):
+                write_preprocessed_catalog(args.rows, args.seed)
+            df, _ = catalog_store.load_preprocessed()
+            catalog_index.load_or_build_model_names(df['Model Name'].tolist()) # The snapshot the "snapshot" modes load
+        finally:
+            os.chdir(cwd)
+        print("Timing imports...")
+        results.update(bench_imports(scratch, args.repeats))
+        for name, (fast_start, load_path) in MODES.items():
+            print(f"Timing {name} startup...")
+            for key, value in bench_mode(scratch, fast_start, load_path, args.think_time, args.repeats).items():
+                results[f"{name}_{key}"] = value
+
+    for name, value in results.items():
+        print(f"{name:<40} {value}")
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
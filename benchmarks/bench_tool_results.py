@@ -0,0 +1,115 @@
+# benchmarks/bench_tool_results.py
+"""Prompt tokens and tool-turn latency of the compact tool-result encoding vs. the full JSON records.
+
+Offline by default (tokens counted locally, latency = tool execution + encoding); --live also sends
+the second completion of each tool turn to the configured API and reports its latency and the
+prompt tokens billed:
+    python -m benchmarks.bench_tool_results
+    python -m benchmarks.bench_tool_results --live --repeats 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import time
+import config
+import llm_utils
+import laptop_data_manager
+import tool_dispatch
+import history_manager
+import result_encoder
+import main_chatbot
+
+FORMATS = ("json", "compact")
+
+
+def tool_calls_for(index):
+    """Representative tool calls for the loaded catalog: recommendations at the median price and a few detail lookups."""
+    prices = index.sorted_prices[:index.priced_count]
+    median = int(prices[len(prices) // 2]) if len(prices) else None
+    names = [n for n in index.model_names.names if n][:2]
+    calls = [
+        ("recommend_laptops_by_criteria", {"budget_max": median, "personas": ["gamer"]}),
+        ("recommend_laptops_by_criteria", {"personas": ["student", "traveler"]}),
+        ("recommend_laptops_by_criteria", {"budget_max": median}),
+    ]
+    calls += [("get_laptop_info", {"model_name": name}) for name in names]
+    return calls
+
+
+def tool_turn_messages(function_name, arguments, content):
+    """The prompt of the second completion of a tool turn."""
+    tool_call = {"id": "call_bench", "type": "function", "function": {"name": function_name, "arguments": json.dumps(arguments)}}
+    return [
+        {"role": "system", "content": main_chatbot.build_system_prompt()},
+        {"role": "user", "content": f"Please use {function_name} with {json.dumps(arguments)}."},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call]},
+        {"role": "tool", "tool_call_id": "call_bench", "name": function_name, "content": content},
+    ]
+
+
+def measure(function_name, arguments, result_format, repeats, live):
+    config.TOOL_RESULT_FORMAT = result_format
+    local_times, api_times, billed = [], [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = tool_dispatch.run_tool(function_name, json.dumps(arguments))
+        content = result_encoder.encode_tool_result(function_name, data)
+        local_times.append(time.perf_counter() - start)
+        if live:
+            start = time.perf_counter()
+            response = llm_utils.get_client().chat.completions.create(
+                model=config.CHATBOT_MODEL_ID, messages=tool_turn_messages(function_name, arguments, content), temperature=0.7)
+            api_times.append(time.perf_counter() - start)
+            if response.usage is not None:
+                billed.append(response.usage.prompt_tokens)
+    stats = {
+        "format": result_format,
+        "chars": len(content),
+        "result_tokens": history_manager.count_tokens(content),
+        "tool_ms": round(1000 * statistics.median(local_times), 3),
+    }
+    if live:
+        stats["turn_ms"] = round(1000 * statistics.median(api_times), 1)
+        stats["prompt_tokens"] = round(statistics.mean(billed)) if billed else None
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=20, help="Repetitions per call and format (medians are reported)")
+    parser.add_argument("--live", action="store_true", help="Also time the second completion against the configured API")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        laptop_data_manager.initialize_data()
+    index = laptop_data_manager.get_catalog_index()
+    if index is None or len(index) == 0:
+        print("No preprocessed catalog found; run the chatbot once first.")
+        return
+    original_format = config.TOOL_RESULT_FORMAT
+
+    header = f"{'call':<52} {'format':>8} {'chars':>7} {'tokens':>7} {'tool ms':>8}"
+    if args.live:
+        header += f" {'turn ms':>8} {'billed':>7}"
+    print(header)
+    totals = {result_format: 0 for result_format in FORMATS}
+    for function_name, arguments in tool_calls_for(index):
+        label = f"{function_name}({', '.join(f'{k}={v}' for k, v in arguments.items() if v is not None)})"[:52]
+        for result_format in FORMATS:
+            stats = measure(function_name, arguments, result_format, args.repeats, args.live)
+            totals[result_format] += stats["result_tokens"]
+            line = f"{label:<52} {result_format:>8} {stats['chars']:>7} {stats['result_tokens']:>7} {stats['tool_ms']:>8}"
+            if args.live:
+                line += f" {stats['turn_ms']:>8} {stats['prompt_tokens'] or '-':>7}"
+            print(line)
+    config.TOOL_RESULT_FORMAT = original_format
+    if totals["json"]:
+        print(f"\nTool-result tokens: json {totals['json']}, compact {totals['compact']} "
+              f"({100 * (1 - totals['compact'] / totals['json']):.0f}% fewer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# benchmarks/load_test.py
+"""Load test for chat_server.py: concurrent scripted shoppers against a fake LLM, fully offline.
+
+Starts `chat_server.py --fake-llm` on a free port (or targets --url), runs --sessions concurrent
+conversations of --turns turns each, and reports latency percentiles and sessions per core:
+    python -m benchmarks.load_test --sessions 500 --turns 4 --first-token-delay 0.3 --token-delay 0.01
+
+Sessions per core = concurrent sessions / cores the server process kept busy (server CPU seconds per
+wall second, read from /health), i.e. how many shoppers one core carries at this latency. Needs a
+preprocessed catalog (run the chatbot once first).
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+SCRIPT = [
+    "I need a laptop for gaming under 1500",
+    "show me more",
+    "tell me about the MacBook Air",
+    "compare the ThinkPad and the XPS",
+    "I'm looking for a thin laptop for video editing with long battery life",
+    "I'm a student and traveler with a budget of 800",
+    "thanks, goodbye",
+]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+class _Connection:
+    """One keep-alive HTTP/1.1 connection speaking the chat_server protocol."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        """Sends a request; returns (status, events) for event streams or (status, json) otherwise, plus the first-byte time."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                           f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(head[0].split()[1])
+        headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in head[1:] if line)}
+        if headers.get("transfer-encoding") == "chunked":
+            events, first_token_at = [], None
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                event = json.loads(chunk[:size].decode("utf-8")[len("data: "):])
+                if first_token_at is None and ("token" in event or "done" in event):
+                    first_token_at = time.perf_counter()
+                events.append(event)
+            result = events
+        else:
+            result, first_token_at = json.loads(await self.reader.readexactly(int(headers.get("content-length", 0)))), time.perf_counter()
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, result, first_token_at
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def run_session(host, port, turns, stats):
+    connection = _Connection(host, port)
+    session_id = None
+    try:
+        for turn in range(turns):
+            start = time.perf_counter()
+            try:
+                status, events, first_token_at = await connection.request("POST", "/chat", {"session_id": session_id, "message": SCRIPT[turn % len(SCRIPT)]})
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                stats["errors"] += 1
+                await connection.close()
+                continue
+            end = time.perf_counter()
+            if status != 200 or not events or not events[-1].get("done"):
+                stats["errors"] += 1
+                continue
+            session_id = events[0]["session_id"]
+            stats["first_token"].append(first_token_at - start)
+            stats["total"].append(end - start)
+            if events[-1].get("ended"):
+                session_id = None # Server dropped the session; continue as a new shopper
+    finally:
+        await connection.close()
+
+
+async def get_health(host, port):
+    connection = _Connection(host, port)
+    try:
+        _, health, _ = await connection.request("GET", "/health")
+        return health
+    finally:
+        await connection.close()
+
+
+async def run_load(host, port, sessions, turns):
+    stats = {"first_token": [], "total": [], "errors": 0}
+    before = await get_health(host, port)
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(host, port, turns, stats) for _ in range(sessions)))
+    wall = time.perf_counter() - start
+    after = await get_health(host, port)
+
+    server_cpu = after["cpu_seconds"] - before["cpu_seconds"]
+    cores_busy = server_cpu / wall if wall else 0.0
+    report = {
+        "sessions": sessions,
+        "turns_per_session": turns,
+        "turns_completed": len(stats["total"]),
+        "errors": stats["errors"],
+        "wall_seconds": round(wall, 3),
+        "turns_per_second": round(len(stats["total"]) / wall, 1) if wall else None,
+        "server_cpu_seconds": round(server_cpu, 3),
+        "server_cores_busy": round(cores_busy, 3),
+        "sessions_per_core": round(sessions / cores_busy, 1) if cores_busy else None,
+        "server_cpu_ms_per_turn": round(1000 * server_cpu / len(stats["total"]), 3) if stats["total"] else None,
+        "catalog_rows": after["catalog_rows"],
+    }
+    for name in ("first_token", "total"):
+        if stats[name]:
+            for q in (50, 95, 99):
+                report[f"{name}_p{q}_ms"] = round(1000 * percentile(stats[name], q), 1)
+    return report
+
+
+def _drain(stream):
+    for _ in stream:
+        pass
+
+def start_server(first_token_delay, token_delay):
+    """Starts chat_server.py --fake-llm on a free port (catalog paths resolve from the current directory); returns (process, port)."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(root, "chat_server.py"), "--fake-llm", "--port", "0",
+         "--first-token-delay", str(first_token_delay), "--token-delay", str(token_delay)],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    output = []
+    for line in process.stdout:
+        output.append(line)
+        if "listening on http://" in line:
+            port = int(line.rsplit(":", 1)[1])
+            # Keep draining the server's log so it never blocks on a full pipe
+            threading.Thread(target=_drain, args=(process.stdout,), daemon=True).start()
+            return process, port
+    process.wait()
+    raise RuntimeError("chat_server.py exited before listening:\n" + "".join(output[-20:]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Target a running server instead, e.g. http://127.0.0.1:8080")
+    parser.add_argument("--sessions", type=int, default=200, help="Concurrent shoppers")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per shopper")
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="Fake model latency before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Fake model latency between tokens")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        process, port = start_server(args.first_token_delay, args.token_delay)
+        host = "127.0.0.1"
+    try:
+        report = asyncio.run(run_load(host, port, args.sessions, args.turns))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
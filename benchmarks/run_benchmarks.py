@@ -0,0 +1,271 @@
+# benchmarks/run_benchmarks.py
+"""End-to-end benchmark suite: preprocessing, catalog load, tool calls and chat turns, fully offline.
+
+Runs in a scratch directory on synthetic catalogs (benchmarks/synthetic_catalog.py), with the LLM
+answered by the fake backend or, with --recording, by a recorded session (LLM_BACKEND="record").
+Results are written as JSON; --compare fails (exit code 1) when a metric regressed past --threshold:
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --compare bench.json --threshold 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import pandas as pd
+import config
+import llm_backends
+import llm_utils
+import laptop_data_manager
+import catalog_store
+import spec_rules
+import semantic_index
+import metrics
+import tool_dispatch
+import main_chatbot
+import async_chatbot
+from benchmarks.load_test import percentile
+from benchmarks.synthetic_catalog import generate_catalog
+
+SCRIPT = [
+    "Hi, I'm a student and my budget is under 60000",
+    "Show me more options",
+    "I'm looking for a thin laptop for video editing",
+    "Any gaming laptops under 120000?",
+    "Tell me more about the first one",
+]
+
+
+def _quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+def _latency_stats(prefix, seconds):
+    ms = [1000 * s for s in seconds]
+    return {
+        f"{prefix}_p50_ms": round(percentile(ms, 50), 3),
+        f"{prefix}_p95_ms": round(percentile(ms, 95), 3),
+        f"{prefix}_mean_ms": round(statistics.mean(ms), 3),
+    }
+
+
+def use_backend(backend, recording=None):
+    """Points llm_utils (sync and async clients) at the given backend; preprocessing runs unthrottled and uncached."""
+    config.LLM_BACKEND = backend
+    if recording:
+        config.LLM_RECORDING_PATH = os.path.abspath(recording)
+    llm_utils.client = llm_backends.create_client()
+    llm_utils._async_client = llm_backends.create_async_client()
+    llm_utils.preprocessing_rate_limiter = llm_utils.RateLimiter()
+    config.LLM_CACHE_ENABLED = False
+
+
+def bench_preprocessing(rows, seed):
+    """initialize_data from the raw CSV, with every laptop classified through the LLM backend."""
+    generate_catalog(rows, seed).to_csv(config.LAPTOP_DATA_CSV, index=False)
+    llm_utils.reset_usage_totals()
+    start = time.perf_counter()
+    with _quiet():
+        laptop_data_manager.initialize_data(force_reprocess=True, incremental=False)
+    elapsed = time.perf_counter() - start
+    df = laptop_data_manager.get_laptop_dataframe()
+    failed = sum(1 for specs in df['Specification_Ratings'] if not isinstance(specs, dict) or "unknown" in specs.values())
+    return {
+        "preprocess_rows": len(df),
+        "preprocess_s": round(elapsed, 3),
+        "preprocess_rows_per_second": round(len(df) / elapsed, 1),
+        "preprocess_requests": llm_utils.get_usage_totals()["requests"],
+        "preprocess_failed_rows": failed,
+    }
+
+
+def write_preprocessed_catalog(rows, seed):
+    """Writes a preprocessed catalog of `rows` laptops, classified with the local rules (no LLM)."""
+    df = generate_catalog(rows, seed)
+    df['Price'] = pd.to_numeric(df['Price'].str.replace(",", ""), errors='coerce')
+    specs = [{key: value or "medium" for key, value in spec_rules.classify_specs(d).items()} for d in df['Description']]
+    df['Preprocess_Key'] = [laptop_data_manager._preprocess_key(d) for d in df['Description']]
+    df['Specification_Ratings'] = pd.Series(specs, index=df.index, dtype=object)
+    df['Persona'] = pd.Series([spec_rules.lookup_personas(s) for s in specs], index=df.index, dtype=object)
+    df = catalog_store.add_encoded_columns(df)
+    catalog_store.save_preprocessed(df)
+    start = time.perf_counter()
+    semantic_index.build_and_save(df)
+    return time.perf_counter() - start
+
+
+def bench_load(rows, seed):
+    """Startup cost of a large preprocessed catalog: load + CatalogIndex, and the memory-mapped search index."""
+    index_build = write_preprocessed_catalog(rows, seed)
+    start = time.perf_counter()
+    with _quiet():
+        laptop_data_manager.initialize_data(force_reprocess=False)
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    semantic = laptop_data_manager.get_catalog_index().semantic_index()
+    semantic_load = time.perf_counter() - start
+    return {
+        "load_rows": len(semantic),
+        "load_format": config.PREPROCESSED_DATA_FORMAT if catalog_store.parquet_available() else "csv",
+        "load_s": round(load, 3),
+        "semantic_index_build_s": round(index_build, 3),
+        "semantic_index_load_s": round(semantic_load, 3),
+    }
+
+
+def tool_calls_for(index):
+    prices = index.sorted_prices[:index.priced_count]
+    median = int(prices[len(prices) // 2])
+    names = [n for n in index.model_names.names if n]
+    return {
+        "recommend": [
+            ("recommend_laptops_by_criteria", {"budget_max": median, "personas": ["gamer"]}),
+            ("recommend_laptops_by_criteria", {"budget_min": median // 2, "budget_max": median, "personas": ["student", "traveler"]}),
+            ("recommend_laptops_by_criteria", {"budget_max": median, "offset": 5}),
+        ],
+        "get_laptop_info": [("get_laptop_info", {"model_name": name}) for name in names[:: max(1, len(names) // 5)][:5]],
+        "search": [
+            ("search_laptops", {"query": "thin and light for video editing"}),
+            ("search_laptops", {"query": "rtx gaming with 144hz display", "budget_max": median}),
+            ("search_laptops", {"query": "long battery life for business travel", "personas": ["business"]}),
+        ],
+    }
+
+def bench_tools(repeats):
+    """Latency of each tool on the loaded catalog (execution + result encoding, as the dispatcher runs it)."""
+    results = {}
+    for label, calls in tool_calls_for(laptop_data_manager.get_catalog_index()).items():
+        seconds = []
+        for _ in range(repeats):
+            for function_name, arguments in calls:
+                start = time.perf_counter()
+                with _quiet():
+                    tool_dispatch._result("call_bench", function_name, tool_dispatch.run_tool(function_name, json.dumps(arguments)))
+                seconds.append(time.perf_counter() - start)
+        results.update(_latency_stats(f"tool_{label}", seconds))
+    return results
+
+
+def bench_turns(conversations):
+    """Per-turn latency of the CLI loop (main_chatbot.run_turn) and of the async streaming engine, answer cache included."""
+    sync_seconds = []
+    for _ in range(conversations):
+        messages = [{"role": "system", "content": main_chatbot.build_system_prompt()},
+                    {"role": "assistant", "content": main_chatbot.INITIAL_GREETING}]
+        for user_input in SCRIPT:
+            start = time.perf_counter()
+            with _quiet():
+                messages, _, ended = main_chatbot.run_turn(messages, user_input)
+            sync_seconds.append(time.perf_counter() - start)
+            if ended:
+                break
+
+    async def run_async():
+        engine = async_chatbot.AsyncChatEngine()
+        seconds = []
+        for _ in range(conversations):
+            conversation = async_chatbot.AsyncConversation(engine)
+            for user_input in SCRIPT:
+                start = time.perf_counter()
+                await conversation.send(user_input)
+                seconds.append(time.perf_counter() - start)
+        return seconds
+
+    with _quiet():
+        async_seconds = asyncio.run(run_async())
+    hit_rate = metrics.hit_rate("answer_cache_lookups_total") # Scripted conversations repeat their tool turns
+    return {**_latency_stats("turn", sync_seconds), **_latency_stats("async_turn", async_seconds),
+            "answer_cache_hit_rate": round(hit_rate, 3) if hit_rate is not None else None}
+
+
+def compare(results, baseline, threshold, min_delta_ms=1.0):
+    """Metrics that got worse than the baseline by more than `threshold` (a fraction).
+
+    Timings that moved by less than `min_delta_ms` are ignored; sub-millisecond timings are mostly noise.
+    """
+    regressions = []
+    for name, old in baseline.get("results", {}).items():
+        new = results.get(name)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+            continue
+        if name.endswith(("_ms", "_s")):
+            if abs(new - old) * (1 if name.endswith("_ms") else 1000) < min_delta_ms:
+                continue
+            change = (new - old) / old # Lower is better
+        elif name.endswith("_per_second"):
+            change = (old - new) / old # Higher is better
+        else:
+            continue
+        if change > threshold:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--preprocess-rows", type=int, default=2000, help="Rows classified through the LLM backend")
+    parser.add_argument("--load-rows", type=int, default=100000, help="Rows of the catalog used for load, tool and turn timings")
+    parser.add_argument("--repeats", type=int, default=20, help="Repetitions of each tool call")
+    parser.add_argument("--conversations", type=int, default=5, help="Scripted conversations for the turn timings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--recording", help="Replay this recording instead of using the fake backend")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON to check the results against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    use_backend("replay" if args.recording else "fake", args.recording)
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        cwd = os.getcwd()
+        os.chdir(scratch) # Catalogs, caches and the search index are written to the relative config paths
+        try:
+            for name, step in (
+                ("preprocessing", lambda: bench_preprocessing(args.preprocess_rows, args.seed)),
+                ("load", lambda: bench_load(args.load_rows, args.seed)),
+                ("tools", lambda: bench_tools(args.repeats)),
+                ("turns", lambda: bench_turns(args.conversations)),
+            ):
+                print(f"Running {name} benchmark...")
+                results.update(step())
+        finally:
+            os.chdir(cwd)
+
+    for name, value in results.items():
+        print(f"{name:<36} {value}")
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "backend": config.LLM_BACKEND,
+            "args": vars(args),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for name, old, new, change in regressions:
+                print(f"  {name}: {old} -> {new} ({change:+.0%})")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/synthetic_catalog.py
+"""Synthetic laptop catalogs in the layout of laptop_data.csv, at any size.
+
+Every row has the raw spec columns and a Description that mentions them the way real descriptions
+do, so the classifier rules, the model-name index and the description search all get realistic
+input. Output is deterministic for a given seed:
+    python -m benchmarks.synthetic_catalog --rows 100000 --out synthetic_laptops.csv
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+BRANDS = {
+    "Dell": ["Inspiron", "Vostro", "Latitude", "XPS", "Alienware", "G15"],
+    "HP": ["Pavilion", "Victus", "Envy", "Spectre", "EliteBook", "Omen"],
+    "Lenovo": ["IdeaPad", "ThinkPad", "ThinkBook", "Yoga", "Legion", "LOQ"],
+    "Asus": ["VivoBook", "ZenBook", "TUF Gaming", "ROG Strix", "ExpertBook"],
+    "Acer": ["Aspire", "Swift", "Nitro", "Predator Helios", "TravelMate"],
+    "Apple": ["MacBook Air", "MacBook Pro"],
+    "MSI": ["Modern", "Prestige", "Katana", "Stealth", "Raider"],
+}
+CPUS = [ # (core, manufacturer, clock, price weight)
+    ("Celeron N4500", "Intel", "1.1 GHz", 0.5), ("Pentium Silver", "Intel", "1.1 GHz", 0.6),
+    ("Core i3 1215U", "Intel", "1.2 GHz", 0.8), ("Core i5 1235U", "Intel", "1.3 GHz", 1.0),
+    ("Core i7 1360P", "Intel", "2.2 GHz", 1.4), ("Core i9 13900H", "Intel", "2.6 GHz", 1.9),
+    ("Ryzen 3 7320U", "AMD", "2.4 GHz", 0.8), ("Ryzen 5 7530U", "AMD", "2.0 GHz", 1.0),
+    ("Ryzen 7 7840HS", "AMD", "3.8 GHz", 1.4), ("Ryzen 9 7945HX", "AMD", "2.5 GHz", 1.9),
+    ("Apple M2", "Apple", "3.5 GHz", 1.5), ("Apple M3 Pro", "Apple", "4.0 GHz", 2.2),
+]
+GPUS = [("Intel UHD Graphics", 0.0), ("Intel Iris Xe", 0.1), ("AMD Radeon Graphics", 0.05),
+        ("NVIDIA GeForce MX550", 0.2), ("NVIDIA GeForce GTX 1650", 0.35), ("NVIDIA GeForce RTX 3050", 0.5),
+        ("NVIDIA GeForce RTX 4060", 0.8), ("NVIDIA GeForce RTX 4080", 1.4), ("AMD Radeon RX 6600M", 0.6)]
+RAM = [4, 8, 16, 32, 64]
+DISPLAYS = [("HD", "1366x768", "TN", 0.0), ("Full HD", "1920x1080", "IPS", 0.1), ("WUXGA", "1920x1200", "IPS", 0.15),
+            ("Full HD 144Hz", "1920x1080", "IPS", 0.3), ("QHD", "2560x1440", "IPS", 0.4), ("OLED 2.8K", "2880x1800", "OLED", 0.5),
+            ("4K UHD", "3840x2160", "OLED", 0.7)]
+SIZES = ['13.3"', '14"', '15.6"', '16"', '17.3"']
+FEATURES = ["Backlit Keyboard", "Fingerprint Reader", "Thunderbolt 4", "Wi-Fi 6E", "Dolby Atmos Speakers",
+            "Full HD Webcam", "Stylus Support", "360-degree Hinge", "Per-key RGB Keyboard", "Military-grade Durability"]
+USES = ["everyday browsing and office work", "students on the go", "video editing and content creation",
+        "competitive gaming", "software development", "business travel", "photo editing", "streaming and entertainment"]
+
+
+def generate_catalog(rows, seed=0):
+    """DataFrame with `rows` synthetic laptops (Price formatted like the raw CSV, e.g. '54,990')."""
+    rng = np.random.default_rng(seed)
+    brands = list(BRANDS)
+    brand_ids = rng.integers(len(brands), size=rows)
+    series_ids = rng.integers(1000, size=rows)
+    cpu_ids = rng.integers(len(CPUS), size=rows)
+    gpu_ids = rng.integers(len(GPUS), size=rows)
+    ram_ids = rng.integers(len(RAM), size=rows)
+    display_ids = rng.integers(len(DISPLAYS), size=rows)
+    size_ids = rng.integers(len(SIZES), size=rows)
+    weights = np.round(rng.uniform(0.95, 3.2, size=rows), 2)
+    batteries = rng.integers(4, 19, size=rows)
+    use_ids = rng.integers(len(USES), size=(rows, 2))
+    feature_ids = rng.integers(len(FEATURES), size=(rows, 2))
+    storage = rng.choice([256, 512, 1024, 2048], size=rows)
+    noise = rng.uniform(0.85, 1.2, size=rows)
+
+    records = []
+    for i in range(rows):
+        brand = brands[brand_ids[i]]
+        line = BRANDS[brand][series_ids[i] % len(BRANDS[brand])]
+        model = f"{line} {series_ids[i] % 100 + 1}{'' if i < 1000 else f'-{i}'}"
+        core, maker, clock, cpu_weight = CPUS[cpu_ids[i]]
+        gpu, gpu_weight = GPUS[gpu_ids[i]]
+        ram = RAM[ram_ids[i]]
+        display, resolution, panel, display_weight = DISPLAYS[display_ids[i]]
+        features = sorted({FEATURES[j] for j in feature_ids[i]})
+        uses = [USES[j] for j in dict.fromkeys(use_ids[i])]
+        price = int(round((25000 + 30000 * cpu_weight + 60000 * gpu_weight + 2500 * ram + 40000 * display_weight) * noise[i], -2))
+        description = (
+            f"The {brand} {model} is powered by an {maker} {core} processor and {ram}GB of RAM, with "
+            f"{gpu} graphics. Its {SIZES[size_ids[i]]} {display} {panel} display runs at {resolution}. "
+            f"It weighs {weights[i]} kg and offers up to {batteries[i]} hours of battery life. "
+            f"Features include {' and '.join(features)}. Ideal for {' and '.join(uses)}."
+        )
+        records.append({
+            "Brand": brand, "Model Name": model, "Core": core, "CPU Manufacturer": maker, "Clock Speed": clock,
+            "RAM Size": f"{ram}GB", "Storage Type": f"SSD {storage[i]}GB", "Display Type": panel,
+            "Display Size": SIZES[size_ids[i]], "Graphics Processor": gpu, "Screen Resolution": resolution,
+            "OS": "macOS" if brand == "Apple" else "Windows 11", "Laptop Weight": f"{weights[i]} kg",
+            "Special Features": ", ".join(features), "Warranty": "1 year", "Average Battery Life": f"{batteries[i]} hours",
+            "Price": f"{price:,}", "Description": description,
+        })
+    return pd.DataFrame.from_records(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic_laptops.csv")
+    args = parser.parse_args()
+    generate_catalog(args.rows, args.seed).to_csv(args.out, index=False)
+    print(f"Wrote {args.rows} laptops to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
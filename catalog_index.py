@@ -0,0 +1,327 @@
+# catalog_index.py
+import hashlib
+import logging
+import re
+import threading
+import numpy as np
+import catalog_store
+import config
+import semantic_index
+import spec_rules
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+_POSTINGS_CHUNK = 1024 # First slice of a posting list scored before checking whether the search can stop
+
+
+def normalize_name(text):
+    """Lowercases and collapses punctuation/whitespace, so 'MacBook-Air (M2)' -> 'macbook air m2'."""
+    return _NON_ALNUM_RE.sub(" ", str(text).lower()).strip()
+
+def _trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _csr(keys, values, size):
+    """Groups `values` by integer `keys` into (offsets, grouped values); group k is grouped[offsets[k]:offsets[k + 1]]."""
+    order = np.argsort(keys, kind='stable') # Stable, so each group keeps the input order
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return offsets, values[order]
+
+
+def _contains(sorted_values, values):
+    """Boolean mask of which `values` occur in the sorted, non-empty array `sorted_values`."""
+    found = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[found] == values
+
+def _chunks(lists):
+    """(list number, slice) over each posting list in turn, in slices that double in size."""
+    for i, postings in enumerate(lists):
+        start, size = 0, _POSTINGS_CHUNK
+        while start < len(postings):
+            yield i, postings[start:start + size]
+            start, size = start + size, 2 * size
+
+def _top_candidates(selection, positions, k):
+    """Indices of the `k` highest selection scores; ties at the cut go to the earliest catalog positions."""
+    threshold = np.partition(selection, len(selection) - k)[len(selection) - k]
+    above = np.flatnonzero(selection > threshold)
+    tied = np.flatnonzero(selection == threshold)
+    need = k - len(above)
+    if len(tied) > need:
+        tied = tied[np.argpartition(positions[tied], need - 1)[:need]]
+    return np.concatenate([above, tied])
+
+
+class ModelNameIndex:
+    """Model-name lookup combining exact normalized-name hashing, token inverted lists and trigram ranking.
+
+    Query tokens are weighted by IDF and accumulated over their posting lists; tokens not in the
+    vocabulary (typos like 'macbok') are mapped to the closest known token by trigram similarity.
+    Only the best few candidates get the more expensive trigram score, so lookups stay fast as the
+    catalog grows. Posting lists are stored as flat arrays with offsets, so the whole index can be
+    saved to and loaded from a .npz snapshot instead of being rebuilt at startup.
+    """
+
+    _ARRAYS = ("token_offsets", "token_positions", "token_counts", "token_idf",
+               "trigram_offsets", "trigram_tokens", "vocabulary_trigram_counts",
+               "name_trigram_offsets", "name_trigrams")
+
+    def __init__(self, names):
+        self.names = ["" if not isinstance(n, str) else n for n in names]
+        self.normalized = [normalize_name(n) for n in self.names]
+        token_ids = {}
+        pair_tokens, pair_positions, token_counts = [], [], []
+        for pos, name in enumerate(self.normalized):
+            tokens = set(name.split())
+            token_counts.append(max(len(tokens), 1))
+            for token in tokens:
+                pair_tokens.append(token_ids.setdefault(token, len(token_ids)))
+                pair_positions.append(pos)
+        self.vocabulary = list(token_ids)
+        self.token_offsets, self.token_positions = _csr(
+            np.asarray(pair_tokens, dtype=np.int64), np.asarray(pair_positions, dtype=np.int32), len(self.vocabulary))
+        self.token_counts = np.asarray(token_counts, dtype=np.float32)
+        total = max(len(self.names), 1)
+        self.token_idf = np.log(1 + total / np.maximum(np.diff(self.token_offsets), 1))
+        # Trigram index over the vocabulary (not the names), used to correct misspelled query tokens
+        trigram_ids = {}
+        pair_trigrams, pair_token_ids, trigram_counts = [], [], []
+        for token_id, token in enumerate(self.vocabulary):
+            trigrams = _trigrams(token)
+            trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                pair_trigrams.append(trigram_ids.setdefault(trigram, len(trigram_ids)))
+                pair_token_ids.append(token_id)
+        # Trigram ids of every name, for scoring the final candidates without building sets per lookup
+        name_trigrams, name_trigram_counts = [], []
+        for name in self.normalized:
+            ids = [trigram_ids.setdefault(trigram, len(trigram_ids)) for trigram in _trigrams(name)] if name else []
+            name_trigrams.extend(ids)
+            name_trigram_counts.append(len(ids))
+        self.name_trigrams = np.asarray(name_trigrams, dtype=np.int32)
+        self.name_trigram_offsets = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(name_trigram_counts, out=self.name_trigram_offsets[1:])
+        self.trigrams = list(trigram_ids)
+        self.trigram_offsets, self.trigram_tokens = _csr(
+            np.asarray(pair_trigrams, dtype=np.int64), np.asarray(pair_token_ids, dtype=np.int32), len(self.trigrams))
+        self.vocabulary_trigram_counts = np.asarray(trigram_counts, dtype=np.int32)
+        self._build_lookups()
+
+    def _build_lookups(self):
+        """Hash lookups derived from the stored lists (cheap, so they are not part of the snapshot)."""
+        self.token_ids = {token: i for i, token in enumerate(self.vocabulary)}
+        self.trigram_ids = {trigram: i for i, trigram in enumerate(self.trigrams)}
+        self.exact = {}
+        for pos, name in enumerate(self.normalized):
+            if name:
+                self.exact.setdefault(name, []).append(pos)
+
+    def postings(self, token_id):
+        return self.token_positions[self.token_offsets[token_id]:self.token_offsets[token_id + 1]]
+
+    def save(self, path, fingerprint):
+        arrays = {name: getattr(self, name) for name in self._ARRAYS}
+        strings = {name: np.asarray(getattr(self, name), dtype=str) for name in ("names", "normalized", "vocabulary", "trigrams")}
+        with catalog_store.replacing(path) as tmp, open(tmp, "wb") as f:
+            np.savez(f, fingerprint=np.asarray(fingerprint), **arrays, **strings)
+
+    @classmethod
+    def load(cls, path, fingerprint):
+        """Loads a saved index; returns None if it is missing, unreadable or was built from other names."""
+        try:
+            with np.load(path) as data:
+                if str(data["fingerprint"]) != fingerprint:
+                    return None
+                index = cls.__new__(cls)
+                for name in cls._ARRAYS:
+                    setattr(index, name, data[name])
+                for name in ("names", "normalized", "vocabulary", "trigrams"):
+                    setattr(index, name, data[name].tolist())
+        except (OSError, KeyError, ValueError):
+            return None
+        index._build_lookups()
+        return index
+
+    def _closest_token(self, token):
+        """Best vocabulary token id for an unknown query token as (token_id, similarity), or (None, 0.0)."""
+        query_trigrams = _trigrams(token)
+        ids = [self.trigram_ids[t] for t in query_trigrams if t in self.trigram_ids]
+        if not ids:
+            return None, 0.0
+        candidates = np.concatenate([self.trigram_tokens[self.trigram_offsets[i]:self.trigram_offsets[i + 1]] for i in ids])
+        token_ids, shared = np.unique(candidates, return_counts=True)
+        similarity = 2 * shared / (len(query_trigrams) + self.vocabulary_trigram_counts[token_ids])
+        best = int(np.argmax(similarity))
+        return (int(token_ids[best]), float(similarity[best])) if similarity[best] >= 0.5 else (None, 0.0)
+
+    def search(self, query, limit=5):
+        """Returns up to `limit` (position, score) pairs, best first; score is in [0, 1] and 1.0 means exact match."""
+        q = normalize_name(query)
+        if not q:
+            return []
+        scores = {pos: 1.0 for pos in self.exact.get(q, [])}
+
+        # IDF-weighted token coverage, accumulated over the posting lists
+        weighted = {}
+        for token in set(q.split()):
+            token_id, similarity = self.token_ids.get(token), 1.0
+            if token_id is None:
+                token_id, similarity = self._closest_token(token)
+                if token_id is None:
+                    weighted[None] = weighted.get(None, 0.0) + 1.0 # Counts against coverage
+                    continue
+            weighted[token_id] = max(weighted.get(token_id, 0.0), similarity)
+        query_weight = sum(float(self.token_idf[t]) for t in weighted if t is not None) + weighted.get(None, 0.0)
+        if not query_weight:
+            return []
+        # Only names sharing a token with the query can score. Posting lists are walked rarest first and
+        # each new name is scored against the other lists at once; the walk stops when no unseen name
+        # (one without any of the tokens walked so far) could still make the candidate list.
+        matched = sorted(((t, s) for t, s in weighted.items() if t is not None), key=lambda item: len(self.postings(item[0])))
+        if not matched:
+            return []
+        lists = [self.postings(token_id) for token_id, _ in matched]
+        weights = [similarity * float(self.token_idf[token_id]) / query_weight for token_id, similarity in matched]
+        q_count = np.float32(len(set(q.split())))
+        limit_candidates = config.MODEL_NAME_MAX_CANDIDATES
+        candidates, coverage, selection = np.zeros(0, dtype=np.int32), np.zeros(0), np.zeros(0)
+        for i, positions in _chunks(lists):
+            if len(candidates) == limit_candidates and selection.min() >= sum(weights[i:]):
+                break # Best possible coverage of any name not scored yet
+            for earlier in lists[:i]:
+                positions = positions[~_contains(earlier, positions)]
+            covered = np.full(len(positions), weights[i])
+            for later, weight in zip(lists[i + 1:], weights[i + 1:]):
+                covered += weight * _contains(later, positions)
+            # Among equally covered names prefer those without many extra tokens (the closest names)
+            selected = covered * (q_count / np.maximum(self.token_counts[positions], q_count))
+            candidates = np.concatenate([candidates, positions])
+            coverage = np.concatenate([coverage, covered])
+            selection = np.concatenate([selection, selected])
+            if len(candidates) > limit_candidates:
+                best = _top_candidates(selection, candidates, limit_candidates)
+                candidates, coverage, selection = candidates[best], coverage[best], selection[best]
+
+        # Final score: coverage plus the trigram (Dice) similarity of the whole names
+        q_trigrams = _trigrams(q)
+        q_ids = np.sort(np.asarray([self.trigram_ids[t] for t in q_trigrams if t in self.trigram_ids], dtype=np.int32))
+        starts = self.name_trigram_offsets[candidates]
+        counts = self.name_trigram_offsets[candidates + 1] - starts
+        gather = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+        in_query = _contains(q_ids, self.name_trigrams[gather]) if len(q_ids) else np.zeros(len(gather), dtype=bool)
+        shared = np.bincount(np.repeat(np.arange(len(candidates)), counts), weights=in_query, minlength=len(candidates))
+        final = 0.6 * coverage + 0.4 * (2 * shared / (len(q_trigrams) + counts))
+        for pos, score in zip(candidates.tolist(), final.tolist()):
+            if pos not in scores:
+                if q in self.normalized[pos]:
+                    score += 0.1 # The old substring lookup would have matched this one
+                scores[pos] = min(score, 0.99)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(pos, round(score, 3)) for pos, score in ranked[:limit]]
+
+
+def _names_fingerprint(names):
+    digest = hashlib.sha256(b"model-names-v2")
+    for name in names:
+        digest.update(str(name).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def load_or_build_model_names(names, path=None):
+    """The saved model-name index if it was built from these names, else a freshly built (and saved) one."""
+    path = path or config.MODEL_NAME_INDEX_PATH
+    fingerprint = _names_fingerprint(names)
+    index = ModelNameIndex.load(path, fingerprint) if path else None
+    if index is not None:
+        return index
+    index = ModelNameIndex(names)
+    if path:
+        try:
+            index.save(path, fingerprint)
+        except OSError as e:
+            logger.warning("Could not save the model-name index: %s", e)
+    return index
+
+
+class CatalogIndex:
+    """Read-only query structures derived once from the catalog DataFrame at load time.
+
+    Prices are sorted once so a budget range is two binary searches, and personas are a uint16
+    bitmask column so a persona match is a single vectorized `&`.
+    """
+
+    def __init__(self, df, semantic=None, model_names=None):
+        self.df = df
+        if catalog_store.PERSONA_MASK_COLUMN not in df.columns and not df.empty:
+            catalog_store.add_encoded_columns(df)
+        prices = df['Price'].to_numpy(dtype=np.float64, na_value=np.nan) if 'Price' in df.columns else np.full(len(df), np.nan)
+        self.prices = prices
+        self.price_order = np.argsort(prices, kind='stable') # NaN prices sort last
+        self.sorted_prices = prices[self.price_order]
+        self.priced_count = int(np.count_nonzero(~np.isnan(prices)))
+        if catalog_store.PERSONA_MASK_COLUMN in df.columns:
+            self.persona_masks = df[catalog_store.PERSONA_MASK_COLUMN].to_numpy(dtype=np.uint16)
+        else:
+            self.persona_masks = np.zeros(len(df), dtype=np.uint16)
+        # Spec ratings as a (rows x 5) matrix of levels in [0, 1] (low=0, medium=0.5, high=1, unknown=0)
+        code_columns = [catalog_store.SPEC_CODE_COLUMNS[key] for key in spec_rules.LAP_SPEC_KEYS]
+        if all(column in df.columns for column in code_columns):
+            codes = df[code_columns].to_numpy(dtype=np.float32)
+            self.spec_levels = np.clip(codes, 0, None) / (len(spec_rules.SPEC_VALUES) - 1)
+        else:
+            self.spec_levels = np.zeros((len(df), len(code_columns)), dtype=np.float32)
+        self._column_values = {} # Column name -> list of Python values, materialized on first use
+        if model_names is None:
+            model_names = ModelNameIndex(df['Model Name'].tolist() if 'Model Name' in df.columns else [])
+        self.model_names = model_names
+        self._semantic = semantic
+        self._semantic_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def with_df(self, df):
+        """Index for a copy of the catalog with the same rows and texts (e.g. new prices), sharing the model-name and search indexes."""
+        return CatalogIndex(df, semantic=self._semantic, model_names=self.model_names)
+
+    def budget_positions(self, budget_min=None, budget_max=None):
+        """Row positions whose price lies within [budget_min, budget_max], in price order."""
+        if budget_min is None and budget_max is None:
+            return np.arange(len(self.df))
+        lo = 0 if budget_min is None else int(np.searchsorted(self.sorted_prices[:self.priced_count], budget_min, side='left'))
+        hi = self.priced_count if budget_max is None else int(np.searchsorted(self.sorted_prices[:self.priced_count], budget_max, side='right'))
+        return self.price_order[lo:max(lo, hi)]
+
+    def filter_positions(self, budget_min=None, budget_max=None, persona_mask=None):
+        """Row positions matching the budget and (if given) sharing at least one persona bit, in catalog order."""
+        positions = self.budget_positions(budget_min, budget_max)
+        if persona_mask is not None:
+            positions = positions[(self.persona_masks[positions] & np.uint16(persona_mask)) != 0]
+        return np.sort(positions)
+
+    def semantic_index(self):
+        """Free-text index over the laptop descriptions (semantic_index.py), memory-mapped or built on first use."""
+        if self._semantic is None:
+            with self._semantic_lock:
+                if self._semantic is None:
+                    self._semantic = semantic_index.load_or_build(self.df)
+        return self._semantic
+
+    def column_values(self, column):
+        """Python-native values of a column (as DataFrame.to_dict would produce), cached for record building."""
+        values = self._column_values.get(column)
+        if values is None:
+            values = self.df[column].to_numpy(dtype=object).tolist()
+            values = [v.item() if isinstance(v, np.generic) else v for v in values]
+            self._column_values[column] = values
+        return values
+
+    def records(self, positions, columns):
+        """Builds to_dict(orient='records')-style rows for the given positions without slicing the DataFrame."""
+        values = [self.column_values(column) for column in columns]
+        return [{column: column_values[pos] for column, column_values in zip(columns, values)} for pos in positions]
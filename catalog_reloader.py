@@ -0,0 +1,162 @@
+# catalog_reloader.py
+"""Hot reload of the laptop catalog while the chatbot keeps serving.
+
+A daemon thread checks the raw and preprocessed catalog files every config.CATALOG_RELOAD_INTERVAL
+seconds. A changed catalog is built on the side and swapped in whole with
+laptop_data_manager.publish_catalog, so tool calls already running finish on the snapshot they
+started with:
+- raw CSV with the same laptops and only new prices: a copy of the current DataFrame with the new
+  prices, indexed again for the budget search but sharing the model-name and search indexes;
+- raw CSV with other changes: incremental reprocessing, which classifies only new/changed descriptions;
+- preprocessed file written by another process: loaded as it is.
+"""
+import logging
+import os
+import threading
+import numpy as np
+import pandas as pd
+import config
+import metrics
+import catalog_store
+import laptop_data_manager
+
+logger = logging.getLogger(__name__)
+
+
+def _signature(path):
+    """(mtime, size) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _watched_signatures():
+    return {
+        "raw": _signature(config.LAPTOP_DATA_CSV),
+        "preprocessed": _signature(catalog_store.preprocessed_path()),
+    }
+
+
+def price_only_update(index, raw):
+    """New prices (float array in catalog order) if `raw` differs from the indexed catalog in prices only, else None.
+
+    The rows must have the same descriptions in the same order and every other raw column must be unchanged.
+    """
+    df = index.df
+    if 'Description' not in raw.columns or 'Price' not in raw.columns or 'Preprocess_Key' not in df.columns:
+        return None
+    raw = laptop_data_manager.convert_prices(raw).reset_index(drop=True)
+    if len(raw) != len(df):
+        return None
+    keys = [laptop_data_manager._preprocess_key(d) for d in raw['Description']]
+    if keys != df['Preprocess_Key'].tolist():
+        return None
+    current = df.reset_index(drop=True)
+    for column in raw.columns:
+        if column != 'Price' and (column not in current.columns or not raw[column].equals(current[column])):
+            return None
+    return raw['Price'].to_numpy(dtype=np.float64)
+
+
+class CatalogReloader:
+    """Watches the catalog files and publishes a rebuilt catalog when they change.
+
+    A change is applied once the file has stayed the same for one check, so a file that is still
+    being written is not loaded half-way.
+    """
+
+    def __init__(self, interval=config.CATALOG_RELOAD_INTERVAL):
+        self.interval = interval
+        self._loaded = _watched_signatures() # Files as of the published catalog
+        self._pending = self._loaded
+        self._lock = threading.Lock() # One reload at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="catalog-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self, settle=True):
+        """Reloads the catalog if a watched file changed. Returns the kind of reload, or None if nothing was published."""
+        with self._lock:
+            signatures = _watched_signatures()
+            if signatures == self._loaded:
+                self._pending = signatures
+                return None
+            if settle and signatures != self._pending:
+                self._pending = signatures # Changed since the last check: wait until it settles
+                return None
+            changed = self._loaded["raw"] != signatures["raw"]
+            try:
+                with metrics.span("catalog_step", step="reload"):
+                    kind = self._reload_raw() if changed else self._reload_preprocessed()
+            except Exception as e:
+                logger.exception("Catalog reload failed; still serving the previous catalog: %s", e)
+                kind = "error"
+            # Our own reload may have rewritten the preprocessed file, so take the signatures afterwards
+            self._loaded = self._pending = _watched_signatures()
+            if kind is None:
+                return None
+            metrics.inc("catalog_reloads_total", kind=kind)
+            return None if kind == "error" else kind
+
+    def _reload_raw(self):
+        current = laptop_data_manager.get_catalog_index()
+        raw = pd.read_csv(config.LAPTOP_DATA_CSV)
+        prices = price_only_update(current, raw) if current is not None and not current.df.empty else None
+        if prices is not None:
+            changed = int(np.count_nonzero(current.df['Price'].to_numpy(dtype=np.float64) != prices))
+            if not changed:
+                return None
+            df = current.df.copy() # Copy-on-write: readers of the current snapshot keep the old prices
+            df['Price'] = prices
+            version = laptop_data_manager.publish_catalog(df, current.with_df(df))
+            logger.info("Catalog v%d: updated %d price(s) from %s.", version, changed, config.LAPTOP_DATA_CSV)
+            try:
+                catalog_store.save_preprocessed(df)
+            except Exception as e:
+                logger.error("Error saving preprocessed data: %s", e)
+            return "prices"
+
+        df, index = laptop_data_manager.load_catalog(force_reprocess=True, incremental=True)
+        return self._publish(df, index, "full")
+
+    def _reload_preprocessed(self):
+        df, index = laptop_data_manager.load_catalog(force_reprocess=False)
+        return self._publish(df, index, "preprocessed")
+
+    def _publish(self, df, index, kind):
+        if index is None or df.empty:
+            logger.error("Catalog reload produced no laptops; still serving the previous catalog.")
+            return "error"
+        index.semantic_index() # Load the search index before readers can reach it
+        version = laptop_data_manager.publish_catalog(df, index)
+        logger.info("Catalog v%d: reloaded %d laptops (%s).", version, len(df), kind)
+        return kind
+
+
+_reloader = None
+
+def start_reloader(interval=None):
+    """Starts the shared background reloader unless hot reload is disabled; returns it (or None)."""
+    global _reloader
+    interval = interval or config.CATALOG_RELOAD_INTERVAL
+    if not interval:
+        return None
+    if _reloader is None:
+        _reloader = CatalogReloader(interval).start()
+    return _reloader
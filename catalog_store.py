@@ -0,0 +1,190 @@
+# catalog_store.py
+import ast
+import contextlib
+import json
+import logging
+import os
+import threading
+import numpy as np
+import pandas as pd
+import config
+import spec_rules
+
+logger = logging.getLogger(__name__)
+
+# Spec ratings are stored as one int8 column per spec key
+SPEC_CODE_COLUMNS = {key: "Spec_" + key.replace(" ", "_") for key in spec_rules.LAP_SPEC_KEYS}
+SPEC_CODES = {value: code for code, value in enumerate(spec_rules.SPEC_VALUES)} # low=0, medium=1, high=2
+SPEC_UNKNOWN = -1 # Classification failed ("unknown"/"error")
+SPEC_MISSING = -2 # Row was never classified (no description)
+
+# Personas are stored as a uint16 bitmask over config.PERSONA_VALUES
+PERSONA_BITS = {persona: 1 << i for i, persona in enumerate(config.PERSONA_VALUES)}
+PERSONA_MASK_COLUMN = "Persona_Mask"
+
+# Bookkeeping columns that are never shown to the user or the LLM
+INTERNAL_COLUMNS = ["Preprocess_Key"] + list(SPEC_CODE_COLUMNS.values()) + [PERSONA_MASK_COLUMN]
+
+
+@contextlib.contextmanager
+def replacing(path):
+    """Yields a temporary path next to `path`, moved over `path` once the block has written it.
+
+    Catalog files are replaced, never rewritten in place: a published snapshot may still read (or
+    memory-map) the old file, and a reload must not see a half-written one.
+    """
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+def persona_mask(personas):
+    """Bitmask for a list of persona names (case-insensitive); names outside config.PERSONA_VALUES are ignored."""
+    mask = 0
+    if isinstance(personas, (list, tuple, np.ndarray)):
+        for persona in personas:
+            if isinstance(persona, str):
+                mask |= PERSONA_BITS.get(persona.lower(), 0)
+    return mask
+
+def personas_from_mask(mask):
+    return [persona for persona, bit in PERSONA_BITS.items() if mask & bit]
+
+def add_encoded_columns(df):
+    """Adds the int8 spec code columns and the Persona_Mask column derived from the object columns.
+
+    The object columns are then rebuilt from the codes (personas in config order, unknown personas
+    and spec values dropped to what the codes can hold), so a catalog reads back the same from the
+    Parquet cache and from the CSV export.
+    """
+    specs = df['Specification_Ratings'] if 'Specification_Ratings' in df.columns else pd.Series([{}] * len(df), index=df.index)
+    for key, column in SPEC_CODE_COLUMNS.items():
+        codes = [
+            SPEC_CODES.get(s.get(key), SPEC_UNKNOWN) if isinstance(s, dict) and s else SPEC_MISSING
+            for s in specs
+        ]
+        df[column] = np.asarray(codes, dtype=np.int8)
+    personas = df['Persona'] if 'Persona' in df.columns else pd.Series([[]] * len(df), index=df.index)
+    df[PERSONA_MASK_COLUMN] = np.asarray([persona_mask(p) for p in personas], dtype=np.uint16)
+    if 'Specification_Ratings' in df.columns:
+        _decode_specs(df)
+    if 'Persona' in df.columns:
+        _decode_personas(df)
+    return df
+
+def _decode_specs(df):
+    """Rebuilds Specification_Ratings from the spec code columns.
+
+    Work is done once per distinct spec combination (at most a few hundred), then broadcast with a
+    vectorized take, so rows with the same ratings share the same dict.
+    """
+    code_columns = [SPEC_CODE_COLUMNS[key] for key in spec_rules.LAP_SPEC_KEYS]
+    codes = df[code_columns].to_numpy(dtype=np.int8)
+    unique_codes, inverse = np.unique(codes, axis=0, return_inverse=True)
+    values = {code: value for value, code in SPEC_CODES.items()}
+    decoded_specs = np.empty(len(unique_codes), dtype=object)
+    for i, row in enumerate(unique_codes):
+        if (row == SPEC_MISSING).all():
+            decoded_specs[i] = {}
+        else:
+            decoded_specs[i] = {key: values.get(int(code), "unknown") for key, code in zip(spec_rules.LAP_SPEC_KEYS, row)}
+    df['Specification_Ratings'] = pd.Series(decoded_specs[inverse.reshape(-1)] if len(df) else [], index=df.index, dtype=object)
+
+def _decode_personas(df):
+    """Rebuilds Persona from the Persona_Mask column, once per distinct mask."""
+    masks = df[PERSONA_MASK_COLUMN].to_numpy()
+    unique_masks, inverse = np.unique(masks, return_inverse=True)
+    decoded_personas = np.empty(len(unique_masks), dtype=object)
+    for i, mask in enumerate(unique_masks):
+        decoded_personas[i] = personas_from_mask(int(mask))
+    df['Persona'] = pd.Series(decoded_personas[inverse.reshape(-1)] if len(df) else [], index=df.index, dtype=object)
+
+def _decode_columns(df):
+    """Rebuilds Specification_Ratings/Persona from the encoded columns."""
+    _decode_specs(df)
+    _decode_personas(df)
+    return df
+
+
+def parquet_available():
+    try:
+        import pyarrow # noqa: F401 -- optional dependency for the binary cache
+        return True
+    except ImportError:
+        return False
+
+def _use_parquet():
+    return config.PREPROCESSED_DATA_FORMAT == "parquet" and parquet_available()
+
+
+def _parse_object_cell(val, default):
+    if not isinstance(val, str):
+        return val if isinstance(val, (dict, list)) else default
+    try:
+        return json.loads(val)
+    except json.JSONDecodeError:
+        pass
+    try:
+        # Older exports wrote Python reprs (single quotes, apostrophes inside values)
+        return ast.literal_eval(val)
+    except (ValueError, SyntaxError):
+        return default
+
+def _read_csv(path):
+    df = pd.read_csv(path)
+    if 'Specification_Ratings' in df.columns:
+        df['Specification_Ratings'] = pd.Series([_parse_object_cell(v, {}) for v in df['Specification_Ratings']], index=df.index, dtype=object)
+    if 'Persona' in df.columns:
+        df['Persona'] = pd.Series([_parse_object_cell(v, []) for v in df['Persona']], index=df.index, dtype=object)
+    return add_encoded_columns(df)
+
+def export_csv(df, path=config.PREPROCESSED_LAPTOP_DATA_CSV):
+    """Writes the human-readable CSV export; object columns are written as JSON."""
+    out = df.drop(columns=list(SPEC_CODE_COLUMNS.values()) + [PERSONA_MASK_COLUMN], errors='ignore')
+    for column in ('Specification_Ratings', 'Persona'):
+        if column in out.columns:
+            out[column] = [json.dumps(v) for v in out[column]]
+    with replacing(path) as tmp:
+        out.to_csv(tmp, index=False)
+
+
+def save_preprocessed(df):
+    """Saves the preprocessed catalog in the configured format (plus the CSV export if enabled). Returns the paths written."""
+    df = add_encoded_columns(df.copy())
+    written = []
+    if _use_parquet():
+        typed = df.drop(columns=['Specification_Ratings', 'Persona'])
+        with replacing(config.PREPROCESSED_LAPTOP_DATA_PARQUET) as tmp:
+            typed.to_parquet(tmp, index=False)
+        written.append(config.PREPROCESSED_LAPTOP_DATA_PARQUET)
+    elif config.PREPROCESSED_DATA_FORMAT == "parquet":
+        logger.warning("pyarrow is not installed; saving preprocessed data as CSV only.")
+    if config.EXPORT_PREPROCESSED_CSV or not written:
+        export_csv(df)
+        written.append(config.PREPROCESSED_LAPTOP_DATA_CSV)
+    return written
+
+def preprocessed_exists():
+    return (_use_parquet() and os.path.exists(config.PREPROCESSED_LAPTOP_DATA_PARQUET)) or \
+        os.path.exists(config.PREPROCESSED_LAPTOP_DATA_CSV)
+
+def preprocessed_path():
+    """The file load_preprocessed() reads the catalog from (which need not exist yet)."""
+    return config.PREPROCESSED_LAPTOP_DATA_PARQUET if _use_parquet() else config.PREPROCESSED_LAPTOP_DATA_CSV
+
+def load_preprocessed():
+    """Loads the preprocessed catalog, preferring the memory-mapped Parquet cache over the CSV export.
+
+    Returns (DataFrame, path) or (None, None) if nothing has been preprocessed yet.
+    """
+    if _use_parquet() and os.path.exists(config.PREPROCESSED_LAPTOP_DATA_PARQUET):
+        df = pd.read_parquet(config.PREPROCESSED_LAPTOP_DATA_PARQUET, memory_map=True)
+        return _decode_columns(df), config.PREPROCESSED_LAPTOP_DATA_PARQUET
+    if os.path.exists(config.PREPROCESSED_LAPTOP_DATA_CSV):
+        return _read_csv(config.PREPROCESSED_LAPTOP_DATA_CSV), config.PREPROCESSED_LAPTOP_DATA_CSV
+    return None, None
@@ -0,0 +1,314 @@
+# chat_server.py
+"""HTTP serving mode: many concurrent shoppers on one process, sharing one read-only catalog.
+
+    python chat_server.py --port 8080
+    python chat_server.py --fake-llm   # in-process fake model, for load tests
+
+Endpoints (HTTP/1.1, keep-alive):
+    POST /chat   {"session_id": "...", "message": "..."} -> text/event-stream, streamed as the reply is generated:
+                 data: {"session_id": "..."}  then  data: {"token": "..."} ...  then  data: {"done": true, "reply": "...", "ended": false}
+    GET /health  {"status", "sessions", "catalog_rows", "cpu_seconds", "uptime_seconds"}
+    GET /metrics Prometheus text format: LLM/tool/turn latency histograms, token usage, cache hit counts (metrics.py)
+
+HTTP/1.0 clients get the /chat event stream without chunk framing, ended by closing the connection.
+Omitting session_id starts a new session; its id comes back in the first event. Sessions live in a
+bounded LRU store and are dropped after config.SESSION_TTL_SECONDS of inactivity. The catalog and its
+indexes are loaded once (laptop_data_manager) and only read by the tools, so all sessions share them.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+import config
+import laptop_data_manager
+import catalog_reloader
+import metrics
+from async_chatbot import AsyncChatEngine, AsyncConversation
+
+logger = logging.getLogger(__name__)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class _Session:
+    def __init__(self, conversation, now):
+        self.conversation = conversation
+        self.last_used = now
+        self.lock = asyncio.Lock() # Turns of one session run one at a time
+
+
+class SessionStore:
+    """Conversation state per session id, bounded by `max_sessions` (LRU) and `ttl_seconds` of inactivity."""
+
+    def __init__(self, engine, max_sessions=config.MAX_SESSIONS, ttl_seconds=config.SESSION_TTL_SECONDS, clock=time.monotonic):
+        self.engine = engine
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._sessions = OrderedDict() # Least recently used first
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get_or_create(self, session_id=None):
+        """Returns (session_id, session); unknown or expired ids get a fresh conversation under the same id."""
+        now = self.clock()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None and now - session.last_used > self.ttl_seconds:
+            del self._sessions[session_id]
+            self.expired += 1
+            session = None
+        if session is None:
+            session_id = session_id or uuid.uuid4().hex
+            session = _Session(AsyncConversation(self.engine), now)
+            self._sessions[session_id] = session
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        else:
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+        return session_id, session
+
+    def remove(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def sweep(self):
+        """Drops sessions idle for longer than the TTL; returns how many were dropped."""
+        cutoff = self.clock() - self.ttl_seconds
+        dropped = 0
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break # Ordered by last use, so the rest are newer
+            del self._sessions[session_id]
+            dropped += 1
+        self.expired += dropped
+        return dropped
+
+
+class ChatServer:
+    """Minimal asyncio HTTP/1.1 server in front of a SessionStore."""
+
+    def __init__(self, engine=None, store=None):
+        self.engine = engine or AsyncChatEngine()
+        self.store = store or SessionStore(self.engine)
+        self.started = time.monotonic()
+        self._server = None
+        self._sweeper = None
+
+    async def start(self, host=config.SERVER_HOST, port=config.SERVER_PORT):
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self._sweeper = asyncio.create_task(self._sweep_sessions())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _sweep_sessions(self):
+        while True:
+            await asyncio.sleep(config.SESSION_SWEEP_SECONDS)
+            self.store.sweep()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, version, headers, body = request
+                if isinstance(body, int): # Error status while reading the request
+                    await _send_json(writer, body, {"error": _REASONS[body]}, keep_alive=False)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if path == "/chat" and method == "POST":
+                    # HTTP/1.0 clients cannot decode chunked bodies: stream unframed and close the connection after it
+                    chunked = version != "HTTP/1.0"
+                    keep_alive = keep_alive and chunked
+                    await self._chat(writer, body, keep_alive, chunked)
+                elif path == "/health" and method == "GET":
+                    await _send_json(writer, 200, self.health(), keep_alive)
+                elif path == "/metrics" and method == "GET":
+                    await _send_body(writer, 200, "text/plain; version=0.0.4", self.metrics().encode("utf-8"), keep_alive)
+                elif path in ("/chat", "/health", "/metrics"):
+                    await _send_json(writer, 405, {"error": _REASONS[405]}, keep_alive)
+                else:
+                    await _send_json(writer, 404, {"error": _REASONS[404]}, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _chat(self, writer, body, keep_alive, chunked=True):
+        session_id, message, error = _parse_chat_request(body)
+        if error:
+            await _send_json(writer, 400, {"error": error}, keep_alive)
+            return
+
+        session_id, session = self.store.get_or_create(session_id)
+        _write_head(writer, 200, "text/event-stream", keep_alive, {"Cache-Control": "no-cache", "X-Session-Id": session_id}, chunked=chunked)
+        _write_event(writer, {"session_id": session_id}, chunked)
+
+        def on_token(token):
+            _write_event(writer, {"token": token}, chunked)
+
+        async with session.lock:
+            reply = await session.conversation.send(message, on_token)
+            session.last_used = self.store.clock()
+        if session.conversation.ended:
+            self.store.remove(session_id)
+        _write_event(writer, {"done": True, "reply": reply, "ended": session.conversation.ended}, chunked)
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    def health(self):
+        index = laptop_data_manager.get_catalog_index()
+        return {
+            "status": "ok",
+            "sessions": len(self.store),
+            "sessions_created": self.store.created,
+            "sessions_evicted": self.store.evicted,
+            "sessions_expired": self.store.expired,
+            "catalog_rows": len(index) if index is not None else 0,
+            "cpu_seconds": round(time.process_time(), 3),
+            "uptime_seconds": round(time.monotonic() - self.started, 3),
+        }
+
+    def metrics(self):
+        """Prometheus text: the process-wide metrics plus this server's session gauges."""
+        metrics.set_gauge("sessions", len(self.store))
+        for event in ("created", "evicted", "expired"):
+            metrics.set_gauge("sessions_total", getattr(self.store, event), event=event)
+        return metrics.render_prometheus()
+
+
+def _parse_chat_request(body):
+    """(session_id, message, error) for a /chat body; `error` is the 400 message for a bad request, else None."""
+    usage = 'Expected a JSON body like {"session_id": "...", "message": "..."}.'
+    try:
+        payload = json.loads(body or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None, "", usage
+    if not isinstance(payload, dict):
+        return None, "", "The request body must be a JSON object. " + usage
+    session_id = payload.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        return None, "", "session_id must be a string (omit it to start a new session)."
+    message = str(payload.get("message") or "").strip()
+    if not message:
+        return None, "", usage
+    return session_id, message, None
+
+async def _read_request(reader):
+    """Reads one request; returns (method, path, version, headers, body) with an int status as body on bad input, or None at EOF."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        return "", "", "", {}, 413
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3:
+        return "", "", "", {}, 400
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    method, path, version = parts[0].upper(), parts[1].split("?", 1)[0].rstrip("/") or "/", parts[2].upper()
+    if version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive":
+        headers["connection"] = "close"
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        return method, path, version, headers, 400
+    if length < 0:
+        return method, path, version, headers, 400
+    if length > config.MAX_REQUEST_BYTES:
+        return method, path, version, headers, 413
+    body = await reader.readexactly(length) if length else b""
+    return method, path, version, headers, body
+
+def _write_head(writer, status, content_type, keep_alive, extra_headers=None, content_length=None, chunked=True):
+    """Status line and headers; without a content length the body is chunked, or ends with the connection if not `chunked`."""
+    headers = [f"HTTP/1.1 {status} {_REASONS[status]}", f"Content-Type: {content_type}",
+               f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if content_length is None:
+        if chunked:
+            headers.append("Transfer-Encoding: chunked")
+    else:
+        headers.append(f"Content-Length: {content_length}")
+    headers.extend(f"{name}: {value}" for name, value in (extra_headers or {}).items())
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1"))
+
+def _write_event(writer, event, chunked=True):
+    """Writes one server-sent event as its own HTTP chunk (or as it is, unframed), so the client sees it immediately."""
+    data = f"data: {json.dumps(event)}\n\n".encode("utf-8")
+    writer.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+
+async def _send_body(writer, status, content_type, body, keep_alive):
+    _write_head(writer, status, content_type, keep_alive, content_length=len(body))
+    writer.write(body)
+    await writer.drain()
+
+async def _send_json(writer, status, payload, keep_alive):
+    await _send_body(writer, status, "application/json", json.dumps(payload).encode("utf-8"), keep_alive)
+
+
+async def serve(host=config.SERVER_HOST, port=config.SERVER_PORT, client=None):
+    """Loads the shared catalog, then serves until cancelled."""
+    print("Initializing Laptop Advisor server...")
+    await asyncio.to_thread(laptop_data_manager.initialize_data, config.REPROCESS_DATA)
+    df = laptop_data_manager.get_laptop_dataframe()
+    if df is None or df.empty:
+        logger.error("Exiting: Laptop data could not be loaded or processed.")
+        return
+    laptop_data_manager.get_catalog_index() # Build the shared indexes before the first request
+    catalog_reloader.start_reloader() # Pick up catalog edits without dropping sessions
+
+    server = ChatServer(AsyncChatEngine(client))
+    bound_port = await server.start(host, port)
+    print(f"Laptop Advisor server listening on http://{host}:{bound_port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Laptop Advisor chatbot over HTTP.")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT, help="0 picks a free port")
+    parser.add_argument("--fake-llm", action="store_true", help="Answer with the in-process fake model (openai_stub_server.FakeAsyncClient)")
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="Fake model: seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Fake model: seconds between tokens")
+    args = parser.parse_args()
+    metrics.configure_logging()
+
+    client = None
+    if args.fake_llm:
+        from openai_stub_server import FakeAsyncClient
+        client = FakeAsyncClient(args.first_token_delay, args.token_delay)
+    try:
+        asyncio.run(serve(args.host, args.port, client))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,137 @@
 # chatbot_functions.py
-import json
-import pandas as pd
 import laptop_data_manager
+import catalog_store
+import ranking
+import result_encoder
 import config
 
-def get_laptop_info(model_name: str):
-    """Retrieves detailed information for a specific laptop model."""
-    df = laptop_data_manager.get_laptop_dataframe()
-    if df is None or df.empty:
-        return json.dumps({"error": "Laptop data not loaded or is empty."})
-    
-    laptop_series = df[df['Model Name'].str.contains(model_name, case=False, na=False)]
-    if not laptop_series.empty:
-        # Convert all relevant data to dict, handle NaN
-        laptop_details = laptop_series.iloc[0].where(pd.notna(laptop_series.iloc[0]), None).to_dict()
-        return json.dumps({"status": "success", "data": laptop_details})
-    else:
-        return json.dumps({"status": "not_found", "message": f"Sorry, I couldn't find information for a laptop model like '{model_name}'."})
+# Rankings computed by recommend_laptops_by_criteria, reused when the user pages with `offset`
+_ranking_cache = ranking.RankingCache()
+
+# Columns returned per laptop by recommend_laptops_by_criteria and search_laptops, kept concise
+RESULT_COLUMNS = ['Brand', 'Model Name', 'Price', 'RAM Size', 'Graphics Processor', 'Persona', 'Description']
+
+def _get_laptop_info(model_name: str):
+    """Retrieves detailed information for a specific laptop model (result as a dict)."""
+    index = laptop_data_manager.get_catalog_index()
+    if index is None or index.df.empty:
+        return {"error": "Laptop data not loaded or is empty."}
+    df = index.df
 
-def recommend_laptops_by_criteria(budget_min: int = None, budget_max: int = None, personas: list = None):
-    """Recommends laptops based on budget and/or personas."""
-    df = laptop_data_manager.get_laptop_dataframe()
-    if df is None or df.empty:
-        return json.dumps({"error": "Laptop data not loaded or is empty."})
+    ranked = [
+        (pos, score) for pos, score in index.model_names.search(model_name, limit=config.MODEL_NAME_MATCH_LIMIT)
+        if score >= config.MODEL_NAME_MIN_SCORE
+    ]
+    if ranked:
+        # Full details for the best match, handle NaN
+        detail_cols = [col for col in df.columns if col not in catalog_store.INTERNAL_COLUMNS]
+        laptop_details = index.records([ranked[0][0]], detail_cols)[0]
+        laptop_details = {k: (None if isinstance(v, float) and v != v else v) for k, v in laptop_details.items()}
+        summary_cols = [col for col in ('Brand', 'Model Name', 'Price') if col in df.columns]
+        matches = [dict(record, score=score) for record, (_, score) in zip(index.records([pos for pos, _ in ranked], summary_cols), ranked)]
+        return {"status": "success", "data": laptop_details, "matches": matches}
+    else:
+        return {"status": "not_found", "message": f"Sorry, I couldn't find information for a laptop model like '{model_name}'."}
 
-    filtered_df = df.copy()
-    
-    if budget_min is not None:
-        filtered_df = filtered_df[filtered_df['Price'] >= budget_min]
-    if budget_max is not None:
-        filtered_df = filtered_df[filtered_df['Price'] <= budget_max]
+def _recommend_laptops_by_criteria(budget_min: int = None, budget_max: int = None, personas: list = None, offset: int = 0):
+    """Recommends the best-ranked laptops for a budget and/or personas; `offset` pages through the ranking (result as a dict)."""
+    index = laptop_data_manager.get_catalog_index()
+    if index is None or index.df.empty:
+        return {"error": "Laptop data not loaded or is empty."}
+    df = index.df
 
+    persona_mask = None
     if personas and isinstance(personas, list) and len(personas) > 0:
-        user_personas_lower = [p.lower() for p in personas]
-        def match_personas(laptop_persona_list):
-            if isinstance(laptop_persona_list, list): # Ensure it's a list
-                return any(p_item.lower() in user_personas_lower for p_item in laptop_persona_list if isinstance(p_item, str))
-            return False
-        
-        # Ensure 'Persona' column exists and apply filter
-        if 'Persona' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['Persona'].apply(match_personas)]
-        else: # Should not happen if preprocessing is correct
-            return json.dumps({"status":"error", "message":"Persona data is missing."})
-
-
-    if not filtered_df.empty:
-        # Select a subset of columns for recommendation to keep it concise
-        recommendation_cols = ['Brand', 'Model Name', 'Price', 'RAM Size', 'Graphics Processor', 'Persona', 'Description']
+        # Ensure 'Persona' column exists before filtering on it
+        if 'Persona' not in df.columns: # Should not happen if preprocessing is correct
+            return {"status":"error", "message":"Persona data is missing."}
+        persona_mask = catalog_store.persona_mask(personas)
+
+    cache_key = (budget_min, budget_max, persona_mask, tuple(sorted(p.lower() for p in personas or [] if isinstance(p, str))))
+    cached = _ranking_cache.get(index, cache_key)
+    if cached is not None:
+        positions, scores = cached
+    else:
+        # Budget range via binary search on the sorted prices, persona match via the bitmask column
+        positions = index.filter_positions(budget_min, budget_max, persona_mask)
+        scores = ranking.score_candidates(index, positions, budget_min, budget_max, persona_mask, personas)
+        _ranking_cache.put(index, cache_key, positions, scores)
+
+    if len(positions) > 0:
+        offset = max(int(offset or 0), 0)
+        page_positions, page_scores = ranking.top_k(positions, scores, offset, config.RECOMMENDATION_PAGE_SIZE)
+        if len(page_positions) == 0:
+            return {"status": "not_found", "count": len(positions), "message": f"There are only {len(positions)} matching laptops; no more results after offset {offset}."}
         # Ensure selected columns exist
-        existing_cols = [col for col in recommendation_cols if col in filtered_df.columns]
-        recommendations = filtered_df[existing_cols].head(5).to_dict(orient='records')
-        return json.dumps({"status": "success", "count": len(filtered_df), "data": recommendations})
+        existing_cols = [col for col in RESULT_COLUMNS if col in df.columns]
+        recommendations = [
+            dict(record, match_score=round(float(score), 3))
+            for record, score in zip(index.records(page_positions, existing_cols), page_scores)
+        ]
+        next_offset = offset + len(page_positions)
+        return {
+            "status": "success", "count": len(positions), "offset": offset,
+            "next_offset": next_offset if next_offset < len(positions) else None,
+            "data": recommendations,
+        }
     else:
-        return json.dumps({"status": "not_found", "message": "Sorry, no laptops found matching your criteria. You might want to broaden your search."})
+        return {"status": "not_found", "message": "Sorry, no laptops found matching your criteria. You might want to broaden your search."}
+
+def _search_laptops(query: str, budget_min: int = None, budget_max: int = None, personas: list = None, offset: int = 0):
+    """Finds the laptops whose description best matches a free-text need, within the budget/personas (result as a dict)."""
+    index = laptop_data_manager.get_catalog_index()
+    if index is None or index.df.empty:
+        return {"error": "Laptop data not loaded or is empty."}
+    if not isinstance(query, str) or not query.strip():
+        return {"status": "error", "message": "A search query is required."}
+
+    persona_mask = catalog_store.persona_mask(personas) if personas and isinstance(personas, list) else None
+    positions = index.filter_positions(budget_min, budget_max, persona_mask)
+    if len(positions) > 0:
+        # Cosine similarity of the query to the filtered laptops only
+        scores = index.semantic_index().scores(query, positions)
+        relevant = scores >= config.SEMANTIC_MIN_SCORE
+        positions, scores = positions[relevant], scores[relevant]
+    if len(positions) == 0:
+        return {"status": "not_found", "message": f"Sorry, no laptops matching '{query}' were found within your criteria. You might want to rephrase or broaden your search."}
+
+    offset = max(int(offset or 0), 0)
+    page_positions, page_scores = ranking.top_k(positions, scores, offset, config.RECOMMENDATION_PAGE_SIZE)
+    if len(page_positions) == 0:
+        return {"status": "not_found", "count": len(positions), "message": f"There are only {len(positions)} matching laptops; no more results after offset {offset}."}
+    existing_cols = [col for col in RESULT_COLUMNS if col in index.df.columns]
+    results = [
+        dict(record, relevance=round(float(score), 3))
+        for record, score in zip(index.records(page_positions, existing_cols), page_scores)
+    ]
+    next_offset = offset + len(page_positions)
+    return {
+        "status": "success", "count": len(positions), "offset": offset,
+        "next_offset": next_offset if next_offset < len(positions) else None,
+        "data": results,
+    }
+
+def _end_conversation():
+    """Signals the end of the conversation (result as a dict)."""
+    return {"status": "ended", "message": "Okay, ending the conversation. If you need help again, just ask. Goodbye!"}
+
+
+# JSON-string versions of the tools, encoded as they are sent to the model
+def get_laptop_info(model_name: str):
+    """Retrieves detailed information for a specific laptop model."""
+    return result_encoder.encode_tool_result("get_laptop_info", _get_laptop_info(model_name))
+
+def recommend_laptops_by_criteria(budget_min: int = None, budget_max: int = None, personas: list = None, offset: int = 0):
+    """Recommends the best-ranked laptops for a budget and/or personas; `offset` pages through the ranking."""
+    return result_encoder.encode_tool_result("recommend_laptops_by_criteria", _recommend_laptops_by_criteria(budget_min, budget_max, personas, offset))
+
+def search_laptops(query: str, budget_min: int = None, budget_max: int = None, personas: list = None, offset: int = 0):
+    """Finds the laptops whose description best matches a free-text need, within the budget/personas."""
+    return result_encoder.encode_tool_result("search_laptops", _search_laptops(query, budget_min, budget_max, personas, offset))
 
 def end_conversation():
     """Signals the end of the conversation."""
-    return json.dumps({"status": "ended", "message": "Okay, ending the conversation. If you need help again, just ask. Goodbye!"})
+    return result_encoder.encode_tool_result("end_conversation", _end_conversation())
 
 
 def get_available_functions_map():
@@ -65,9 +139,19 @@ def get_available_functions_map():
     return {
         "get_laptop_info": get_laptop_info,
         "recommend_laptops_by_criteria": recommend_laptops_by_criteria,
+        "search_laptops": search_laptops,
         "end_conversation": end_conversation,
     }
 
+def get_tool_implementations_map():
+    """Returns a map of function names to the dict-returning implementations used by tool_dispatch."""
+    return {
+        "get_laptop_info": _get_laptop_info,
+        "recommend_laptops_by_criteria": _recommend_laptops_by_criteria,
+        "search_laptops": _search_laptops,
+        "end_conversation": _end_conversation,
+    }
+
 def get_tools_definition():
     """Returns the list of tool definitions for the OpenAI API."""
     return [
@@ -75,7 +159,7 @@ def get_tools_definition():
             "type": "function",
             "function": {
                 "name": "get_laptop_info",
-                "description": "Use this function when the user wants to know about a specific product (laptop model).",
+                "description": "Use this function when the user wants to know about a specific product (laptop model). Returns details for the best match plus a ranked list of close matches with scores.",
                 "parameters": {
                     "type": "object",
                     "properties": {
@@ -89,7 +173,7 @@ def get_tools_definition():
             "type": "function",
             "function": {
                 "name": "recommend_laptops_by_criteria",
-                "description": "Use this function when the user wants to buy a product or asks for laptop recommendations. Capture their budget and persona preferences if provided.",
+                "description": "Use this function when the user wants to buy a product or asks for laptop recommendations. Capture their budget and persona preferences if provided. Results are ranked best first; when the user asks to see more, call it again with the same criteria and `offset` set to the `next_offset` of the previous result.",
                 "parameters": {
                     "type": "object",
                     "properties": {
@@ -99,11 +183,32 @@ def get_tools_definition():
                             "type": "array", "items": {"type": "string", "enum": config.PERSONA_VALUES},
                             "description": f"A list of user personas. Available options: {config.PERSONA_VALUES}. Optional."
                         },
+                        "offset": {"type": "integer", "description": "Number of top-ranked results to skip, for showing more results (use `next_offset` from the previous call). Optional, defaults to 0."},
                     },
                     "required": [], # Parameters are optional
                 },
             },
         },
+        {
+            "type": "function",
+            "function": {
+                "name": "search_laptops",
+                "description": "Use this function when the user describes what they need in their own words (e.g. 'thin laptop for video editing with long battery life'). Searches the laptop descriptions and returns the best matches best first, optionally within a budget and personas. Page with `offset` like recommend_laptops_by_criteria.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string", "description": "The user's needs and preferences in free text."},
+                        "budget_max": {"type": "integer", "description": "The maximum budget (e.g., 80000). Optional."},
+                        "personas": {
+                            "type": "array", "items": {"type": "string", "enum": config.PERSONA_VALUES},
+                            "description": f"A list of user personas. Available options: {config.PERSONA_VALUES}. Optional."
+                        },
+                        "offset": {"type": "integer", "description": "Number of top results to skip, for showing more results (use `next_offset` from the previous call). Optional, defaults to 0."},
+                    },
+                    "required": ["query"],
+                },
+            },
+        },
         {
             "type": "function",
             "function": {
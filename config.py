@@ -1,18 +1,106 @@
 OPENAI_API_KEY = "****"
+OPENAI_BASE_URL = None # None = api.openai.com; e.g. "http://127.0.0.1:8765/v1" for the local stub (openai_stub_server.py)
+LLM_BACKEND = "openai" # "openai", "record" (openai + save every exchange), "replay" (answer from the recording) or "fake" (offline rules)
+LLM_RECORDING_PATH = 'llm_recording.jsonl' # Written by the "record" backend, read by "replay"
+LLM_REPLAY_MISSING = "error" # Replay of a request not in the recording: "error" or "fake" (answer it with the fake backend)
 
 # File Paths
 LAPTOP_DATA_CSV = 'laptop_data.csv'
-PREPROCESSED_LAPTOP_DATA_CSV = 'laptops_preprocessed.csv' # For caching
+PREPROCESSED_LAPTOP_DATA_CSV = 'laptops_preprocessed.csv' # Human-readable export of the preprocessed data
+PREPROCESSED_LAPTOP_DATA_PARQUET = 'laptops_preprocessed.parquet' # Typed binary cache, loaded at startup
+LLM_CACHE_PATH = 'llm_cache.sqlite3' # Persistent cache of preprocessing LLM responses
+SEMANTIC_INDEX_PATH = 'laptops_semantic_index.npy' # Memory-mapped description vectors (metadata in the .json next to it)
+MODEL_NAME_INDEX_PATH = 'laptops_model_names.npz' # Prebuilt model-name index, loaded at startup instead of rebuilt (None to always rebuild)
 
 # Model IDs
 HELPER_MODEL_ID = "gpt-3.5-turbo"  # Model for product_map_layer and persona_tag
 CHATBOT_MODEL_ID = "gpt-3.5-turbo" # Model for the main chatbot logic
 
 # Data Processing
+PREPROCESSED_DATA_FORMAT = "parquet" # "parquet" (needs pyarrow, falls back to CSV without it) or "csv"
+EXPORT_PREPROCESSED_CSV = True # Also write laptops_preprocessed.csv next to the binary cache
 REPROCESS_DATA = False # Set to True to force reprocessing of CSV data
+CATALOG_RELOAD_INTERVAL = 10 # Seconds between checks of the catalog files for changes to hot-reload (None disables, catalog_reloader.py)
+FAST_START = True # Show the greeting at once and load the catalog/client in the background (main_chatbot.py)
+PREPROCESS_MAX_WORKERS = 8 # Concurrent LLM requests during preprocessing (1 = serial)
+PREPROCESS_REQUESTS_PER_MINUTE = 3500 # Request rate limit for preprocessing calls (None to disable)
+PREPROCESS_TOKENS_PER_MINUTE = 90000 # Estimated token rate limit for preprocessing calls (None to disable)
+PREPROCESS_MAX_RETRIES = 5 # Retries for transient API errors (rate limits, timeouts, 5xx)
+PREPROCESS_BACKOFF_SECONDS = 1.0 # Initial backoff delay, doubled on every retry
+PREPROCESS_PROGRESS_EVERY = 50 # Print a progress line every N processed laptops
+PREPROCESS_BATCH_SIZE = 1 # Laptops classified per _product_map_layer request (1 = one request per laptop)
+INCREMENTAL_REPROCESS = False # When reprocessing, only classify new/changed descriptions and reuse the rest
+PREPROCESS_PROMPT_VERSION = "1" # Bump whenever the _product_map_layer/_persona_tag prompts change
+# Spec/persona classifier: "llm" (LLM only), "hybrid" (local rules first, LLM only for fields the
+# rules cannot decide, personas from the precomputed lookup table) or "audit" (LLM output, plus a
+# report of how often the local rules agree with it)
+CLASSIFIER_MODE = "llm"
+
+# LLM Response Cache (preprocessing calls only; they run at temperature 0)
+LLM_CACHE_ENABLED = True # Set to False to always call the API
+LLM_CACHE_MAX_ENTRIES = 200000 # Least recently used responses are evicted beyond this
 
 # Chatbot Settings
-MAX_HISTORY_MESSAGES = 15
+MAX_HISTORY_MESSAGES = 15 # Upper bound on history messages; whole exchanges are dropped to stay under it
+HISTORY_TOKEN_BUDGET = 3000 # Prompt tokens of history (system prompt included) kept between turns
+HISTORY_SUMMARY_FIELDS = ["Brand", "Model Name", "Price", "match_score", "Specification_Ratings"] # Kept when old tool results are compacted
+HISTORY_REPORT = False # Print the history size and tokens saved after every turn
+MODEL_NAME_MIN_SCORE = 0.35 # get_laptop_info ignores model-name matches scoring below this (1.0 = exact)
+MODEL_NAME_MATCH_LIMIT = 5 # Ranked candidates returned by get_laptop_info
+MODEL_NAME_MAX_CANDIDATES = 50 # Candidates scored per lookup (those sharing the most tokens/trigrams)
+
+# Tool execution
+TOOL_DISPATCH_WORKERS = 8 # Threads running the tool calls of one assistant turn concurrently
+TOOL_TIMEOUT_SECONDS = 10.0 # Default per-tool timeout
+TOOL_TIMEOUTS = {} # Per-tool overrides, e.g. {"recommend_laptops_by_criteria": 5.0}
+
+# Free-text search (semantic_index.py)
+SEMANTIC_INDEX_DIM = 1024 # Hashed TF-IDF features per laptop (float32)
+SEMANTIC_INDEX_COLUMNS = ["Brand", "Model Name", "Description", "Special Features"] # Text indexed per laptop
+SEMANTIC_MIN_SCORE = 0.05 # search_laptops ignores laptops less similar than this (cosine similarity)
+
+# Tool results sent back to the model (result_encoder.py)
+TOOL_RESULT_FORMAT = "compact" # "compact" (projected fields, tables, short descriptions) or "json" (full records as before)
+TOOL_RESULT_FIELDS = { # Fields kept in each tool's records, in this order; None keeps every field
+    "recommend_laptops_by_criteria": None,
+    "get_laptop_info": None,
+}
+TOOL_RESULT_DESCRIPTION_CHARS = 200 # Descriptions are cut to their leading sentences within this length; 0 drops them
+
+# Recommendation ranking
+RECOMMENDATION_PAGE_SIZE = 5 # Laptops returned per recommend_laptops_by_criteria call
+RANKING_CACHE_SIZE = 256 # Recent rankings kept for paging through results with `offset`
+RANKING_WEIGHTS = {"persona": 0.4, "budget": 0.3, "specs": 0.3}
+# Spec ratings that matter most per persona (used by the "specs" ranking component)
+PERSONA_SPEC_PRIORITIES = {
+    "gamer": ["GPU intensity", "Processing speed", "Display quality"],
+    "student": ["Portability", "Multitasking"],
+    "business": ["Portability", "Processing speed"],
+    "professional_creator": ["Display quality", "GPU intensity", "Processing speed"],
+    "developer": ["Multitasking", "Processing speed"],
+    "casual_user": ["Display quality"],
+    "traveler": ["Portability"],
+    "budget_conscious": [],
+}
+
+# Answer cache (answer_cache.py)
+ANSWER_CACHE_ENABLED = True # Reuse the final answer of a tool turn with the same tool calls and results
+ANSWER_CACHE_SIZE = 512 # Least recently used answers are evicted beyond this
+ANSWER_CACHE_TTL_SECONDS = 900 # Cached answers older than this are regenerated (None keeps them until evicted)
+
+# Server mode (chat_server.py)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+MAX_SESSIONS = 10000 # Least recently used sessions are evicted beyond this
+SESSION_TTL_SECONDS = 1800 # Sessions idle for longer than this are dropped
+SESSION_SWEEP_SECONDS = 60 # How often expired sessions are swept
+MAX_REQUEST_BYTES = 64 * 1024 # Larger request bodies are rejected with 413
+
+# Logging and metrics (metrics.py)
+LOG_LEVEL = "INFO" # "DEBUG" also logs every raw preprocessing response; "WARNING" keeps only problems
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+METRICS_ENABLED = True # In-process counters/histograms (GET /metrics in server mode)
+TRACE_LOG_PATH = None # e.g. 'turn_trace.jsonl': one JSON line per chat turn with its spans, tokens and cache lookups
 
 # Persona Values
 PERSONA_VALUES = [
@@ -0,0 +1,172 @@
+# history_manager.py
+"""Token-budget conversation history.
+
+Tokens are counted locally (tiktoken when installed, otherwise ~4 characters per token). Tool results
+from earlier exchanges are shrunk to compact summaries (brand, model, price, ratings) and, if the
+history is still over config.HISTORY_TOKEN_BUDGET, the oldest exchanges are dropped. Messages are
+only ever dropped a whole exchange at a time (a user message and everything answering it), so an
+assistant `tool_calls` message always keeps its `tool` results.
+"""
+import json
+import threading
+import config
+import metrics
+import result_encoder
+
+_encoding = None
+
+def _get_encoding():
+    """tiktoken encoding for the chatbot model, or None when tiktoken (or its BPE file) is unavailable."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            try:
+                _encoding = tiktoken.encoding_for_model(config.CHATBOT_MODEL_ID)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception: # Not installed, or the encoding cannot be downloaded offline
+            _encoding = False
+    return _encoding or None
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _field(message, name):
+    """Reads a field from a message dict or an SDK message object."""
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+def _tool_call_text(tool_call):
+    function = tool_call.get("function", {}) if isinstance(tool_call, dict) else tool_call.function
+    if isinstance(function, dict):
+        return (function.get("name") or "") + (function.get("arguments") or "")
+    return (function.name or "") + (function.arguments or "")
+
+def message_tokens(message):
+    """Approximate prompt tokens for one message, including the per-message framing overhead."""
+    tokens = 4 + count_tokens(str(_field(message, "content") or ""))
+    for tool_call in _field(message, "tool_calls") or []:
+        tokens += 4 + count_tokens(_tool_call_text(tool_call))
+    return tokens
+
+def history_tokens(messages):
+    return sum(message_tokens(m) for m in messages)
+
+
+def _summarize_record(record):
+    if not isinstance(record, dict):
+        return record
+    return {field: record[field] for field in config.HISTORY_SUMMARY_FIELDS if field in record}
+
+def compact_tool_content(content):
+    """Compact JSON summary of a tool result (only the summary fields of each laptop); returns `content` unchanged if it cannot be shrunk."""
+    try:
+        result = json.loads(content)
+    except (TypeError, json.JSONDecodeError):
+        return content
+    if not isinstance(result, dict) or result.get("compacted"):
+        return content
+    summary = {key: value for key, value in result.items() if key not in ("data", "matches")}
+    data = result.get("data")
+    if result_encoder.is_table(data):
+        summary["data"] = result_encoder.to_table([_summarize_record(r) for r in result_encoder.records_from(data)])
+    elif isinstance(data, list):
+        summary["data"] = [_summarize_record(record) for record in data]
+    elif data is not None:
+        summary["data"] = _summarize_record(data)
+    summary["compacted"] = True
+    compact = json.dumps(summary, separators=(",", ":"), ensure_ascii=False)
+    return compact if len(compact) < len(content) else content
+
+
+def _split_exchanges(messages):
+    """Splits the messages after the system prompt into exchanges, each starting at a user message.
+
+    Messages before the first user message (the greeting) form their own exchange; a leading `tool`
+    message without its assistant `tool_calls` message is discarded.
+    """
+    exchanges = []
+    for message in messages[1:]:
+        role = _field(message, "role")
+        if role == "user" or not exchanges:
+            if role == "tool":
+                continue
+            exchanges.append([])
+        exchanges[-1].append(message)
+    return exchanges
+
+
+_stats_lock = threading.Lock()
+history_totals = {"turns": 0, "tokens_saved": 0, "tool_results_compacted": 0, "messages_dropped": 0}
+
+def get_history_totals():
+    with _stats_lock:
+        return dict(history_totals)
+
+def reset_history_totals():
+    with _stats_lock:
+        for key in history_totals:
+            history_totals[key] = 0
+
+
+def compact_history(messages, budget=None):
+    """Fits the history into the token budget; returns (messages, report).
+
+    The system prompt and the latest exchange are always kept in full. Tool results of earlier
+    exchanges are compacted, then the oldest exchanges are dropped while over budget (or over
+    config.MAX_HISTORY_MESSAGES). `report` has tokens_before, tokens_after, tokens_saved,
+    tool_results_compacted and messages_dropped.
+    """
+    budget = config.HISTORY_TOKEN_BUDGET if budget is None else budget
+    if not messages:
+        return messages, {"tokens_before": 0, "tokens_after": 0, "tokens_saved": 0, "tool_results_compacted": 0, "messages_dropped": 0}
+    tokens_before = history_tokens(messages)
+    exchanges = _split_exchanges(messages)
+
+    compacted = 0
+    for exchange in exchanges[:-1]:
+        for i, message in enumerate(exchange):
+            if _field(message, "role") != "tool":
+                continue
+            content = _field(message, "content")
+            compact = compact_tool_content(content)
+            if compact is not content:
+                exchange[i] = dict(message, content=compact)
+                compacted += 1
+
+    exchange_tokens = [history_tokens(exchange) for exchange in exchanges]
+    total = message_tokens(messages[0]) + sum(exchange_tokens)
+    message_count = 1 + sum(len(exchange) for exchange in exchanges)
+    dropped = len(messages) - message_count # Orphaned tool messages skipped while splitting
+    while len(exchanges) > 1 and (total > budget or message_count > config.MAX_HISTORY_MESSAGES):
+        total -= exchange_tokens.pop(0)
+        message_count -= len(exchanges[0])
+        dropped += len(exchanges.pop(0))
+
+    pruned = [messages[0]] + [message for exchange in exchanges for message in exchange]
+    report = {
+        "tokens_before": tokens_before,
+        "tokens_after": total,
+        "tokens_saved": tokens_before - total,
+        "tool_results_compacted": compacted,
+        "messages_dropped": dropped,
+    }
+    with _stats_lock:
+        history_totals["turns"] += 1
+        history_totals["tokens_saved"] += report["tokens_saved"]
+        history_totals["tool_results_compacted"] += compacted
+        history_totals["messages_dropped"] += dropped
+    metrics.inc("history_tokens_saved_total", report["tokens_saved"])
+    return pruned, report
+
+def format_report(report):
+    return (f"History: {report['tokens_after']} tokens (saved {report['tokens_saved']} this turn; "
+            f"{report['tool_results_compacted']} tool results compacted, {report['messages_dropped']} messages dropped)")
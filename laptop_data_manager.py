@@ -1,20 +1,40 @@
 # laptop_data_manager.py
 import pandas as pd
+import hashlib
 import json
-import os
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import config
 import llm_utils # For preprocessing functions
+import llm_cache
+import metrics
+import spec_rules
+import catalog_store
+import catalog_index as catalog_index_module
+import semantic_index
+
+logger = logging.getLogger(__name__)
 
 # Global DataFrame to hold laptop data
 # df_laptops = pd.read_csv(r"C:\Users\SOWMILY DUTTA\Python_Projects\Upgrad\Course 6 - Gen AI\ShopAssist_ Data + Demo-20250522T120309Z-1-001\ShopAssist_ Data + Demo\ShopAssist_New\laptop_data.csv")
 
 df_laptops = None
+# Query index over df_laptops (sorted prices, persona bitmasks), rebuilt whenever df_laptops changes
+catalog_index = None
+# Bumped every time a new (df_laptops, catalog_index) snapshot is published (catalog_reloader.py)
+catalog_version = 0
+_snapshot_lock = threading.Lock()
 
-def _product_map_layer(laptop_description_str: str):
-    """Internal helper for product map layer extraction."""
-    lap_spec_keys = ["GPU intensity", "Display quality", "Portability", "Multitasking", "Processing speed"]
+# Filled during preprocessing when config.CLASSIFIER_MODE == "audit"
+rule_agreement = spec_rules.AgreementReport()
+
+def _product_map_prompt():
+    """System prompt with the classification rules, shared by the single and batched product map layer."""
+    lap_spec_keys = spec_rules.LAP_SPEC_KEYS
     expected_output_format_example = {key: "low/medium/high" for key in lap_spec_keys}
-    values_enum = ['low', 'medium', 'high']
+    values_enum = spec_rules.SPEC_VALUES
 
     prompt=f"""
     You are a Laptop Specifications Classifier. Your job is to extract key features from a laptop description,
@@ -57,6 +77,12 @@ def _product_map_layer(laptop_description_str: str):
     {config.PROMPT_DELIMITER}
     Strictly output ONLY the JSON dictionary in the format {expected_output_format_example}.
     """
+    return prompt
+
+def _product_map_layer(laptop_description_str: str):
+    """Internal helper for product map layer extraction."""
+    lap_spec_keys = spec_rules.LAP_SPEC_KEYS
+    prompt = _product_map_prompt()
     input_prompt_content = f"""Based on the rules and examples, classify the following laptop description: "{laptop_description_str}"."""
     messages=[{"role": "system", "content":prompt },{"role": "user","content":input_prompt_content}]
     response = llm_utils.get_chat_completions_for_preprocessing(messages, json_format=True)
@@ -64,9 +90,44 @@ def _product_map_layer(laptop_description_str: str):
     if isinstance(response, dict) and "error" not in response and all(key in response for key in lap_spec_keys):
         return response
     else:
-        print(f"Warning: _product_map_layer received unexpected or error response: {response} for description: {laptop_description_str[:50]}...")
+        logger.warning("_product_map_layer received unexpected or error response: %s for description: %s...", response, laptop_description_str[:50])
         return {key: "unknown" for key in lap_spec_keys}
 
+def _is_valid_specs(entry):
+    """True if entry has every spec key with a low/medium/high value."""
+    return isinstance(entry, dict) and all(entry.get(key) in spec_rules.SPEC_VALUES for key in spec_rules.LAP_SPEC_KEYS)
+
+def _product_map_layer_batch(laptop_descriptions: list):
+    """Classifies several descriptions in one request. Entries that are missing or invalid are re-run individually."""
+    if len(laptop_descriptions) == 1:
+        return [_product_map_layer(laptop_descriptions[0])]
+
+    lap_spec_keys = spec_rules.LAP_SPEC_KEYS
+    example_entry = {key: "low/medium/high" for key in lap_spec_keys}
+    prompt = _product_map_prompt() + f"""
+    {config.PROMPT_DELIMITER}
+    Batch mode: the user message contains several laptop descriptions, each introduced by a numeric id.
+    Classify every description independently using the rules above.
+    Instead of a single dictionary, output ONLY one JSON object that maps each id (as a string) to its classification dictionary,
+    for example {{"0": {json.dumps(example_entry)}, "1": {json.dumps(example_entry)}}}.
+    """
+    described = "\n".join(f'id {i}: "{description}"' for i, description in enumerate(laptop_descriptions))
+    input_prompt_content = f"""Based on the rules and examples, classify each of the following {len(laptop_descriptions)} laptop descriptions:\n{described}"""
+    messages=[{"role": "system", "content":prompt },{"role": "user","content":input_prompt_content}]
+    response = llm_utils.get_chat_completions_for_preprocessing(messages, json_format=True)
+    if not isinstance(response, dict) or "error" in response:
+        logger.warning("Batched _product_map_layer failed (%s); classifying %d rows individually.", response, len(laptop_descriptions))
+        response = {}
+
+    results = []
+    for i, description in enumerate(laptop_descriptions):
+        entry = response.get(str(i))
+        if _is_valid_specs(entry):
+            results.append({key: entry[key] for key in lap_spec_keys})
+        else:
+            results.append(_product_map_layer(description))
+    return results
+
 def _persona_tag(specs_dict: dict):
     """Internal helper for persona tagging."""
     if not isinstance(specs_dict, dict) or any(val == "unknown" or val == "error" for val in specs_dict.values()):
@@ -95,75 +156,218 @@ def _persona_tag(specs_dict: dict):
     if isinstance(response, dict) and 'persona' in response and isinstance(response['persona'], list):
         return response['persona']
     else:
-        print(f"Warning: _persona_tag received unexpected response: {response} for specs: {specs_dict}")
+        logger.warning("_persona_tag received unexpected response: %s for specs: %s", response, specs_dict)
         return []
 
-def _convert_column_from_string(df, column_name):
-    """Safely converts a string representation of a list/dict in a DataFrame column back to its Python object."""
-    def safe_literal_eval(val):
-        if isinstance(val, str):
-            try:
-                # Attempt to fix common string issues for JSON parsing
-                # Handles single quotes, None -> null, True/False -> true/false
-                s = val.replace("'", '"').replace("None", "null").replace("True", "true").replace("False", "false")
-                return json.loads(s)
-            except (json.JSONDecodeError, TypeError):
-                return [] if column_name == 'Persona' else {} # Default for lists or dicts
-        return val # Return as is if not a string (already parsed or other type)
-    
-    if column_name in df.columns:
-        df[column_name] = df[column_name].apply(safe_literal_eval)
-    return df
+def _classify_chunk(descriptions, mode=None):
+    """Classifies a chunk of descriptions with one (batched) spec request, then tags each row's personas right away."""
+    mode = mode or config.CLASSIFIER_MODE
+    results = [({}, []) for _ in descriptions]
+    present = [i for i, d in enumerate(descriptions) if pd.notna(d)]
 
+    if mode == "hybrid":
+        # Local rules decide what they can; the LLM is only asked about rows with undecided fields
+        rule_specs = {i: spec_rules.classify_specs(descriptions[i]) for i in present}
+        needs_llm = [i for i in present if None in rule_specs[i].values()]
+    else:
+        needs_llm = present
+    llm_specs = dict(zip(needs_llm, _product_map_layer_batch([descriptions[i] for i in needs_llm]))) if needs_llm else {}
 
-def initialize_data(force_reprocess=config.REPROCESS_DATA):
-    global df_laptops
-    if not force_reprocess and os.path.exists(config.PREPROCESSED_LAPTOP_DATA_CSV):
-        print(f"Loading preprocessed data from {config.PREPROCESSED_LAPTOP_DATA_CSV}...")
-        df_laptops = pd.read_csv(config.PREPROCESSED_LAPTOP_DATA_CSV)
-        # Convert string representations of lists/dicts back to objects
-        df_laptops = _convert_column_from_string(df_laptops, 'Specification_Ratings')
-        df_laptops = _convert_column_from_string(df_laptops, 'Persona')
-        print(f"Loaded {len(df_laptops)} preprocessed laptops.")
-        return
-
-    print(f"Preprocessing data from {config.LAPTOP_DATA_CSV}...")
+    for i in present:
+        if mode == "hybrid":
+            specs = rule_specs[i]
+            for key, value in specs.items():
+                if value is None:
+                    specs[key] = llm_specs[i].get(key, "unknown")
+            persona = spec_rules.lookup_personas(specs)
+            results[i] = (specs, persona if persona is not None else [])
+            continue
+        specs = llm_specs[i]
+        persona = _persona_tag(specs) if isinstance(specs, dict) and specs else []
+        if mode == "audit" and isinstance(specs, dict) and "unknown" not in specs.values():
+            rule_agreement.record_specs(spec_rules.classify_specs(descriptions[i]), specs)
+            rule_agreement.record_personas(spec_rules.lookup_personas(specs), persona)
+        results[i] = (specs, persona)
+    return results
+
+def _classify_descriptions(descriptions, max_workers=config.PREPROCESS_MAX_WORKERS, batch_size=config.PREPROCESS_BATCH_SIZE):
+    """Classifies descriptions concurrently in chunks of batch_size, returning (specs, persona) tuples in input order."""
+    descriptions = list(descriptions)
+    total = len(descriptions)
+    results = [None] * total
+    batch_size = max(1, batch_size or 1)
+    chunks = [(i, descriptions[i:i + batch_size]) for i in range(0, total, batch_size)]
+    start = time.monotonic()
+
+    last_reported = [0]
+
+    def report_progress(done):
+        if done == total or done - last_reported[0] >= config.PREPROCESS_PROGRESS_EVERY:
+            last_reported[0] = done
+            elapsed = time.monotonic() - start
+            rate = done / elapsed if elapsed > 0 else 0.0
+            logger.info("Preprocessed %d/%d laptops (%.1f laptops/s)", done, total, rate)
+
+    done = 0
+    if max_workers is None or max_workers <= 1:
+        for offset, chunk in chunks:
+            results[offset:offset + len(chunk)] = _classify_chunk(chunk)
+            done += len(chunk)
+            report_progress(done)
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_classify_chunk, chunk): (offset, len(chunk)) for offset, chunk in chunks}
+        for future in as_completed(futures):
+            offset, size = futures[future]
+            results[offset:offset + size] = future.result()
+            done += size
+            report_progress(done)
+    return results
+
+def _preprocess_key(description):
+    """Content-addressed key for a row: changes when the description, prompt version or helper model changes."""
+    text = description if pd.notna(description) else None
+    classifier = "hybrid" if config.CLASSIFIER_MODE == "hybrid" else "llm" # audit mode keeps the LLM output
+    payload = json.dumps([config.PREPROCESS_PROMPT_VERSION, config.HELPER_MODEL_ID, classifier, text])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _load_previous_results():
+    """Maps Preprocess_Key -> (specs, persona) from the previous preprocessed output, if any."""
     try:
-        df_laptops = pd.read_csv(config.LAPTOP_DATA_CSV)
-        print(df_laptops.head())
+        previous, _ = catalog_store.load_preprocessed()
+    except Exception as e:
+        logger.warning("Could not read previous preprocessed data for incremental mode: %s", e)
+        return {}
+    if previous is None:
+        return {}
+    if 'Preprocess_Key' not in previous.columns:
+        logger.info("Previous preprocessed data has no 'Preprocess_Key' column; all rows will be classified.")
+        return {}
+    return {
+        key: (specs, persona)
+        for key, specs, persona in zip(previous['Preprocess_Key'], previous['Specification_Ratings'], previous['Persona'])
+    }
+
+def _classify_incrementally(descriptions, keys):
+    """Reuses results for unchanged rows and classifies only new or changed descriptions (once per unique key)."""
+    previous = _load_previous_results()
+
+    def is_reusable(key):
+        # Rows whose previous classification failed are retried rather than carried forward
+        specs = previous.get(key, (None, None))[0]
+        return isinstance(specs, dict) and not any(v in ("unknown", "error") for v in specs.values())
+
+    pending = {}
+    for key, description in zip(keys, descriptions):
+        if not is_reusable(key) and key not in pending:
+            pending[key] = description
+
+    fresh = dict(zip(pending.keys(), _classify_descriptions(pending.values()))) if pending else {}
+    current_keys = set(keys)
+    reused = sum(1 for key in keys if key not in fresh)
+    added = len(fresh)
+    removed = len(set(previous) - current_keys)
+    logger.info("Incremental preprocessing: reused %d rows, classified %d new/changed descriptions, removed %d stale entries.", reused, added, removed)
+    return [fresh[key] if key in fresh else previous[key] for key in keys]
+
+def _model_name_index(df):
+    """Model-name index from the prebuilt snapshot (config.MODEL_NAME_INDEX_PATH), rebuilt and saved if stale."""
+    names = df['Model Name'].tolist() if 'Model Name' in df.columns else []
+    return catalog_index_module.load_or_build_model_names(names)
+
+def convert_prices(df):
+    """Turns the raw "1,23,990"-style Price strings into numbers and drops the rows without a price."""
+    df['Price'] = df['Price'].astype(str).str.replace(",","")
+    df['Price'] = pd.to_numeric(df['Price'], errors='coerce')
+    return df.dropna(subset=['Price'])
+
+def initialize_data(force_reprocess=config.REPROCESS_DATA, incremental=config.INCREMENTAL_REPROCESS):
+    """Loads (or preprocesses) the catalog and publishes it as the current snapshot."""
+    df, index = load_catalog(force_reprocess, incremental)
+    publish_catalog(df, index)
+
+def load_catalog(force_reprocess=config.REPROCESS_DATA, incremental=config.INCREMENTAL_REPROCESS):
+    """Builds the catalog DataFrame and its CatalogIndex without touching the published snapshot.
+
+    Returns (df, index); df is empty and index None if the data could not be loaded.
+    """
+    global rule_agreement
+    if not force_reprocess and catalog_store.preprocessed_exists():
+        with metrics.span("catalog_step", step="load_preprocessed"):
+            df, path = catalog_store.load_preprocessed()
+        with metrics.span("catalog_step", step="build_index"):
+            index = catalog_index_module.CatalogIndex(df, model_names=_model_name_index(df))
+        logger.info("Loaded %d preprocessed laptops from %s.", len(df), path)
+        return df, index
+
+    logger.info("Preprocessing data from %s...", config.LAPTOP_DATA_CSV)
+    try:
+        with metrics.span("catalog_step", step="read_csv"):
+            df = pd.read_csv(config.LAPTOP_DATA_CSV)
+        logger.debug("Raw data:\n%s", df.head())
     except FileNotFoundError:
-        print(f"Error: The file {config.LAPTOP_DATA_CSV} was not found. Cannot proceed.")
-        df_laptops = pd.DataFrame() # Ensure it's an empty DataFrame
-        return
-
-    if 'Description' not in df_laptops.columns:
-        print("Error: 'Description' column is missing. Cannot proceed with preprocessing.")
-        df_laptops = pd.DataFrame()
-        return
+        logger.error("The file %s was not found. Cannot proceed.", config.LAPTOP_DATA_CSV)
+        return pd.DataFrame(), None # Empty DataFrame: nothing to serve
+
+    if 'Description' not in df.columns:
+        logger.error("'Description' column is missing. Cannot proceed with preprocessing.")
+        return pd.DataFrame(), None
     
-    df_laptops['Price'] = df_laptops['Price'].str.replace(",","")
-    print(df_laptops.head())
-    df_laptops['Price'] = pd.to_numeric(df_laptops['Price'], errors='coerce')
-    df_laptops.dropna(subset=['Price'], inplace=True)
-
-    print("Generating 'Specification_Ratings' (this may take a while)...")
-    df_laptops['Specification_Ratings'] = df_laptops['Description'].apply(
-        lambda x: _product_map_layer(x) if pd.notna(x) else {}
-    )
-    print("Generating 'Persona' tags (this may take a while)...")
-    df_laptops['Persona'] = df_laptops['Specification_Ratings'].apply(
-        lambda x: _persona_tag(x) if isinstance(x, dict) and x else []
-    )
+    with metrics.span("catalog_step", step="convert_prices"):
+        df = convert_prices(df)
+
+    logger.info("Generating 'Specification_Ratings' and 'Persona' tags with %d workers, %d laptop(s) per request (this may take a while)...",
+                config.PREPROCESS_MAX_WORKERS, config.PREPROCESS_BATCH_SIZE)
+    keys = [_preprocess_key(d) for d in df['Description']]
+    rule_agreement = spec_rules.AgreementReport()
+    with metrics.span("catalog_step", step="classify"):
+        if incremental:
+            results = _classify_incrementally(df['Description'], keys)
+        else:
+            results = _classify_descriptions(df['Description'])
+    df['Preprocess_Key'] = keys
+    cache = llm_cache.get_response_cache()
+    if cache is not None:
+        stats = cache.stats()
+        logger.info("LLM cache: %d hits, %d misses (%.0f%% hit rate), %d entries.", stats['hits'], stats['misses'], 100 * stats['hit_rate'], stats['entries'])
+    if config.CLASSIFIER_MODE == "audit":
+        rule_agreement.print_summary()
+    df['Specification_Ratings'] = pd.Series([specs for specs, _ in results], index=df.index, dtype=object)
+    df['Persona'] = pd.Series([persona for _, persona in results], index=df.index, dtype=object)
     
+    with metrics.span("catalog_step", step="encode"):
+        df = catalog_store.add_encoded_columns(df)
+    logger.info("Building the semantic search index...")
+    with metrics.span("catalog_step", step="semantic_index"):
+        semantic = semantic_index.build_and_save(df)
+    with metrics.span("catalog_step", step="build_index"):
+        index = catalog_index_module.CatalogIndex(df, semantic=semantic, model_names=_model_name_index(df))
+
     try:
-        df_laptops.to_csv(config.PREPROCESSED_LAPTOP_DATA_CSV, index=False)
-        print(df_laptops.head())
-        print(f"Preprocessed data saved to {config.PREPROCESSED_LAPTOP_DATA_CSV}")
+        with metrics.span("catalog_step", step="save"):
+            written = catalog_store.save_preprocessed(df)
+        logger.info("Preprocessed data saved to %s", ", ".join(written))
     except Exception as e:
-        print(f"Error saving preprocessed data: {e}")
+        logger.error("Error saving preprocessed data: %s", e)
 
-    print("\nSample of preprocessed data:")
-    print(df_laptops[['Model Name', 'Price', 'Specification_Ratings', 'Persona']].head())
+    logger.debug("Sample of preprocessed data:\n%s", df[['Model Name', 'Price', 'Specification_Ratings', 'Persona']].head())
+    return df, index
+
+def publish_catalog(df, index=None):
+    """Makes (df, index) the snapshot every reader sees from now on and bumps catalog_version.
+
+    Both are swapped together under the lock; readers that already hold the previous index keep
+    using it until their call finishes, so they never see a half-built table.
+    """
+    global df_laptops, catalog_index, catalog_version
+    with _snapshot_lock:
+        df_laptops, catalog_index = df, index
+        catalog_version += 1
+        version = catalog_version
+    metrics.set_gauge("catalog_rows", len(df) if df is not None else 0)
+    metrics.set_gauge("catalog_version", version)
+    return version
 
 
 def get_laptop_dataframe():
@@ -171,6 +375,24 @@ def get_laptop_dataframe():
     global df_laptops
     if df_laptops is None:
         # Attempt to initialize if not already loaded (e.g., direct call without main_chatbot sequence)
-        print("Laptop data not initialized. Attempting to load/preprocess...")
+        logger.info("Laptop data not initialized. Attempting to load/preprocess...")
         initialize_data() 
-    return df_laptops
\ No newline at end of file
+    return df_laptops
+
+def get_catalog_index():
+    """Returns the query index for the current laptop DataFrame, building it if the data changed since.
+
+    Callers should take the index once per request and read `index.df` from it: a reload swaps in a
+    new index instead of changing this one.
+    """
+    global catalog_index
+    index = catalog_index
+    if index is not None and index.df is df_laptops:
+        return index
+    df = get_laptop_dataframe()
+    if df is None:
+        return None
+    with _snapshot_lock:
+        if catalog_index is None or catalog_index.df is not df_laptops:
+            catalog_index = catalog_index_module.CatalogIndex(df_laptops)
+        return catalog_index
\ No newline at end of file
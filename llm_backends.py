@@ -0,0 +1,247 @@
+# llm_backends.py
+"""Pluggable chat-completions clients, selected with config.LLM_BACKEND.
+
+    "openai"  the real API (openai.OpenAI / openai.AsyncOpenAI)
+    "record"  the real API, with every request and reply appended to config.LLM_RECORDING_PATH
+    "replay"  answers from a recording only: no network, identical replies for identical requests
+    "fake"    the rule-based stand-in from openai_stub_server (preprocessing prompts included)
+
+Every backend exposes the `client.chat.completions.create(**params)` subset of the SDK that this
+project uses, so the rest of the code does not know which one it is talking to.
+"""
+import hashlib
+import json
+import os
+import threading
+import config
+
+BACKENDS = ("openai", "record", "replay", "fake")
+
+
+class ReplayMissError(KeyError):
+    """A replayed request is not in the recording."""
+
+
+def _plain(value):
+    """JSON-ready form of request values (SDK message objects become dicts)."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+def request_key(params):
+    """Stable key of a request; streamed and plain requests for the same prompt share it."""
+    request = {k: v for k, v in params.items() if k not in ("stream", "stream_options")}
+    payload = json.dumps(_plain(request), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MessageAssembler:
+    """Builds the assistant message dict from streamed chunks (content and tool-call deltas)."""
+
+    def __init__(self):
+        self.content_parts = []
+        self.tool_calls = {} # Stream index -> {"id", "type", "function": {"name", "arguments"}}
+
+    def add(self, chunk):
+        """Adds one chunk; returns its text delta (or None)."""
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+        if delta.content:
+            self.content_parts.append(delta.content)
+        for tool_delta in delta.tool_calls or []:
+            call = self.tool_calls.setdefault(tool_delta.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+            if tool_delta.id:
+                call["id"] = tool_delta.id
+            if tool_delta.function is not None:
+                if tool_delta.function.name:
+                    call["function"]["name"] += tool_delta.function.name
+                if tool_delta.function.arguments:
+                    call["function"]["arguments"] += tool_delta.function.arguments
+        return delta.content
+
+    def message(self):
+        message = {"role": "assistant", "content": "".join(self.content_parts) or None}
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[i] for i in sorted(self.tool_calls)]
+        return message
+
+
+class Recording:
+    """JSONL file of {"key", "model", "message", "usage"} entries; replays answer each key's entries in order."""
+
+    def __init__(self, path=None):
+        self.path = path or config.LLM_RECORDING_PATH
+        self._lock = threading.Lock()
+        self._entries = None
+        self._cursors = {}
+
+    def append(self, params, message, usage=None):
+        entry = {"key": request_key(params), "model": params.get("model"), "message": message, "usage": usage}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def lookup(self, params):
+        """The recorded entry for this request (cycling through repeats of the same request)."""
+        key = request_key(params)
+        with self._lock:
+            if self._entries is None:
+                self._entries = {}
+                if os.path.exists(self.path):
+                    with open(self.path, encoding="utf-8") as f:
+                        for line in f:
+                            if line.strip():
+                                entry = json.loads(line)
+                                self._entries.setdefault(entry["key"], []).append(entry)
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return entries[cursor % len(entries)]
+
+
+def _message_from_completion(response):
+    message = response.choices[0].message
+    return {"role": "assistant", **_plain(message)}
+
+def _usage(response):
+    usage = getattr(response, "usage", None)
+    return _plain(usage) if usage is not None else None
+
+
+class _Completions:
+    """Base for the wrapping clients: `self.chat.completions.create` resolves to `self.create`."""
+
+    @property
+    def chat(self):
+        return self
+
+    @property
+    def completions(self):
+        return self
+
+
+class RecordingClient(_Completions):
+    """Passes requests to `inner` and appends every request/reply pair to the recording."""
+
+    def __init__(self, inner, recording=None):
+        self.inner = inner
+        self.recording = recording or Recording()
+
+    def create(self, **params):
+        response = self.inner.chat.completions.create(**params)
+        if not params.get("stream"):
+            self.recording.append(params, _message_from_completion(response), _usage(response))
+            return response
+        return self._record_stream(params, response)
+
+    def _record_stream(self, params, stream):
+        assembler = MessageAssembler()
+        for chunk in stream:
+            assembler.add(chunk)
+            yield chunk
+        self.recording.append(params, assembler.message())
+
+
+class AsyncRecordingClient(RecordingClient):
+    async def create(self, **params):
+        response = await self.inner.chat.completions.create(**params)
+        if not params.get("stream"):
+            self.recording.append(params, _message_from_completion(response), _usage(response))
+            return response
+        return self._record_stream(params, response)
+
+    async def _record_stream(self, params, stream):
+        assembler = MessageAssembler()
+        async for chunk in stream:
+            assembler.add(chunk)
+            yield chunk
+        self.recording.append(params, assembler.message())
+
+
+class ReplayClient(_Completions):
+    """Answers from a recording; unknown requests raise ReplayMissError or go to `fallback` if one is given."""
+
+    def __init__(self, recording=None, fallback=None):
+        self.recording = recording or Recording()
+        self.fallback = fallback
+        self.hits = 0
+        self.misses = 0
+
+    def _replay(self, params):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+        import openai_stub_server
+        entry = self.recording.lookup(params)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        message = {"content": entry["message"].get("content"), "tool_calls": entry["message"].get("tool_calls")}
+        if params.get("stream"):
+            return [ChatCompletionChunk.model_validate(p) for p in openai_stub_server.completion_chunks(params, message)]
+        payload = openai_stub_server.completion_response(params, message)
+        if entry.get("usage"):
+            payload["usage"] = entry["usage"]
+        return ChatCompletion.model_validate(payload)
+
+    def _miss(self, params):
+        return ReplayMissError(f"Request {request_key(params)[:12]} (model {params.get('model')}) is not in {self.recording.path}")
+
+    def create(self, **params):
+        replayed = self._replay(params)
+        if replayed is None:
+            if self.fallback is None:
+                raise self._miss(params)
+            return self.fallback.chat.completions.create(**params)
+        return iter(replayed) if params.get("stream") else replayed
+
+
+class AsyncReplayClient(ReplayClient):
+    async def create(self, **params):
+        replayed = self._replay(params)
+        if replayed is None:
+            if self.fallback is None:
+                raise self._miss(params)
+            return await self.fallback.chat.completions.create(**params)
+        return _aiter(replayed) if params.get("stream") else replayed
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def create_client(backend=None):
+    """Synchronous client for the configured backend (used for preprocessing and the CLI chatbot)."""
+    backend = backend or config.LLM_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND '{backend}'; expected one of {BACKENDS}.")
+    if backend == "fake":
+        from openai_stub_server import FakeClient
+        return FakeClient()
+    if backend == "replay":
+        fallback = create_client("fake") if config.LLM_REPLAY_MISSING == "fake" else None
+        return ReplayClient(fallback=fallback)
+    import openai # Imported here, so the fake and replay backends start without the SDK
+    real = openai.OpenAI(api_key=config.OPENAI_API_KEY, base_url=config.OPENAI_BASE_URL)
+    return RecordingClient(real) if backend == "record" else real
+
+def create_async_client(backend=None):
+    """Asyncio counterpart of create_client (used by the streaming engine and the HTTP server)."""
+    backend = backend or config.LLM_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND '{backend}'; expected one of {BACKENDS}.")
+    if backend == "fake":
+        from openai_stub_server import FakeAsyncClient
+        return FakeAsyncClient()
+    if backend == "replay":
+        fallback = create_async_client("fake") if config.LLM_REPLAY_MISSING == "fake" else None
+        return AsyncReplayClient(fallback=fallback)
+    import openai
+    real = openai.AsyncOpenAI(api_key=config.OPENAI_API_KEY, base_url=config.OPENAI_BASE_URL)
+    return AsyncRecordingClient(real) if backend == "record" else real
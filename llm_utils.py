@@ -1,16 +1,166 @@
 # llm_utils.py
 import os
 import json
+import logging
 import re
-import openai
-from openai import OpenAI
+import random
+import threading
+import time
 import config
+import llm_backends
+import llm_cache
+import metrics
 
+logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=config.OPENAI_API_KEY)# llm_utils.py
 
-def get_chat_completions_for_preprocessing(messages, json_format=False, model=config.HELPER_MODEL_ID):
-    """OpenAI API call wrapper for the preprocessing helper functions."""
+# Chat completions client for the configured backend (config.LLM_BACKEND): the real API, a recording, a replay or the fake.
+# Created on first use, so importing this module does not pay for the OpenAI SDK.
+client = None
+_client_lock = threading.Lock()
+_async_client = None
+
+def get_client():
+    """Returns the shared synchronous client (created on first use)."""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                client = llm_backends.create_client()
+    return client
+
+def get_async_client():
+    """Returns the shared async client used by the asyncio chatbot engine (created on first use)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = llm_backends.create_async_client()
+    return _async_client
+
+def transient_errors():
+    """Errors worth retrying: the request itself was fine, the API just could not serve it right now."""
+    import openai
+    return (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting requests and (estimated) tokens per minute."""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                float(self.requests_per_minute),
+                self._request_allowance + elapsed * self.requests_per_minute / 60.0,
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+    def acquire(self, tokens=0):
+        """Blocks until one request consuming `tokens` tokens fits within both limits."""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute) # A single oversized request must still get through
+        while True:
+            with self._lock:
+                self._refill()
+                request_ok = not self.requests_per_minute or self._request_allowance >= 1
+                tokens_ok = not self.tokens_per_minute or self._token_allowance >= tokens
+                if request_ok and tokens_ok:
+                    if self.requests_per_minute:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= tokens
+                    return
+                wait = 0.0
+                if not request_ok:
+                    wait = max(wait, (1 - self._request_allowance) * 60.0 / self.requests_per_minute)
+                if not tokens_ok:
+                    wait = max(wait, (tokens - self._token_allowance) * 60.0 / self.tokens_per_minute)
+            time.sleep(wait)
+
+
+preprocessing_rate_limiter = RateLimiter(
+    requests_per_minute=config.PREPROCESS_REQUESTS_PER_MINUTE,
+    tokens_per_minute=config.PREPROCESS_TOKENS_PER_MINUTE,
+)
+
+
+_usage_lock = threading.Lock()
+usage_totals = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+def _record_token_metrics(response, kind):
+    usage = getattr(response, "usage", None)
+    metrics.inc("llm_requests_total", kind=kind, status="ok")
+    if usage is not None:
+        metrics.inc("llm_tokens_total", usage.prompt_tokens or 0, kind=kind, type="prompt")
+        metrics.inc("llm_tokens_total", usage.completion_tokens or 0, kind=kind, type="completion")
+
+def _record_usage(response):
+    """Accumulates token usage reported by the API for preprocessing requests."""
+    usage = getattr(response, "usage", None)
+    _record_token_metrics(response, "preprocessing")
+    with _usage_lock:
+        usage_totals["requests"] += 1
+        if usage is not None:
+            usage_totals["prompt_tokens"] += usage.prompt_tokens or 0
+            usage_totals["completion_tokens"] += usage.completion_tokens or 0
+
+def get_usage_totals():
+    """Returns a snapshot of accumulated preprocessing token usage."""
+    with _usage_lock:
+        return dict(usage_totals)
+
+def reset_usage_totals():
+    with _usage_lock:
+        for key in usage_totals:
+            usage_totals[key] = 0
+
+
+def _estimate_tokens(messages):
+    """Rough token estimate (~4 characters per token) used for rate limiting."""
+    return sum(len(str(m.get("content", ""))) for m in messages) // 4 + 1
+
+
+def _create_with_retry(params, max_retries=config.PREPROCESS_MAX_RETRIES, backoff=config.PREPROCESS_BACKOFF_SECONDS,
+                       rate_limiter=None, tokens=0):
+    """Calls the chat completions API, retrying transient errors with exponential backoff and jitter.
+
+    Every attempt, retries included, first takes `tokens` from `rate_limiter` (if given).
+    """
+    retryable = transient_errors()
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire(tokens)
+        try:
+            return get_client().chat.completions.create(**params)
+        except retryable as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+            metrics.inc("llm_retries_total", error=type(e).__name__)
+            logger.warning("Transient API error (%s), retrying in %.1fs (attempt %d/%d)...", type(e).__name__, delay, attempt + 1, max_retries)
+            time.sleep(delay)
+
+def get_chat_completions_for_preprocessing(messages, json_format=False, model=config.HELPER_MODEL_ID, use_cache=True):
+    """OpenAI API call wrapper for the preprocessing helper functions.
+
+    Responses are served from the persistent LLM cache when an identical request was made before;
+    pass use_cache=False (or set config.LLM_CACHE_ENABLED = False) to always hit the API.
+    """
     try:
         params = {
             "model": model,
@@ -20,9 +170,21 @@ def get_chat_completions_for_preprocessing(messages, json_format=False, model=co
         if json_format:
             params["response_format"] = {"type": "json_object"}
 
-        response = client.chat.completions.create(**params)
-        content = response.choices[0].message.content
-        print(content)
+        cache = llm_cache.get_response_cache() if use_cache else None
+        cache_key = None
+        content = None
+        if cache is not None:
+            cache_key = cache.make_key(model, messages, params.get("response_format"))
+            content = cache.get(cache_key)
+            metrics.inc("llm_cache_lookups_total", result="miss" if content is None else "hit")
+
+        from_cache = content is not None
+        if not from_cache:
+            with metrics.span("llm_request", kind="preprocessing"):
+                response = _create_with_retry(params, rate_limiter=preprocessing_rate_limiter, tokens=_estimate_tokens(messages))
+            _record_usage(response)
+            content = response.choices[0].message.content
+            logger.debug("Preprocessing response: %s", content)
 
         if json_format:
             try:
@@ -38,31 +200,48 @@ def get_chat_completions_for_preprocessing(messages, json_format=False, model=co
                     else:
                         json_str = content # Fallback if no clear JSON structure found
 
-                return json.loads(json_str)
+                parsed = json.loads(json_str)
             except json.JSONDecodeError as e:
-                print(f"Warning: Could not parse JSON response for preprocessing: '{content}'. Error: {e}")
+                logger.warning("Could not parse JSON response for preprocessing: '%s'. Error: %s", content, e)
                 return {"error": "Failed to parse JSON", "raw_content": content}
+            if cache_key is not None and not from_cache:
+                cache.set(cache_key, content) # Only cache responses that parsed
+            return parsed
+        if cache_key is not None and not from_cache and content:
+            cache.set(cache_key, content)
         return content
     except Exception as e:
-        print(f"Error in get_chat_completions_for_preprocessing: {e}")
+        metrics.inc("llm_requests_total", kind="preprocessing", status="error")
+        logger.error("Error in get_chat_completions_for_preprocessing: %s", e)
         return {"error": str(e)} if json_format else f"Error: {str(e)}"
 
 
+def create_chatbot_completion(messages, tools=None, tool_choice="auto", model=config.CHATBOT_MODEL_ID):
+    """Chatbot completion that raises on API errors; returns the assistant message."""
+    params = {
+        "model": model,
+        "messages": messages,
+        "temperature": 0.7, # Standard temperature for chatbot
+    }
+    if tools:
+        params["tools"] = tools
+        params["tool_choice"] = tool_choice
+    
+    with metrics.span("llm_request", kind="chatbot"):
+        response = get_client().chat.completions.create(**params)
+    _record_token_metrics(response, "chatbot")
+    return response.choices[0].message
+
+def chatbot_error_message(error):
+    """Records a failed chatbot completion and returns the apology shown to the user in its place."""
+    metrics.inc("llm_requests_total", kind="chatbot", status="error")
+    logger.error("Error in get_chatbot_completion: %s", error)
+    from openai.types.chat import ChatCompletionMessage
+    return ChatCompletionMessage(role="assistant", content=f"Sorry, an error occurred: {error}")
+
 def get_chatbot_completion(messages, tools=None, tool_choice="auto", model=config.CHATBOT_MODEL_ID):
-    """OpenAI API call wrapper for the main chatbot logic."""
+    """OpenAI API call wrapper for the main chatbot logic; an API error comes back as an apology message."""
     try:
-        params = {
-            "model": model,
-            "messages": messages,
-            "temperature": 0.7, # Standard temperature for chatbot
-        }
-        if tools:
-            params["tools"] = tools
-            params["tool_choice"] = tool_choice
-        
-        response = client.chat.completions.create(**params)
-        return response.choices[0].message
+        return create_chatbot_completion(messages, tools, tool_choice, model)
     except Exception as e:
-        print(f"Error in get_chatbot_completion: {e}")
-        # Return a mock message object or raise error, depending on desired handling
-        return openai.types.chat.ChatCompletionMessage(role="assistant", content=f"Sorry, an error occurred: {e}")
\ No newline at end of file
+        return chatbot_error_message(e)
\ No newline at end of file
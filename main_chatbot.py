@@ -1,20 +1,19 @@
 # main_chatbot.py
-import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 import config
-import llm_utils
-import laptop_data_manager
-import chatbot_functions
+import history_manager
+import metrics
+# llm_utils (OpenAI SDK), laptop_data_manager and chatbot_functions (pandas) and tool_dispatch are
+# imported where they are first used, so the greeting can be shown before they are loaded
 
-def run_chatbot():
-    print("Initializing Laptop Advisor Chatbot...")
-    laptop_data_manager.initialize_data(force_reprocess=config.REPROCESS_DATA)
-    
-    df = laptop_data_manager.get_laptop_dataframe()
-    if df is None or df.empty:
-        print("Exiting: Laptop data could not be loaded or processed.")
-        return
+logger = logging.getLogger(__name__)
+
+INITIAL_GREETING = "Hello! I'm Laptop Advisor. How can I help you with laptops today? You can ask about a specific model, get recommendations, or type 'exit' to end our chat."
 
-    system_prompt = f"""You are "Laptop Advisor", a friendly and expert chatbot helping users find laptops.
+def build_system_prompt():
+    """System prompt shared by the CLI loop and the async engine."""
+    return f"""You are "Laptop Advisor", a friendly and expert chatbot helping users find laptops.
         Follow this flow:
         1.  Initialize Conversation: Greet the user.
         2.  Capture User Intent: Understand if they want to (a) know about a specific product, or (b) buy a product (get recommendations).
@@ -23,10 +22,12 @@ def run_chatbot():
             *   If (b) "buy a product": Use `recommend_laptops_by_criteria`.
                 *   Politely ask for their budget and persona(s) if not provided. Available personas: {config.PERSONA_VALUES}.
                 *   The function will filter laptops.
+                *   If they describe specific needs in their own words (e.g. "thin laptop for video editing with long battery"), use `search_laptops` with that text, plus their budget/personas if known, instead of asking follow-up questions.
             *   If the user's query seems harmful or completely off-topic: Politely decline to engage with the harmful part and steer back to laptops. If they persist with harmful or abusive language, you can use `end_conversation`.
         4.  Products Found?:
             *   If `get_laptop_info` finds a product, present its details clearly and concisely.
             *   If `recommend_laptops_by_criteria` finds products, recommend them, highlighting key features like Brand, Model, Price, and main specs.
+            *   Recommendations are ranked best first. If the user wants to see more options, call `recommend_laptops_by_criteria` again with the same criteria and `offset` set to the previous `next_offset`.
             *   If no products are found, inform the user with the message from the function.
         5.  Exit?: After providing information or recommendations, ask "Is there anything else I can help you with, or would you like to look for other options or exit?".
             *   If they want to exit or say thanks/goodbye, use `end_conversation`.
@@ -34,92 +35,128 @@ def run_chatbot():
 
         Always be concise and helpful. When presenting laptop data, format it nicely.
         Do not make up information. Rely on the function outputs.
+        Function outputs may list laptops as a table: `columns` names the fields and each entry of `rows` is one laptop.
         If a function call returns an error or unexpected data, inform the user you encountered an issue and try to proceed or ask for clarification.
     """
-    messages = [{"role": "system", "content": system_prompt}]
 
-    initial_greeting = "Hello! I'm Laptop Advisor. How can I help you with laptops today? You can ask about a specific model, get recommendations, or type 'exit' to end our chat."
-    print(f"Laptop Advisor: {initial_greeting}")
-    messages.append({"role": "assistant", "content": initial_greeting})
+def run_turn(messages, user_input, tools_def=None):
+    """Handles one user turn: the model call, any tool calls and the follow-up call.
+
+    Returns (messages, reply, ended); `messages` is the updated history, already fitted into the
+    token budget.
+    """
+    with metrics.turn_trace(mode="cli"):
+        return _run_turn(messages, user_input, tools_def)
+
+def _run_turn(messages, user_input, tools_def):
+    import llm_utils
+    import chatbot_functions
+    import tool_dispatch
+    import answer_cache
+    tools_def = tools_def or chatbot_functions.get_tools_definition()
+    messages.append({"role": "user", "content": user_input})
+    try:
+        response_message = llm_utils.get_chatbot_completion(
+            messages=messages,
+            tools=tools_def,
+            tool_choice="auto"
+        )
+        messages.append(response_message) # Add assistant's response/tool_call
+
+        if response_message.tool_calls:
+            # All tool calls of this turn run concurrently; results keep the order of the calls
+            results = tool_dispatch.dispatch_tool_calls(response_message.tool_calls)
+            goodbye = tool_dispatch.find_goodbye(results)
+            if goodbye is not None:
+                return messages, goodbye, True # End conversation
+            tool_messages = [result["message"] for result in results]
+            messages.extend(tool_messages)
+
+            # The same tool calls with the same results get the answer generated last time
+            calls = [tool_dispatch.tool_call_fields(tool_call)[1:] for tool_call in response_message.tool_calls]
+            cache_key, reply = answer_cache.lookup(calls, tool_messages)
+            metrics.annotate(answer_cached=reply is not None)
+            if reply is None:
+                # Get final response from LLM after tool execution (no tools needed here generally)
+                try:
+                    reply = llm_utils.create_chatbot_completion(messages=messages).content
+                except Exception as e:
+                    reply = llm_utils.chatbot_error_message(e).content # Shown to the user, never cached
+                else:
+                    answer_cache.store(cache_key, reply)
+            messages.append({"role": "assistant", "content": reply})
+
+        else: # No tool call, direct response from LLM
+            reply = response_message.content
+            if not reply:
+                reply = "I'm not sure how to respond to that. Can you try rephrasing?"
+                messages.append({"role": "assistant", "content": "I'm not sure how to respond to that."})
+
+        # Fit the history into the token budget (old tool results compacted, oldest exchanges dropped)
+        messages, history_report = history_manager.compact_history(messages)
+        metrics.annotate(history_tokens=history_report["tokens_after"], tokens_saved=history_report["tokens_saved"])
+        if config.HISTORY_REPORT:
+            print(history_manager.format_report(history_report))
+        return messages, reply, False
 
-    available_funcs_map = chatbot_functions.get_available_functions_map()
-    tools_def = chatbot_functions.get_tools_definition()
+    except Exception as e:
+        logger.exception("A critical error occurred in the main loop: %s", e)
+        # Simple recovery: pop last user message if it might have caused issue and offer to restart or try again
+        if messages and isinstance(messages[-1], dict) and messages[-1]["role"] == "user":
+            messages.pop()
+        return messages, "I'm having some trouble. Please try rephrasing your request or type 'exit'.", False
+
+def warm_up():
+    """Loads everything the first turn needs: the catalog, its query indexes, the tool modules and the API client.
+
+    Returns False if the catalog could not be loaded.
+    """
+    import laptop_data_manager
+    import catalog_reloader
+    import llm_utils
+    import chatbot_functions # noqa: F401 -- imported here so the first turn does not pay for it
+    import tool_dispatch # noqa: F401
+    laptop_data_manager.initialize_data(force_reprocess=config.REPROCESS_DATA)
+    df = laptop_data_manager.get_laptop_dataframe()
+    if df is None or df.empty:
+        return False
+    laptop_data_manager.get_catalog_index().semantic_index()
+    catalog_reloader.start_reloader()
+    llm_utils.get_client()
+    return True
+
+def run_chatbot():
+    metrics.configure_logging()
+    print("Initializing Laptop Advisor Chatbot...")
+    if config.FAST_START:
+        # Greet right away; the catalog loads while the user types the first message
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warm-up")
+        ready = executor.submit(warm_up)
+        executor.shutdown(wait=False)
+    else:
+        ready = None
+        if not warm_up():
+            logger.error("Exiting: Laptop data could not be loaded or processed.")
+            return
+
+    messages = [{"role": "system", "content": build_system_prompt()}]
+
+    print(f"Laptop Advisor: {INITIAL_GREETING}")
+    messages.append({"role": "assistant", "content": INITIAL_GREETING})
 
     while True:
         user_input = input("You: ")
         if not user_input:
             continue
-        messages.append({"role": "user", "content": user_input})
-
-        try:
-            response_message = llm_utils.get_chatbot_completion(
-                messages=messages,
-                tools=tools_def,
-                tool_choice="auto"
-            )
-            messages.append(response_message) # Add assistant's response/tool_call
-
-            if response_message.tool_calls:
-                for tool_call in response_message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_to_call = available_funcs_map.get(function_name)
-                    
-                    if not function_to_call:
-                        print(f"Laptop Advisor: I'm sorry, I tried to use an unknown action: {function_name}")
-                        tool_response_content = json.dumps({"error": f"Unknown function '{function_name}' requested by model."})
-                    else:
-                        try:
-                            function_args = json.loads(tool_call.function.arguments)
-                            print(f"Calling function: {function_name} with args: {function_args}")
-                            tool_response_content = function_to_call(**function_args)
-                        except json.JSONDecodeError:
-                            error_msg = f"Invalid arguments format provided by model for {function_name}."
-                            print(f"Laptop Advisor: {error_msg}")
-                            tool_response_content = json.dumps({"error": error_msg, "arguments_received": tool_call.function.arguments})
-                        except TypeError as e:
-                            error_msg = f"Argument mismatch for {function_name}: {e}"
-                            print(f"Laptop Advisor: {error_msg}")
-                            tool_response_content = json.dumps({"error": error_msg, "arguments_received": tool_call.function.arguments})
-                        except Exception as e:
-                            error_msg = f"An unexpected error occurred while executing {function_name}: {e}"
-                            print(f"Laptop Advisor: {error_msg}")
-                            tool_response_content = json.dumps({"error": error_msg})
-                    
-                    function_response_data = json.loads(tool_response_content) # For internal logic (e.g., end_conversation)
-
-                    if function_name == "end_conversation" and function_response_data.get("status") == "ended":
-                        print(f"Laptop Advisor: {function_response_data.get('message', 'Goodbye!')}")
-                        return # End conversation
-
-                    messages.append(
-                        {"role": "tool", "tool_call_id": tool_call.id, "name": function_name, "content": tool_response_content}
-                    )
-                
-                # Get final response from LLM after tool execution
-                second_response_message = llm_utils.get_chatbot_completion(messages=messages) # No tools needed here generally
-                final_response_content = second_response_message.content
-                print(f"Laptop Advisor: {final_response_content}")
-                messages.append({"role": "assistant", "content": final_response_content})
-
-            else: # No tool call, direct response from LLM
-                if response_message.content:
-                    print(f"Laptop Advisor: {response_message.content}")
-                else: 
-                    print("Laptop Advisor: I'm not sure how to respond to that. Can you try rephrasing?")
-                    messages.append({"role": "assistant", "content": "I'm not sure how to respond to that."})
-            
-            # History pruning
-            if len(messages) > config.MAX_HISTORY_MESSAGES:
-                # Keep system prompt, then the last N messages
-                messages = [messages[0]] + messages[-(config.MAX_HISTORY_MESSAGES - 1):]
-
-        except Exception as e:
-            print(f"Laptop Advisor: An critical error occurred in the main loop: {e}")
-            # Simple recovery: pop last user message if it might have caused issue and offer to restart or try again
-            if messages and messages[-1]["role"] == "user": 
-                messages.pop() 
-            print("Laptop Advisor: I'm having some trouble. Please try rephrasing your request or type 'exit'.")
-
+        if ready is not None:
+            loaded, ready = ready.result(), None
+            if not loaded:
+                logger.error("Exiting: Laptop data could not be loaded or processed.")
+                return
+        messages, reply, ended = run_turn(messages, user_input)
+        print(f"Laptop Advisor: {reply}")
+        if ended:
+            return
 
 if __name__ == "__main__":
     run_chatbot()
\ No newline at end of file
@@ -0,0 +1,211 @@
+# metrics.py
+"""In-process instrumentation: logging setup, counters, histograms, timing spans and per-turn traces.
+
+Hot paths call inc(), observe() and span(). Values live in module-level dicts behind one lock, so
+recording one is a dict update. render_prometheus() formats them in the Prometheus text format
+(chat_server.py serves it at GET /metrics). turn_trace() gathers the spans and counters of one chat
+turn and, when config.TRACE_LOG_PATH is set, appends them to that file as one JSON line.
+"""
+import bisect
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+import config
+
+PREFIX = "laptop_advisor_"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0) # Seconds
+
+# Every metric recorded in the project: name -> (type, help)
+METRICS = {
+    "llm_request_seconds": ("histogram", "Latency of chat completions requests (kind: preprocessing, chatbot, chatbot_stream)."),
+    "llm_first_token_seconds": ("histogram", "Time to the first streamed token of a chatbot completion."),
+    "llm_requests_total": ("counter", "Chat completions requests by kind and status (ok, error)."),
+    "llm_tokens_total": ("counter", "Tokens reported in response.usage by kind and type (prompt, completion)."),
+    "llm_retries_total": ("counter", "Retries of transient API errors."),
+    "llm_cache_lookups_total": ("counter", "Preprocessing response cache lookups by result (hit, miss)."),
+    "answer_cache_lookups_total": ("counter", "Cached final answers of tool turns looked up, by result (hit, miss)."),
+    "ranking_cache_lookups_total": ("counter", "Recommendation ranking cache lookups by result (hit, miss)."),
+    "tool_seconds": ("histogram", "Execution time of each tool call."),
+    "tool_calls_total": ("counter", "Tool calls by tool and status (ok, error, timeout)."),
+    "catalog_step_seconds": ("histogram", "Duration of the catalog load/convert/index steps."),
+    "catalog_rows": ("gauge", "Laptops in the loaded catalog."),
+    "catalog_version": ("gauge", "Number of catalog snapshots published since start (bumped by every reload)."),
+    "catalog_reloads_total": ("counter", "Catalog hot reloads by kind (prices, full, preprocessed, error)."),
+    "history_tokens_saved_total": ("counter", "Prompt tokens removed from histories by compaction."),
+    "turn_seconds": ("histogram", "Duration of a whole chat turn (model calls and tools)."),
+    "sessions": ("gauge", "Live sessions in the chat server."),
+    "sessions_total": ("counter", "Chat server sessions by event (created, evicted, expired) since start."),
+}
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counters = {} # name -> {labels: value}
+_gauges = {}   # name -> {labels: value}
+_histograms = {} # name -> {labels: [bucket counts..., +Inf count, sum]}
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_trace_lock = threading.Lock()
+
+
+def configure_logging(level=None):
+    """Routes the project's log output to stderr at config.LOG_LEVEL (called by the entry points)."""
+    logging.basicConfig(level=(level or config.LOG_LEVEL).upper(), format=config.LOG_FORMAT)
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def _trace_count(name, value, labels):
+    trace = _current_trace.get()
+    if trace is not None:
+        key = name + "".join(f",{k}={v}" for k, v in _labels(labels))
+        trace["counters"][key] = trace["counters"].get(key, 0) + value
+
+def inc(name, value=1, **labels):
+    """Adds `value` to a counter."""
+    if config.METRICS_ENABLED:
+        key = _labels(labels)
+        with _lock:
+            series = _counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+    _trace_count(name, value, labels)
+
+def set_gauge(name, value, **labels):
+    if config.METRICS_ENABLED:
+        with _lock:
+            _gauges.setdefault(name, {})[_labels(labels)] = value
+
+def observe(name, value, **labels):
+    """Records one value (seconds for the *_seconds metrics) in a histogram."""
+    if not config.METRICS_ENABLED:
+        return
+    key = _labels(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        values = series.get(key)
+        if values is None:
+            values = series[key] = [0] * (len(DEFAULT_BUCKETS) + 1) + [0.0]
+        values[bisect.bisect_left(DEFAULT_BUCKETS, value)] += 1
+        values[-1] += value
+
+@contextlib.contextmanager
+def span(name, **labels):
+    """Times the block into the `<name>_seconds` histogram (and the current turn trace, if any)."""
+    trace = _current_trace.get()
+    if not config.METRICS_ENABLED and trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe(f"{name}_seconds", elapsed, **labels)
+        if trace is not None:
+            trace["spans"].append({"name": name, **labels, "ms": round(1000 * elapsed, 3)})
+
+
+@contextlib.contextmanager
+def turn_trace(**fields):
+    """Collects the spans and counters recorded during one chat turn (including its tool threads).
+
+    The trace is appended to config.TRACE_LOG_PATH as a JSON line when the block ends; without a
+    path this only times the turn.
+    """
+    if not config.TRACE_LOG_PATH:
+        with span("turn"):
+            yield None
+        return
+    trace = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **fields, "spans": [], "counters": {}}
+    token = _current_trace.set(trace)
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        elapsed = time.perf_counter() - start
+        observe("turn_seconds", elapsed)
+        trace["total_ms"] = round(1000 * elapsed, 3)
+        try:
+            with _trace_lock, open(config.TRACE_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            logger.warning("Could not write the turn trace to %s: %s", config.TRACE_LOG_PATH, e)
+
+
+def annotate(**fields):
+    """Adds fields (e.g. history size) to the current turn trace; a no-op outside a traced turn."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.update(fields)
+
+
+def snapshot():
+    """Plain-dict copy of every recorded value, for tests and benchmarks."""
+    with _lock:
+        return {
+            "counters": {name: dict(series) for name, series in _counters.items()},
+            "gauges": {name: dict(series) for name, series in _gauges.items()},
+            "histograms": {name: {key: {"count": sum(v[:-1]), "sum": v[-1]} for key, v in series.items()}
+                           for name, series in _histograms.items()},
+        }
+
+def counter_value(name, **labels):
+    with _lock:
+        return _counters.get(name, {}).get(_labels(labels), 0)
+
+def hit_rate(name):
+    """Share of `result="hit"` lookups in a *_lookups_total counter (None before any lookup)."""
+    with _lock:
+        series = _counters.get(name, {})
+        hits = sum(v for k, v in series.items() if ("result", "hit") in k)
+        total = sum(series.values())
+    return hits / total if total else None
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters = {name: dict(series) for name, series in _counters.items()}
+        gauges = {name: dict(series) for name, series in _gauges.items()}
+        histograms = {name: {key: list(v) for key, v in series.items()} for name, series in _histograms.items()}
+    lines = []
+
+    def header(name, default_type):
+        metric_type, help_text = METRICS.get(name, (default_type, ""))
+        if help_text:
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{name} {metric_type}")
+
+    for kind, table in (("counter", counters), ("gauge", gauges)):
+        for name in sorted(table):
+            header(name, kind)
+            for key, value in sorted(table[name].items()):
+                lines.append(f"{PREFIX}{name}{_format_labels(key)} {value}")
+    for name in sorted(histograms):
+        header(name, "histogram")
+        for key, values in sorted(histograms[name].items()):
+            cumulative = 0
+            for bound, count in zip(DEFAULT_BUCKETS + ("+Inf",), values[:-1]):
+                cumulative += count
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {values[-1]:.6f}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,299 @@
+# openai_stub_server.py
+"""Local stand-in for the OpenAI chat completions API, for exercising the chatbot offline.
+
+Run it and point config.OPENAI_BASE_URL at it:
+    python openai_stub_server.py --port 8765
+    OPENAI_BASE_URL = "http://127.0.0.1:8765/v1"
+
+Replies are deterministic and rule based: the preprocessing prompts are answered with spec_rules,
+budgets/personas become recommend_laptops_by_criteria calls, "looking for ..." becomes
+search_laptops, "tell me about X" becomes get_laptop_info, "compare X and Y" becomes one
+get_laptop_info call per model, goodbyes become end_conversation, and tool results are summarized
+back as text. Both plain and `stream=True` (server-sent events) responses are supported.
+FakeClient and FakeAsyncClient serve the same replies in-process, without HTTP.
+"""
+import argparse
+import ast
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+import result_encoder
+import spec_rules
+
+_ids = itertools.count(1)
+
+_GOODBYE_RE = re.compile(r"\b(?:bye|goodbye|exit|quit|that's all)\b", re.IGNORECASE)
+_COMPARE_RE = re.compile(r"\bcompare\s+(.+)", re.IGNORECASE)
+_ABOUT_RE = re.compile(r"\b(?:about|info on|details (?:of|for|on))\s+(?:the\s+)?(.+?)[?.!]*$", re.IGNORECASE)
+_BUDGET_RE = re.compile(r"\b(?:under|below|up to|less than|budget(?: is| of)?)\s*(?:rs\.?|inr|\$)?\s*(\d[\d,]*)\s*(k\b)?", re.IGNORECASE)
+_MORE_RE = re.compile(r"\b(?:more|other options|next)\b", re.IGNORECASE)
+_SEARCH_RE = re.compile(r"\b(?:search for|find me|looking for)\s+(.+?)[?.!]*$", re.IGNORECASE)
+_PAGED_TOOLS = ("recommend_laptops_by_criteria", "search_laptops")
+_BATCH_ENTRY_RE = re.compile(r'^id (\d+): "(.*)"$', re.MULTILINE)
+_SINGLE_DESCRIPTION_RE = re.compile(r'classify the following laptop description: "(.*)"\.$', re.DOTALL)
+
+
+def _tool_call(name, arguments):
+    return {"id": f"call_{next(_ids)}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+def _last_paged_call(messages):
+    """(name, arguments) of the latest recommend/search call, or (None, None)."""
+    for message in reversed(messages):
+        for tool_call in message.get("tool_calls") or []:
+            if tool_call["function"]["name"] in _PAGED_TOOLS:
+                return tool_call["function"]["name"], json.loads(tool_call["function"]["arguments"] or "{}")
+    return None, None
+
+def _summarize_tool_result(content):
+    try:
+        result = json.loads(content)
+    except (TypeError, json.JSONDecodeError):
+        return "I ran into an issue looking that up."
+    data = result_encoder.records_from(result.get("data"))
+    if isinstance(data, list) and data:
+        options = "; ".join(f"{d.get('Brand', '')} {d.get('Model Name', '')} at {d.get('Price')}".strip() for d in data)
+        return f"Here are {len(data)} of {result.get('count', len(data))} matching laptops: {options}. Is there anything else I can help you with?"
+    if isinstance(data, dict):
+        return f"The {data.get('Brand', '')} {data.get('Model Name', '')} is priced at {data.get('Price')}. Is there anything else I can help you with?".replace("  ", " ")
+    return result.get("message") or result.get("error") or "Done."
+
+def _rule_specs(description):
+    """Spec ratings from the local rules, with undecided fields rated medium."""
+    return {key: value or "medium" for key, value in spec_rules.classify_specs(description).items()}
+
+def _fake_preprocessing(system_prompt, user_content):
+    """JSON content for the preprocessing prompts of laptop_data_manager, answered with spec_rules; None for other prompts."""
+    if system_prompt.lstrip().startswith("You are a Laptop Specifications Classifier"):
+        entries = _BATCH_ENTRY_RE.findall(user_content)
+        if entries:
+            return json.dumps({i: _rule_specs(description) for i, description in entries})
+        single = _SINGLE_DESCRIPTION_RE.search(user_content)
+        return json.dumps(_rule_specs(single.group(1) if single else user_content))
+    if system_prompt.lstrip().startswith("You are a Laptop Persona Classifier"):
+        try:
+            specs = ast.literal_eval(user_content[user_content.rindex("{"):user_content.rindex("}") + 1])
+        except (ValueError, SyntaxError):
+            specs = None
+        return json.dumps({"persona": spec_rules.lookup_personas(specs) or []})
+    return None
+
+def fake_completion(params):
+    """Builds the assistant message {"content", "tool_calls"} the stub returns for a chat completions request."""
+    # The in-process clients may get SDK message objects (as the real SDK does) instead of dicts
+    messages = [m.model_dump(exclude_none=True) if hasattr(m, "model_dump") else m for m in params.get("messages", [])]
+    last = messages[-1] if messages else {"role": "user", "content": ""}
+    if len(messages) == 2 and messages[0].get("role") == "system" and not params.get("tools"):
+        content = _fake_preprocessing(str(messages[0].get("content") or ""), str(last.get("content") or ""))
+        if content is not None:
+            return {"content": content, "tool_calls": None}
+    if last.get("role") == "tool":
+        # Summarize every tool result of the latest assistant turn
+        results = []
+        for message in reversed(messages):
+            if message.get("role") != "tool":
+                break
+            results.append(_summarize_tool_result(message.get("content")))
+        return {"content": " ".join(reversed(results)), "tool_calls": None}
+
+    text = str(last.get("content") or "")
+    if params.get("tools"):
+        if _GOODBYE_RE.search(text):
+            return {"content": None, "tool_calls": [_tool_call("end_conversation", {})]}
+        compare = _COMPARE_RE.search(text)
+        if compare:
+            models = [m.strip(" ?.!") for m in re.split(r",|\band\b|\bvs\.?\b|\bwith\b", compare.group(1)) if m.strip(" ?.!")]
+            return {"content": None, "tool_calls": [_tool_call("get_laptop_info", {"model_name": m}) for m in models]}
+        about = _ABOUT_RE.search(text)
+        if about:
+            return {"content": None, "tool_calls": [_tool_call("get_laptop_info", {"model_name": about.group(1).strip()})]}
+        if _MORE_RE.search(text):
+            name, previous = _last_paged_call(messages)
+            if previous is not None:
+                previous["offset"] = previous.get("offset", 0) + config.RECOMMENDATION_PAGE_SIZE
+                return {"content": None, "tool_calls": [_tool_call(name, previous)]}
+        arguments = {}
+        budget = _BUDGET_RE.search(text)
+        if budget:
+            amount = int(budget.group(1).replace(",", ""))
+            arguments["budget_max"] = amount * 1000 if budget.group(2) else amount
+        personas = [p for p in config.PERSONA_VALUES if p.replace("_", " ") in text.lower() or p in text.lower()]
+        if personas:
+            arguments["personas"] = personas
+        search = _SEARCH_RE.search(text)
+        if search:
+            return {"content": None, "tool_calls": [_tool_call("search_laptops", dict(arguments, query=search.group(1)))]}
+        if arguments:
+            return {"content": None, "tool_calls": [_tool_call("recommend_laptops_by_criteria", arguments)]}
+    return {"content": "Could you tell me your budget and what you will mainly use the laptop for?", "tool_calls": None}
+
+
+def completion_response(params, message=None):
+    """Non-streaming chat.completion payload for `message` (by default the stub's own reply)."""
+    message = message or fake_completion(params)
+    prompt_tokens = len(json.dumps(params.get("messages", []), default=str)) // 4
+    completion_tokens = len(json.dumps(message)) // 4
+    return {
+        "id": f"chatcmpl-stub-{next(_ids)}", "object": "chat.completion", "created": int(time.time()),
+        "model": params.get("model", config.CHATBOT_MODEL_ID),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": message["content"], "tool_calls": message["tool_calls"]},
+            "finish_reason": "tool_calls" if message["tool_calls"] else "stop",
+        }],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+def completion_chunks(params, message=None):
+    """chat.completion.chunk payloads for a streamed `message` (by default the stub's own reply): text word by word, tool calls as argument deltas."""
+    message = message or fake_completion(params)
+    base = {"id": f"chatcmpl-stub-{next(_ids)}", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": params.get("model", config.CHATBOT_MODEL_ID)}
+
+    def chunk(delta, finish_reason=None):
+        return dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+    yield chunk({"role": "assistant", "content": ""})
+    if message["tool_calls"]:
+        for i, tool_call in enumerate(message["tool_calls"]):
+            arguments = tool_call["function"]["arguments"]
+            half = len(arguments) // 2
+            yield chunk({"tool_calls": [{"index": i, "id": tool_call["id"], "type": "function",
+                                         "function": {"name": tool_call["function"]["name"], "arguments": ""}}]})
+            for piece in (arguments[:half], arguments[half:]):
+                yield chunk({"tool_calls": [{"index": i, "function": {"arguments": piece}}]})
+        yield chunk({}, "tool_calls")
+    else:
+        for word in re.findall(r"\S+\s*", message["content"] or ""):
+            yield chunk({"content": word})
+        yield chunk({}, "stop")
+
+
+class _FakeAsyncStream:
+    """Async iterator over ChatCompletionChunk objects, like the SDK's AsyncStream."""
+
+    def __init__(self, params, first_token_delay, token_delay):
+        from openai.types.chat import ChatCompletionChunk
+        self._chunks = [ChatCompletionChunk.model_validate(payload) for payload in completion_chunks(params)]
+        self._first_token_delay = first_token_delay
+        self._token_delay = token_delay
+        self._position = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._position >= len(self._chunks):
+            raise StopAsyncIteration
+        delay = self._first_token_delay if self._position == 0 else self._token_delay
+        if delay:
+            await asyncio.sleep(delay)
+        chunk = self._chunks[self._position]
+        self._position += 1
+        return chunk
+
+
+class FakeAsyncClient:
+    """In-process drop-in for openai.AsyncOpenAI (chat.completions.create only), backed by fake_completion.
+
+    Lets load tests measure the chatbot itself without an HTTP hop to a stub or the real API;
+    the delays simulate model latency without using CPU.
+    """
+
+    def __init__(self, first_token_delay=0.0, token_delay=0.0):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **params):
+        if params.get("stream"):
+            return _FakeAsyncStream(params, self.first_token_delay, self.token_delay)
+        from openai.types.chat import ChatCompletion
+        if self.first_token_delay:
+            await asyncio.sleep(self.first_token_delay)
+        return ChatCompletion.model_validate(completion_response(params))
+
+
+class FakeClient:
+    """In-process drop-in for openai.OpenAI (chat.completions.create only), backed by fake_completion.
+
+    `latency` seconds are slept per request to simulate the model.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.chat = self
+        self.completions = self
+
+    def create(self, **params):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+        if self.latency:
+            time.sleep(self.latency)
+        if params.get("stream"):
+            return (ChatCompletionChunk.model_validate(payload) for payload in completion_chunks(params))
+        return ChatCompletion.model_validate(completion_response(params))
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0" # Close after each response, so streams need no chunked encoding
+    first_token_delay = 0.0
+    token_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.first_token_delay)
+        if params.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for payload in completion_chunks(params):
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(self.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+        else:
+            body = json.dumps(completion_response(params)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+
+def start_stub_server(host="127.0.0.1", port=0, first_token_delay=0.0, token_delay=0.0):
+    """Starts the stub on a background thread; returns (server, base_url). Call server.shutdown() to stop it."""
+    handler = type("StubHandler", (_StubHandler,), {"first_token_delay": first_token_delay, "token_delay": token_delay})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the OpenAI chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="Seconds before the first byte of every response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    args = parser.parse_args()
+    server, base_url = start_stub_server(args.host, args.port, args.first_token_delay, args.token_delay)
+    print(f"OpenAI stub listening on {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
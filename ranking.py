@@ -0,0 +1,125 @@
+# ranking.py
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import config
+import metrics
+import spec_rules
+
+# Number of set bits for every possible uint16 persona mask
+_POPCOUNT = np.array([bin(i).count("1") for i in range(1 << 16)], dtype=np.uint8)
+
+
+def _relevant_spec_columns(personas):
+    """Indices of the spec columns that matter for the requested personas (all specs if none given)."""
+    keys = set()
+    for persona in personas or []:
+        if isinstance(persona, str):
+            keys.update(config.PERSONA_SPEC_PRIORITIES.get(persona.lower(), []))
+    if not keys:
+        keys = set(spec_rules.LAP_SPEC_KEYS)
+    return [i for i, key in enumerate(spec_rules.LAP_SPEC_KEYS) if key in keys]
+
+def score_candidates(index, positions, budget_min=None, budget_max=None, persona_mask=None, personas=None):
+    """Scores candidate rows in [0, 1] from persona-match strength, budget fit and spec ratings.
+
+    - persona: share of the requested personas the laptop is tagged with
+    - budget: how much of the budget the laptop uses (price / budget_max), so it is the most laptop for the money
+    - specs: mean rating of the specs that matter for the requested personas
+    Components without an input (no personas, no budget) are left out and the weights renormalized.
+    """
+    weights = config.RANKING_WEIGHTS
+    total = np.zeros(len(positions), dtype=np.float32)
+    weight_sum = 0.0
+
+    if persona_mask:
+        requested = int(_POPCOUNT[persona_mask])
+        matched = _POPCOUNT[index.persona_masks[positions] & np.uint16(persona_mask)]
+        total += weights["persona"] * (matched.astype(np.float32) / requested)
+        weight_sum += weights["persona"]
+
+    prices = index.prices[positions]
+    if budget_max:
+        fit = np.clip(prices / float(budget_max), 0, 1)
+    elif budget_min:
+        fit = np.clip(float(budget_min) / prices, 0, 1) # Closest to the minimum
+    else:
+        fit = None
+    if fit is not None:
+        total += weights["budget"] * np.nan_to_num(fit).astype(np.float32)
+        weight_sum += weights["budget"]
+
+    spec_columns = _relevant_spec_columns(personas)
+    total += weights["specs"] * index.spec_levels[positions][:, spec_columns].mean(axis=1)
+    weight_sum += weights["specs"]
+    return total / weight_sum
+
+def top_k(positions, scores, offset=0, limit=5):
+    """Returns (positions, scores) ranked offset..offset+limit, best first, ties broken by catalog order.
+
+    Uses argpartition so only the requested prefix of the ranking is ever sorted. Scores tied at
+    the cut are taken in catalog order too, so consecutive pages never repeat or skip a laptop.
+    """
+    end = min(offset + limit, len(positions))
+    if offset >= end:
+        return positions[:0], scores[:0]
+    if end < len(positions):
+        threshold = np.partition(scores, len(scores) - end)[len(scores) - end]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)
+        need = end - len(above)
+        if len(tied) > need:
+            tied = tied[np.argpartition(positions[tied], need - 1)[:need]]
+        selected = np.concatenate([above, tied])
+    else:
+        selected = np.arange(len(positions))
+    order = np.lexsort((positions[selected], -scores[selected]))
+    selected = selected[order][offset:end]
+    return positions[selected], scores[selected]
+
+
+class RankingCache:
+    """Small LRU of computed rankings, so "show me more" pages reuse the scores of the first request.
+
+    Rankings are only valid for the index they came from. The cache holds rankings of one index at
+    a time and refers to it weakly, so a catalog reload empties it instead of keeping the replaced
+    index (and its DataFrame) alive.
+    """
+
+    def __init__(self, max_entries=config.RANKING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._index = None # weakref to the index the entries were computed on
+        self._lock = threading.Lock()
+
+    def _is_current(self, index):
+        return self._index is not None and self._index() is index
+
+    def get(self, index, key):
+        with self._lock:
+            entry = self._entries.get(key) if self._is_current(index) else None
+            if entry is None:
+                metrics.inc("ranking_cache_lookups_total", result="miss")
+                return None
+            self._entries.move_to_end(key)
+        metrics.inc("ranking_cache_lookups_total", result="hit")
+        return entry
+
+    def put(self, index, key, positions, scores):
+        with self._lock:
+            if not self._is_current(index):
+                self._entries.clear()
+                self._index = weakref.ref(index)
+            self._entries[key] = (positions, scores)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+
+    def __len__(self):
+        return len(self._entries)
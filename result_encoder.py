@@ -0,0 +1,93 @@
+# result_encoder.py
+"""Serializes tool results for the model's prompt.
+
+With config.TOOL_RESULT_FORMAT = "compact", records are projected to config.TOOL_RESULT_FIELDS,
+descriptions are cut to their leading sentences (config.TOOL_RESULT_DESCRIPTION_CHARS), spec ratings
+become one short string, and lists of records are sent as a table (column names once, then one row
+per laptop) instead of repeating every key in every record. "json" sends the results unchanged.
+"""
+import json
+import re
+import config
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_TABLE_KEYS = ("data", "matches") # Result keys that may hold lists of records
+
+
+def summarize_description(text, max_chars=None):
+    """Extractive summary: the leading sentences that fit in max_chars, else the first max_chars cut at a word boundary."""
+    max_chars = config.TOOL_RESULT_DESCRIPTION_CHARS if max_chars is None else max_chars
+    if not isinstance(text, str) or len(text) <= max_chars:
+        return text
+    summary = ""
+    for sentence in _SENTENCE_END_RE.split(text.strip()):
+        candidate = f"{summary} {sentence}".strip()
+        if len(candidate) > max_chars:
+            break
+        summary = candidate
+    if not summary:
+        summary = text[:max_chars].rsplit(" ", 1)[0].rstrip(",;:") + "..."
+    return summary
+
+def _spec_string(ratings):
+    if not isinstance(ratings, dict):
+        return ratings
+    return ", ".join(f"{key}: {value}" for key, value in ratings.items()) or None
+
+def compact_record(record, fields=None):
+    """Projects a record to `fields` (None keeps all), shortens Description and flattens Specification_Ratings."""
+    if not isinstance(record, dict):
+        return record
+    keys = [key for key in fields if key in record] if fields else list(record)
+    compact = {}
+    for key in keys:
+        value = record[key]
+        if isinstance(value, float) and value != value:
+            value = None
+        if key == "Description":
+            if config.TOOL_RESULT_DESCRIPTION_CHARS <= 0:
+                continue
+            value = summarize_description(value)
+        elif key == "Specification_Ratings":
+            value = _spec_string(value)
+        compact[key] = value
+    return compact
+
+
+def to_table(records):
+    """{"columns": [...], "rows": [[...], ...]} for a list of records (columns in first-seen order)."""
+    columns = []
+    for record in records:
+        columns.extend(key for key in record if key not in columns)
+    return {"columns": columns, "rows": [[record.get(column) for column in columns] for record in records]}
+
+def is_table(value):
+    return isinstance(value, dict) and isinstance(value.get("columns"), list) and isinstance(value.get("rows"), list)
+
+def records_from(value):
+    """Inverse of to_table; plain lists of records are returned as they are."""
+    if is_table(value):
+        return [dict(zip(value["columns"], row)) for row in value["rows"]]
+    return value
+
+
+def compact_result(function_name, result):
+    """Compact form of a tool result dict: projected records, tables for record lists."""
+    if not isinstance(result, dict):
+        return result
+    fields = config.TOOL_RESULT_FIELDS.get(function_name)
+    compact = {}
+    for key, value in result.items():
+        if key in _TABLE_KEYS and isinstance(value, list) and value and all(isinstance(r, dict) for r in value):
+            compact[key] = to_table([compact_record(record, fields if key == "data" else None) for record in value])
+        elif key == "data" and isinstance(value, dict):
+            compact[key] = {k: v for k, v in compact_record(value, fields).items() if v is not None}
+        else:
+            compact[key] = value
+    return compact
+
+def encode_tool_result(function_name, result):
+    """JSON string sent to the model as the content of the tool message."""
+    if config.TOOL_RESULT_FORMAT == "compact":
+        return json.dumps(compact_result(function_name, result), separators=(",", ":"), ensure_ascii=False)
+    return json.dumps(result)
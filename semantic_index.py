@@ -0,0 +1,178 @@
+# semantic_index.py
+"""Free-text retrieval over the laptop descriptions with hashed TF-IDF vectors.
+
+Each laptop's text (config.SEMANTIC_INDEX_COLUMNS) becomes a float32 vector of words and word pairs,
+hashed into config.SEMANTIC_INDEX_DIM buckets, weighted by TF-IDF and L2-normalized. The matrix is
+built at preprocessing time, saved as .npy and memory-mapped at startup; a query is one matrix-vector
+product over the rows that passed the price/persona filters. Everything runs locally on the CPU.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import zlib
+import numpy as np
+import config
+import catalog_store
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to with "
+    "i im me my we you your want need looking laptop laptops something good great".split()
+)
+
+
+def _stem(token):
+    """Very light suffix stripping so 'editing'/'edit' and 'laptops'/'laptop' share a feature."""
+    if len(token) > 5 and token.endswith("ing"):
+        return token[:-3]
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+@functools.lru_cache(maxsize=500000)
+def _word_hash(word):
+    """crc32 of the stemmed word (stable across processes, unlike hash()), or -1 for a stopword."""
+    if word in _STOPWORDS:
+        return -1
+    return zlib.crc32(_stem(word).encode("utf-8"))
+
+def _hashed_counts(texts, dim):
+    """Signed hashed feature counts of several texts as sparse (rows, buckets, counts) arrays.
+
+    Features are the words and adjacent word pairs (e.g. 'video edit'); pair hashes are combined
+    from the word hashes in bulk, so each distinct word is hashed in Python only once.
+    """
+    hashes, lengths = [], []
+    for text in texts:
+        words = [h for h in map(_word_hash, _TOKEN_RE.findall(str(text).lower())) if h >= 0]
+        hashes.extend(words)
+        lengths.append(len(words))
+    words = np.asarray(hashes, dtype=np.int64)
+    word_rows = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+    same_row = word_rows[1:] == word_rows[:-1]
+    pairs = ((words[:-1] * 1000003) ^ words[1:])[same_row] & 0xFFFFFFFF
+    hashes = np.concatenate([words, pairs])
+    rows = np.concatenate([word_rows, word_rows[:-1][same_row]])
+
+    signs = np.where((hashes // dim) & 1, -1.0, 1.0)
+    keys, inverse = np.unique(rows * dim + hashes % dim, return_inverse=True)
+    counts = np.bincount(inverse.reshape(-1), weights=signs, minlength=len(keys)).astype(np.float32)
+    keep = counts != 0
+    keys, counts = keys[keep], counts[keep]
+    return keys // dim, keys % dim, counts
+
+def _weigh(counts, idf):
+    """Sublinear term frequency times IDF, keeping the hash sign."""
+    return np.sign(counts) * np.log1p(np.abs(counts)) * idf
+
+def documents_for(df):
+    """Indexed text per row: the configured columns joined with spaces."""
+    columns = [c for c in config.SEMANTIC_INDEX_COLUMNS if c in df.columns]
+    if not columns:
+        return [""] * len(df)
+    text = df[columns[0]].fillna("").astype(str)
+    for column in columns[1:]:
+        text = text + " " + df[column].fillna("").astype(str)
+    return text.tolist()
+
+def fingerprint(documents, dim):
+    digest = hashlib.sha256(str(dim).encode("utf-8"))
+    for document in documents:
+        digest.update(document.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SemanticIndex:
+    """Row-aligned (laptops x dim) float32 matrix of L2-normalized hashed TF-IDF vectors."""
+
+    def __init__(self, matrix, idf, fingerprint=None):
+        self.matrix = matrix
+        self.idf = idf
+        self.dim = matrix.shape[1]
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @classmethod
+    def build(cls, documents, dim=None):
+        dim = dim or config.SEMANTIC_INDEX_DIM
+        rows, buckets, counts = _hashed_counts(documents, dim)
+        document_frequency = np.bincount(buckets, minlength=dim)
+        idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)
+        weights = _weigh(counts, idf[buckets])
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(documents)))
+        # Scattered from the sparse form, so peak memory stays at one dense matrix
+        matrix = np.zeros((len(documents), dim), dtype=np.float32)
+        matrix[rows, buckets] = weights / norms[rows]
+        return cls(matrix, idf, fingerprint(documents, dim))
+
+    def query_vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        _, buckets, counts = _hashed_counts([text], self.dim)
+        weights = _weigh(counts, self.idf[buckets])
+        norm = np.linalg.norm(weights)
+        if norm:
+            vector[buckets] = weights / norm
+        return vector
+
+    def scores(self, query, positions=None):
+        """Cosine similarity of the query to every row in `positions` (all rows if None)."""
+        vector = self.query_vector(query)
+        if positions is None:
+            return self.matrix @ vector
+        if len(positions) > len(self) // 5:
+            return (self.matrix @ vector)[positions] # One pass over the mapped file beats a large gather
+        return self.matrix[positions] @ vector
+
+    def save(self, path=None):
+        path = path or config.SEMANTIC_INDEX_PATH
+        # The previous matrix may be memory-mapped by the published catalog: replace it, don't truncate it
+        with catalog_store.replacing(path) as tmp, open(tmp, "wb") as f:
+            np.save(f, self.matrix)
+        with catalog_store.replacing(_meta_path(path)) as tmp, open(tmp, "w") as f:
+            json.dump({"rows": len(self), "dim": self.dim, "fingerprint": self.fingerprint, "idf": self.idf.tolist()}, f)
+
+    @classmethod
+    def load(cls, path=None):
+        """Memory-maps a saved index; returns None if it is missing or unreadable."""
+        path = path or config.SEMANTIC_INDEX_PATH
+        try:
+            with open(_meta_path(path)) as f:
+                meta = json.load(f)
+            matrix = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if matrix.shape != (meta["rows"], meta["dim"]):
+            return None
+        return cls(matrix, np.asarray(meta["idf"], dtype=np.float32), meta["fingerprint"])
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+def build_and_save(df, documents=None):
+    """Builds the index for a catalog and saves it next to the other preprocessed caches."""
+    index = SemanticIndex.build(documents_for(df) if documents is None else documents)
+    try:
+        index.save()
+    except OSError as e:
+        logger.warning("Could not save the semantic index: %s", e)
+    return index
+
+def load_or_build(df):
+    """The saved index if it matches the catalog's text, else a freshly built (and saved) one."""
+    documents = documents_for(df)
+    index = SemanticIndex.load()
+    if index is not None and index.dim == config.SEMANTIC_INDEX_DIM and index.fingerprint == fingerprint(documents, index.dim):
+        return index
+    logger.info("Building the semantic search index...")
+    return build_and_save(df, documents)
@@ -0,0 +1,189 @@
+# spec_rules.py
+import itertools
+import logging
+import re
+import threading
+import config
+
+logger = logging.getLogger(__name__)
+
+# Same keys and values the _product_map_layer prompt asks the LLM for
+LAP_SPEC_KEYS = ["GPU intensity", "Display quality", "Portability", "Multitasking", "Processing speed"]
+SPEC_VALUES = ["low", "medium", "high"]
+
+# Precompiled once; the rules mirror the classification rules in laptop_data_manager._product_map_layer
+_RAM_RE = re.compile(
+    r"(\d{1,3})\s?GB(?:\s+of)?(?:\s+(?:LP)?DDR\d\w*)?\s+(?:unified\s+)?(?:RAM|memory)\b", re.IGNORECASE
+)
+_WEIGHT_RE = re.compile(r"(\d{1,2}(?:\.\d+)?)\s?kg\b", re.IGNORECASE)
+_RESOLUTION_RE = re.compile(r"\b(\d{3,4})\s?[x×]\s?(\d{3,4})\b")
+_REFRESH_RE = re.compile(r"\b(\d{2,3})\s?Hz\b", re.IGNORECASE)
+_HIGH_RES_RE = re.compile(r"\b(?:4K|UHD\+?|QHD\+?|WQHD|2\.[58]K|3K|Retina|Liquid Retina)\b", re.IGNORECASE)
+_FULL_HD_RE = re.compile(r"\b(?:Full\s?HD|FHD\+?|WUXGA)\b", re.IGNORECASE)
+_PREMIUM_PANEL_RE = re.compile(r"\bOLED\b", re.IGNORECASE)
+
+_GPU_HIGH_RE = re.compile(r"\b(?:RTX|Radeon\s+RX|Apple\s+M\d\s+(?:Pro|Max|Ultra)|M\d\s+(?:Pro|Max|Ultra))\b", re.IGNORECASE)
+_GPU_MEDIUM_RE = re.compile(r"\b(?:MX\s?\d{3}|GTX|Apple\s+M\d|M\d\s+chip)\b", re.IGNORECASE)
+_GPU_LOW_RE = re.compile(r"\b(?:Intel\s+UHD|UHD\s+Graphics|Intel\s+HD\s+Graphics|Iris(?:\s+Xe)?|Radeon\s+(?:Vega|Graphics)|integrated\s+graphics)\b", re.IGNORECASE)
+
+_CPU_HIGH_RE = re.compile(r"\b(?:Core\s+i[79]|i[79]-\d|Ryzen\s+[79]|Core\s+Ultra\s+[79]|M\d\s+(?:Pro|Max|Ultra))\b", re.IGNORECASE)
+_CPU_MEDIUM_RE = re.compile(r"\b(?:Core\s+i5|i5-\d|Ryzen\s+5|Core\s+Ultra\s+5|Apple\s+M\d|M\d\s+chip)\b", re.IGNORECASE)
+_CPU_LOW_RE = re.compile(r"\b(?:Celeron|Pentium|Athlon|MediaTek)\b", re.IGNORECASE)
+
+
+def _classify_multitasking(text):
+    match = _RAM_RE.search(text)
+    if not match:
+        return None
+    ram_gb = int(match.group(1))
+    if ram_gb <= 8:
+        return "low"
+    if ram_gb >= 32:
+        return "high"
+    return "medium"
+
+def _classify_portability(text):
+    match = _WEIGHT_RE.search(text)
+    if not match:
+        return None
+    weight = float(match.group(1))
+    if weight < 1.51:
+        return "high"
+    if weight <= 2.51:
+        return "medium"
+    return "low"
+
+def _classify_display(text):
+    match = _RESOLUTION_RE.search(text)
+    refresh = _REFRESH_RE.search(text)
+    premium = bool(_PREMIUM_PANEL_RE.search(text)) or (refresh is not None and int(refresh.group(1)) >= 120)
+    if match:
+        width, height = sorted((int(match.group(1)), int(match.group(2))), reverse=True)
+        if width > 1920 or height > 1200:
+            return "high"
+        if width >= 1920:
+            return "high" if premium else "medium"
+        return "low"
+    if _HIGH_RES_RE.search(text):
+        return "high"
+    if _FULL_HD_RE.search(text):
+        return "high" if premium else "medium"
+    return None
+
+def _classify_gpu(text):
+    if _GPU_HIGH_RE.search(text):
+        return "high"
+    if _GPU_MEDIUM_RE.search(text):
+        return "medium"
+    if _GPU_LOW_RE.search(text):
+        return "low"
+    return None
+
+def _classify_processor(text):
+    # Core i3 / Ryzen 3 depend on the generation, which the description rarely states: leave those to the LLM
+    if _CPU_HIGH_RE.search(text):
+        return "high"
+    if _CPU_MEDIUM_RE.search(text):
+        return "medium"
+    if _CPU_LOW_RE.search(text):
+        return "low"
+    return None
+
+_SPEC_RULES = {
+    "GPU intensity": _classify_gpu,
+    "Display quality": _classify_display,
+    "Portability": _classify_portability,
+    "Multitasking": _classify_multitasking,
+    "Processing speed": _classify_processor,
+}
+
+def classify_specs(description: str):
+    """Applies the classification rules locally. Returns {key: value or None}; None means the rules cannot decide."""
+    if not isinstance(description, str):
+        return {key: None for key in LAP_SPEC_KEYS}
+    return {key: _SPEC_RULES[key](description) for key in LAP_SPEC_KEYS}
+
+
+def _personas_for(gpu, display, portability, multitasking, processing):
+    """Deterministic persona rules, consistent with the few-shot examples in the _persona_tag prompt."""
+    personas = []
+    if gpu == "high" and processing != "low":
+        personas.append("gamer")
+    if portability != "low" and gpu != "high":
+        personas.append("student")
+    if portability == "high" and processing != "low":
+        personas.append("business")
+    if display == "high" and gpu != "low" and processing != "low":
+        personas.append("professional_creator")
+    if multitasking == "high" or (processing == "high" and multitasking == "medium"):
+        personas.append("developer")
+    if gpu != "high" and processing != "high":
+        personas.append("casual_user")
+    if portability == "high":
+        personas.append("traveler")
+    if gpu == "low" and processing != "high" and multitasking != "high":
+        personas.append("budget_conscious")
+    return [p for p in personas if p in config.PERSONA_VALUES]
+
+# All 3^5 = 243 spec combinations, computed once at import
+PERSONA_LOOKUP = {
+    combo: _personas_for(*combo) for combo in itertools.product(SPEC_VALUES, repeat=len(LAP_SPEC_KEYS))
+}
+
+def lookup_personas(specs_dict: dict):
+    """Returns the persona list for a fully classified specs dict, or None if any value is not low/medium/high."""
+    if not isinstance(specs_dict, dict):
+        return None
+    combo = tuple(specs_dict.get(key) for key in LAP_SPEC_KEYS)
+    personas = PERSONA_LOOKUP.get(combo)
+    return list(personas) if personas is not None else None
+
+
+class AgreementReport:
+    """Thread-safe tally of how often the local rules agree with the LLM, per spec field and for personas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fields = {key: {"agree": 0, "disagree": 0, "undecided": 0} for key in LAP_SPEC_KEYS + ["Persona"]}
+
+    def record_specs(self, rule_specs, llm_specs):
+        with self._lock:
+            for key in LAP_SPEC_KEYS:
+                if rule_specs.get(key) is None:
+                    self.fields[key]["undecided"] += 1
+                elif rule_specs[key] == llm_specs.get(key):
+                    self.fields[key]["agree"] += 1
+                else:
+                    self.fields[key]["disagree"] += 1
+
+    def record_personas(self, rule_personas, llm_personas):
+        with self._lock:
+            if rule_personas is None:
+                self.fields["Persona"]["undecided"] += 1
+            elif set(rule_personas) == set(llm_personas or []):
+                self.fields["Persona"]["agree"] += 1
+            else:
+                self.fields["Persona"]["disagree"] += 1
+
+    def summary(self):
+        """Per-field agreement rate over the rows where the rules made a decision, plus decision coverage."""
+        with self._lock:
+            result = {}
+            for key, counts in self.fields.items():
+                decided = counts["agree"] + counts["disagree"]
+                total = decided + counts["undecided"]
+                result[key] = dict(
+                    counts,
+                    agreement=counts["agree"] / decided if decided else None,
+                    coverage=decided / total if total else None,
+                )
+            return result
+
+    def print_summary(self):
+        logger.info("Rule/LLM agreement (agreement over decided rows, coverage = share of rows the rules decided):")
+        for key, stats in self.summary().items():
+            if stats["coverage"] is None:
+                continue
+            agreement = f"{stats['agreement']:.1%}" if stats["agreement"] is not None else "n/a"
+            logger.info("  %s: agreement %s, coverage %.1f%% (%d agree, %d disagree, %d undecided)",
+                        key, agreement, 100 * stats['coverage'], stats['agree'], stats['disagree'], stats['undecided'])
@@ -0,0 +1,34 @@
+# tests/conftest.py
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import llm_backends
+import llm_utils
+
+
+@pytest.fixture
+def fake_llm(monkeypatch, tmp_path):
+    """Offline LLM (the fake backend), unthrottled and uncached, with files written to a scratch directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "LLM_BACKEND", "fake")
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(llm_utils, "client", llm_backends.create_client("fake"))
+    monkeypatch.setattr(llm_utils, "preprocessing_rate_limiter", llm_utils.RateLimiter())
+    return tmp_path
+
+
+@pytest.fixture
+def catalog(monkeypatch, tmp_path):
+    """Publishes a preprocessed synthetic catalog of 300 laptops (classified by the local rules) from a scratch directory."""
+    import laptop_data_manager
+    from benchmarks.run_benchmarks import write_preprocessed_catalog
+    monkeypatch.chdir(tmp_path)
+    for name in ("df_laptops", "catalog_index", "catalog_version"):
+        monkeypatch.setattr(laptop_data_manager, name, getattr(laptop_data_manager, name))
+    write_preprocessed_catalog(300, seed=0)
+    laptop_data_manager.initialize_data(force_reprocess=False)
+    return laptop_data_manager.get_catalog_index()
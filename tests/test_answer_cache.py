@@ -0,0 +1,43 @@
+# tests/test_answer_cache.py
+import pytest
+import answer_cache
+import llm_utils
+import main_chatbot
+
+QUESTION = "Hi, I'm a student and my budget is under 60000"
+
+
+class _FailingAnswers:
+    """Wraps a client so the completion after the tool results (the one without tools) fails while `failing` is set."""
+
+    def __init__(self, client):
+        self.client = client
+        self.failing = True
+        self.chat = self
+        self.completions = self
+
+    def create(self, **params):
+        if self.failing and "tools" not in params:
+            raise RuntimeError("service unavailable")
+        return self.client.chat.completions.create(**params)
+
+
+@pytest.fixture
+def failing_client(fake_llm, catalog, monkeypatch):
+    monkeypatch.setattr(answer_cache, "_answer_cache", answer_cache.AnswerCache())
+    client = _FailingAnswers(llm_utils.client)
+    monkeypatch.setattr(llm_utils, "client", client)
+    return client
+
+
+def test_failed_answers_are_not_cached(failing_client):
+    _, reply, _ = main_chatbot._run_turn([], QUESTION, None)
+    assert reply.startswith("Sorry, an error occurred")
+    assert len(answer_cache.get_answer_cache()) == 0
+
+    failing_client.failing = False
+    _, reply, _ = main_chatbot._run_turn([], QUESTION, None)
+    assert not reply.startswith("Sorry")
+    assert len(answer_cache.get_answer_cache()) == 1
+    _, cached, _ = main_chatbot._run_turn([], QUESTION, None)
+    assert cached == reply
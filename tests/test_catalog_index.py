@@ -0,0 +1,87 @@
+# tests/test_catalog_index.py
+import random
+import numpy as np
+import pytest
+import config
+import catalog_index
+from catalog_index import ModelNameIndex, normalize_name
+
+BRANDS = ["Apple MacBook", "Dell Inspiron", "HP Pavilion", "Lenovo ThinkPad", "ASUS ROG Strix", "ASUS ZenBook", "Acer Aspire"]
+LINES = ["Air", "Pro", "Plus", "X1 Carbon", "Gaming", "Slim", ""]
+
+
+def _names(count, seed=0):
+    rnd = random.Random(seed)
+    return [f"{rnd.choice(BRANDS)} {rnd.choice(LINES)} {rnd.choice([13, 14, 15, 16, 17])} {rnd.randrange(count // 10 + 1)}".strip()
+            for _ in range(count)]
+
+
+def _brute_force(index, query, limit=5):
+    """Scores every name in the catalog (the reference the posting-list walk must agree with)."""
+    q = normalize_name(query)
+    scores = {pos: 1.0 for pos in index.exact.get(q, [])}
+    weighted = {}
+    for token in set(q.split()):
+        token_id, similarity = index.token_ids.get(token), 1.0
+        if token_id is None:
+            token_id, similarity = index._closest_token(token)
+            if token_id is None:
+                weighted[None] = weighted.get(None, 0.0) + 1.0
+                continue
+        weighted[token_id] = max(weighted.get(token_id, 0.0), similarity)
+    query_weight = sum(float(index.token_idf[t]) for t in weighted if t is not None) + weighted.get(None, 0.0)
+    coverage = np.zeros(len(index.names))
+    for token_id, similarity in weighted.items():
+        if token_id is not None:
+            coverage[index.postings(token_id)] += similarity * float(index.token_idf[token_id]) / query_weight
+    q_count = len(set(q.split()))
+    selection = coverage * (q_count / np.maximum(index.token_counts, q_count))
+    order = sorted((pos for pos in range(len(coverage)) if coverage[pos] > 0), key=lambda pos: (-selection[pos], pos))
+    q_trigrams = catalog_index._trigrams(q)
+    for pos in order[:config.MODEL_NAME_MAX_CANDIDATES]:
+        if pos in scores:
+            continue
+        name_trigrams = catalog_index._trigrams(index.normalized[pos])
+        score = 0.6 * coverage[pos] + 0.4 * 2 * len(q_trigrams & name_trigrams) / (len(q_trigrams) + len(name_trigrams))
+        scores[pos] = min(score + (0.1 if q in index.normalized[pos] else 0.0), 0.99)
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [(pos, round(score, 3)) for pos, score in ranked[:limit]]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return ModelNameIndex(_names(5000))
+
+
+def test_exact_name_ranks_first(index):
+    name = index.names[123]
+    results = index.search(name.upper())
+    assert results[0][1] == 1.0
+    assert 123 in [pos for pos, score in results if score == 1.0]
+
+
+def test_misspelled_token_is_corrected():
+    index = ModelNameIndex(["Apple MacBook Air 13", "Dell Inspiron 15", "HP Pavilion 14"])
+    assert index.search("macbok air")[0][0] == 0
+    assert index.search("pavilon")[0][0] == 2
+
+
+def test_unknown_query_finds_nothing(index):
+    assert index.search("qwzx") == []
+    assert index.search("  ") == []
+
+
+@pytest.mark.parametrize("query", ["macbook air", "asus", "dell inspiron 15", "thinkpad x1 carbon 14",
+                                   "rog strix 17 42", "zenbok 13", "pavilon gaming", "acer aspire slim 16 7"])
+def test_search_matches_brute_force(index, query):
+    for limit in (1, 5, 20):
+        assert index.search(query, limit=limit) == _brute_force(index, query, limit=limit)
+
+
+def test_snapshot_round_trip(index, tmp_path):
+    path = str(tmp_path / "names.npz")
+    index.save(path, "fingerprint")
+    loaded = ModelNameIndex.load(path, "fingerprint")
+    assert ModelNameIndex.load(path, "other names") is None
+    for query in ["macbook air", "zenbok 13", index.names[7]]:
+        assert loaded.search(query) == index.search(query)
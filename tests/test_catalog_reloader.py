@@ -0,0 +1,22 @@
+# tests/test_catalog_reloader.py
+import numpy as np
+import catalog_reloader
+import chatbot_functions
+import laptop_data_manager
+from benchmarks.run_benchmarks import write_preprocessed_catalog
+
+
+def test_reload_keeps_the_old_snapshot_readable(catalog):
+    old = catalog
+    old_scores = np.array(old.semantic_index().scores("light laptop for college")) # Memory-mapped from disk
+    reloader = catalog_reloader.CatalogReloader(interval=60)
+
+    write_preprocessed_catalog(120, seed=1) # Another process rewrites every catalog file with fewer laptops
+    assert reloader.check(settle=False) == "preprocessed"
+
+    new = laptop_data_manager.get_catalog_index()
+    assert new is not old and len(new) == 120
+    # A tool call still holding the old snapshot reads it intact
+    assert np.array_equal(old.semantic_index().scores("light laptop for college"), old_scores)
+    assert len(old.model_names.names) == 300
+    assert chatbot_functions._search_laptops("light laptop for college")["status"] == "success"
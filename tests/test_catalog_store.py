@@ -0,0 +1,64 @@
+# tests/test_catalog_store.py
+import numpy as np
+import pandas as pd
+import pytest
+import config
+import catalog_store
+
+SPECS = {"GPU intensity": "high", "Display quality": "medium", "Portability": "low", "Multitasking": "high", "Processing speed": "medium"}
+
+
+def _catalog():
+    return pd.DataFrame({
+        "Brand": ["Dell", "HP", "Asus", "Lenovo"],
+        "Model Name": ["Inspiron 15", "Pavilion 14", "ROG Strix G15", "IdeaPad 3"],
+        "Price": [55990.0, 64990.0, 104990.0, 38990.0],
+        "Description": ["Thin and light.", "Everyday laptop, \"great\" battery.", "RTX 3060 gaming.", None],
+        "Specification_Ratings": pd.Series([SPECS, dict(SPECS, Portability="error"), {}, {"GPU intensity": "low"}], dtype=object),
+        "Persona": pd.Series([["traveler", "gamer"], ["Student", "astronaut"], [], ["budget_conscious"]], dtype=object),
+    })
+
+
+def _save_and_load(monkeypatch, data_format):
+    monkeypatch.setattr(config, "PREPROCESSED_DATA_FORMAT", data_format)
+    catalog_store.save_preprocessed(_catalog())
+    df, path = catalog_store.load_preprocessed()
+    assert path == (config.PREPROCESSED_LAPTOP_DATA_PARQUET if data_format == "parquet" else config.PREPROCESSED_LAPTOP_DATA_CSV)
+    return df
+
+
+@pytest.mark.parametrize("data_format", ["parquet", "csv"])
+def test_round_trip(monkeypatch, tmp_path, data_format):
+    if data_format == "parquet" and not catalog_store.parquet_available():
+        pytest.skip("pyarrow is not installed")
+    monkeypatch.chdir(tmp_path)
+    df = _save_and_load(monkeypatch, data_format)
+    assert df["Model Name"].tolist() == _catalog()["Model Name"].tolist()
+    assert df["Price"].tolist() == _catalog()["Price"].tolist()
+    # Personas come back in config order, without names outside config.PERSONA_VALUES
+    assert df["Persona"].tolist() == [["gamer", "traveler"], ["student"], [], ["budget_conscious"]]
+    assert df["Specification_Ratings"].tolist() == [
+        SPECS,
+        dict(SPECS, Portability="unknown"),
+        {},
+        {key: "low" if key == "GPU intensity" else "unknown" for key in SPECS},
+    ]
+    assert df[catalog_store.PERSONA_MASK_COLUMN].tolist() == [catalog_store.persona_mask(p) for p in df["Persona"]]
+
+
+def test_parquet_and_csv_loads_agree(monkeypatch, tmp_path):
+    if not catalog_store.parquet_available():
+        pytest.skip("pyarrow is not installed")
+    monkeypatch.chdir(tmp_path)
+    from_parquet = _save_and_load(monkeypatch, "parquet") # Writes the CSV export as well
+    monkeypatch.setattr(config, "PREPROCESSED_DATA_FORMAT", "csv")
+    from_csv, _ = catalog_store.load_preprocessed()
+    for column in ["Persona", "Specification_Ratings", catalog_store.PERSONA_MASK_COLUMN] + list(catalog_store.SPEC_CODE_COLUMNS.values()):
+        assert from_parquet[column].tolist() == from_csv[column].tolist(), column
+
+
+def test_encoded_columns_match_a_fresh_catalog():
+    df = catalog_store.add_encoded_columns(_catalog())
+    assert df["Persona"].tolist()[0] == ["gamer", "traveler"]
+    assert df[catalog_store.SPEC_CODE_COLUMNS["GPU intensity"]].tolist() == [2, 2, catalog_store.SPEC_MISSING, 0]
+    assert np.array_equal(catalog_store.add_encoded_columns(df.copy())[catalog_store.PERSONA_MASK_COLUMN], df[catalog_store.PERSONA_MASK_COLUMN])
@@ -0,0 +1,70 @@
+# tests/test_chat_server.py
+import asyncio
+import json
+import pytest
+from async_chatbot import AsyncChatEngine
+from chat_server import ChatServer
+from openai_stub_server import FakeAsyncClient
+
+
+async def _post_chat(payload, version="HTTP/1.1", length=None):
+    """(status, headers, body) of one POST /chat on a fresh server; the connection must answer, not drop."""
+    server = ChatServer(AsyncChatEngine(FakeAsyncClient()))
+    port = await server.start("127.0.0.1", 0)
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        length = len(body) if length is None else length
+        writer.write(b"POST /chat %s\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%s" % (version.encode(), length, body))
+        response = await asyncio.wait_for(reader.read(), 10)
+        writer.close()
+    finally:
+        await server.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in lines[1:])}
+    return int(lines[0].split()[1]), headers, body
+
+
+def _events(body):
+    return [json.loads(line[len(b"data: "):]) for line in body.split(b"\n") if line.startswith(b"data: ")]
+
+
+@pytest.mark.parametrize("payload", [
+    {"session_id": 42, "message": "hi"},
+    {"session_id": ["a"], "message": "hi"},
+    {"session_id": {"id": "a"}, "message": "hi"},
+    ["session_id", "message"],
+    "hello",
+    b"{not json",
+    {"session_id": "abc"},
+])
+def test_bad_chat_requests_get_400(payload):
+    status, _, body = asyncio.run(_post_chat(payload))
+    assert status == 400
+    assert "error" in json.loads(body)
+
+
+def test_negative_content_length_gets_400():
+    status, _, body = asyncio.run(_post_chat(b"", length=-5))
+    assert status == 400
+    assert "error" in json.loads(body)
+
+
+@pytest.mark.parametrize("session_id", [None, "abc"])
+def test_chat_streams_reply(catalog, session_id):
+    status, headers, body = asyncio.run(_post_chat({"session_id": session_id, "message": "Hi, I need a laptop for college"}))
+    assert status == 200
+    assert headers["transfer-encoding"] == "chunked"
+    events = _events(body)
+    assert events[0]["session_id"] == (session_id or events[0]["session_id"])
+    assert events[-1]["done"] is True
+
+
+def test_http10_chat_streams_without_chunking(catalog):
+    status, headers, body = asyncio.run(_post_chat({"message": "Hi, I need a laptop for college"}, version="HTTP/1.0"))
+    assert status == 200
+    assert "transfer-encoding" not in headers and headers["connection"] == "close"
+    assert body.startswith(b"data: ") # No chunk-size lines
+    events = _events(body)
+    assert "session_id" in events[0] and events[-1]["done"] is True
@@ -0,0 +1,73 @@
+# tests/test_history_manager.py
+import json
+import pytest
+from openai.types.chat import ChatCompletionMessage
+import config
+import history_manager
+
+LAPTOP = {"Brand": "Dell", "Model Name": "Inspiron 15", "Price": 55990, "Persona": ["student"],
+          "Description": "Thin and light laptop with a long battery life. " * 4}
+
+
+def _tool_turn(turn, calls, sdk=False):
+    """A user message, an assistant message with `calls` tool calls, their tool results and the final answer."""
+    tool_calls = [{"id": f"call_{turn}_{i}", "type": "function",
+                   "function": {"name": "recommend_laptops_by_criteria", "arguments": json.dumps({"budget_max": 50000 + i, "offset": turn})}}
+                  for i in range(calls)]
+    assistant = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+    if sdk: # main_chatbot appends the SDK message object as returned by the client
+        assistant = ChatCompletionMessage.model_validate(assistant)
+    results = [{"role": "tool", "tool_call_id": call["id"], "name": "recommend_laptops_by_criteria",
+                "content": json.dumps({"status": "success", "count": 9, "data": [LAPTOP] * 5})} for call in tool_calls]
+    return [{"role": "user", "content": f"Show me laptops, request {turn}"}, assistant, *results,
+            {"role": "assistant", "content": f"Here are the laptops for request {turn}."}]
+
+
+def _history(turns=8):
+    messages = [{"role": "system", "content": "You are a laptop advisor."}, {"role": "assistant", "content": "Hello!"}]
+    for turn in range(turns):
+        messages += _tool_turn(turn, calls=1 + turn % 3, sdk=turn % 2 == 1)
+        if turn % 4 == 3:
+            messages += [{"role": "user", "content": "Thanks"}, {"role": "assistant", "content": "You're welcome."}]
+    return messages
+
+
+def _assert_tool_pairs_intact(messages):
+    issued = set()
+    for i, message in enumerate(messages):
+        role = history_manager._field(message, "role")
+        calls = history_manager._field(message, "tool_calls") or []
+        ids = {call["id"] if isinstance(call, dict) else call.id for call in calls}
+        if ids:
+            answered = {history_manager._field(m, "tool_call_id") for m in messages[i + 1:i + 1 + len(ids)]}
+            assert answered == ids, "tool_calls message without all of its tool results right after it"
+        issued |= ids
+        if role == "tool":
+            assert message["tool_call_id"] in issued, "tool message without its assistant tool_calls message"
+
+
+@pytest.mark.parametrize("budget", [50, 300, 800, 1500, 3000, 100000])
+@pytest.mark.parametrize("max_messages", [6, 15, 1000])
+def test_compaction_keeps_tool_calls_with_their_results(monkeypatch, budget, max_messages):
+    monkeypatch.setattr(config, "MAX_HISTORY_MESSAGES", max_messages)
+    messages = _history()
+    latest = _tool_turn(99, calls=3)
+    messages += latest
+    pruned, report = history_manager.compact_history(list(messages), budget=budget)
+
+    assert pruned[0] == messages[0] # System prompt
+    assert pruned[-len(latest):] == latest # Latest exchange in full, tool results not compacted
+    _assert_tool_pairs_intact(pruned)
+    assert report["messages_dropped"] == len(messages) - len(pruned)
+    if len(pruned) > len(latest) + 1:
+        assert report["tokens_after"] <= budget and len(pruned) <= max_messages
+
+
+def test_orphaned_tool_message_is_dropped():
+    messages = _history(turns=2)
+    orphan = {"role": "tool", "tool_call_id": "call_gone", "name": "get_laptop_info", "content": "{}"}
+    messages.insert(1, orphan)
+    pruned, report = history_manager.compact_history(messages, budget=100000)
+    assert orphan not in pruned
+    _assert_tool_pairs_intact(pruned)
+    assert report["messages_dropped"] == 1
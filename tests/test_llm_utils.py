@@ -0,0 +1,47 @@
+# tests/test_llm_utils.py
+import llm_utils
+
+
+class _RecordingLimiter(llm_utils.RateLimiter):
+    def __init__(self):
+        super().__init__()
+        self.acquired = []
+
+    def acquire(self, tokens=0):
+        self.acquired.append(tokens)
+
+
+class _FlakyClient:
+    """Fails the first `failures` requests with a (transient) ConnectionError, then answers through `client`."""
+
+    def __init__(self, client, failures):
+        self.client = client
+        self.failures = failures
+        self.requests = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, **params):
+        self.requests += 1
+        if self.requests <= self.failures:
+            raise ConnectionError("connection reset")
+        return self.client.chat.completions.create(**params)
+
+
+def test_every_retry_takes_a_rate_limit_token(fake_llm, monkeypatch):
+    client = _FlakyClient(llm_utils.client, failures=2)
+    monkeypatch.setattr(llm_utils, "client", client)
+    monkeypatch.setattr(llm_utils, "transient_errors", lambda: (ConnectionError,))
+    limiter = _RecordingLimiter()
+    params = {"model": "fake", "messages": [{"role": "user", "content": "hello"}], "temperature": 0}
+    llm_utils._create_with_retry(params, max_retries=3, backoff=0, rate_limiter=limiter, tokens=7)
+    assert client.requests == 3
+    assert limiter.acquired == [7, 7, 7]
+
+
+def test_preprocessing_requests_are_rate_limited(fake_llm, monkeypatch):
+    limiter = _RecordingLimiter()
+    monkeypatch.setattr(llm_utils, "preprocessing_rate_limiter", limiter)
+    messages = [{"role": "user", "content": "x" * 40}]
+    llm_utils.get_chat_completions_for_preprocessing(messages, use_cache=False)
+    assert limiter.acquired == [llm_utils._estimate_tokens(messages)]
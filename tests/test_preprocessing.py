@@ -0,0 +1,114 @@
+# tests/test_preprocessing.py
+import pytest
+import config
+import laptop_data_manager
+import llm_utils
+import spec_rules
+from benchmarks.synthetic_catalog import generate_catalog
+
+
+@pytest.mark.parametrize("mode", ["llm", "hybrid"])
+@pytest.mark.parametrize("batch_size", [1, 4])
+def test_concurrent_classification_matches_serial(fake_llm, monkeypatch, mode, batch_size):
+    monkeypatch.setattr(config, "CLASSIFIER_MODE", mode)
+    descriptions = generate_catalog(60, seed=3)['Description'].tolist()
+    descriptions[5] = float('nan') # Rows without a description stay unclassified
+    serial = laptop_data_manager._classify_descriptions(descriptions, max_workers=1, batch_size=batch_size)
+    concurrent = laptop_data_manager._classify_descriptions(descriptions, max_workers=8, batch_size=batch_size)
+    assert concurrent == serial
+    assert serial[5] == ({}, [])
+    assert all(specs for specs, _ in serial[:5])
+
+
+DECIDED = "Intel Core i7-12700H, NVIDIA GeForce RTX 3060, 16 GB DDR4 RAM, 1920x1080 144Hz display, weighs 2.3 kg."
+UNDECIDED = "Intel Core i3 processor, Intel UHD Graphics, 8GB RAM, 1366x768 display, weighs 1.7 kg." # Core i3: generation unknown
+
+
+def test_hybrid_asks_the_llm_only_about_undecided_rows(fake_llm, monkeypatch):
+    monkeypatch.setattr(config, "CLASSIFIER_MODE", "hybrid")
+    asked = []
+    real_batch = laptop_data_manager._product_map_layer_batch
+
+    def recording_batch(descriptions):
+        asked.extend(descriptions)
+        return real_batch(descriptions)
+
+    monkeypatch.setattr(laptop_data_manager, "_product_map_layer_batch", recording_batch)
+    descriptions = [DECIDED, UNDECIDED, float('nan'), DECIDED]
+    results = laptop_data_manager._classify_descriptions(descriptions, max_workers=1, batch_size=4)
+    assert asked == [UNDECIDED]
+
+    specs, personas = results[0]
+    assert specs == {"GPU intensity": "high", "Display quality": "high", "Portability": "medium",
+                     "Multitasking": "medium", "Processing speed": "high"}
+    assert personas == spec_rules.lookup_personas(specs)
+    specs, _ = results[1]
+    assert specs["Multitasking"] == "low" and specs["GPU intensity"] == "low" # Rule-decided fields are kept
+    assert specs["Processing speed"] in spec_rules.SPEC_VALUES # Filled in by the (fake) LLM
+    assert results[2] == ({}, [])
+
+
+def test_hybrid_without_undecided_rows_makes_no_request(fake_llm, monkeypatch):
+    monkeypatch.setattr(config, "CLASSIFIER_MODE", "hybrid")
+    monkeypatch.setattr(laptop_data_manager, "_product_map_layer_batch", lambda descriptions: pytest.fail("LLM called"))
+    results = laptop_data_manager._classify_descriptions([DECIDED, DECIDED], max_workers=1, batch_size=2)
+    assert results[0] == results[1] and "gamer" in results[0][1]
+
+
+@pytest.mark.parametrize("mode", ["llm", "hybrid", "audit"])
+@pytest.mark.parametrize("batch_size", [3, 8])
+def test_batched_classification_matches_single_rows(fake_llm, monkeypatch, mode, batch_size):
+    monkeypatch.setattr(config, "CLASSIFIER_MODE", mode)
+    monkeypatch.setattr(laptop_data_manager, "rule_agreement", spec_rules.AgreementReport())
+    descriptions = generate_catalog(40, seed=5)['Description'].tolist()
+    descriptions[7] = float('nan')
+    single = laptop_data_manager._classify_descriptions(descriptions, max_workers=1, batch_size=1)
+    batched = laptop_data_manager._classify_descriptions(descriptions, max_workers=4, batch_size=batch_size)
+    assert batched == single
+
+
+def _damaging_batches(monkeypatch, damage):
+    """Passes every batched spec reply through `damage`; returns the descriptions classified one by one."""
+    real = llm_utils.get_chat_completions_for_preprocessing
+    single_rows = []
+
+    def completion(messages, json_format=False, **kwargs):
+        response = real(messages, json_format=json_format, **kwargs)
+        user = messages[-1]["content"]
+        if "Laptop Specifications Classifier" in messages[0]["content"]:
+            if "id 0:" in user:
+                return damage(response)
+            single_rows.append(user)
+        return response
+
+    monkeypatch.setattr(llm_utils, "get_chat_completions_for_preprocessing", completion)
+    return single_rows
+
+
+def test_partial_batch_reply_falls_back_per_row(fake_llm, monkeypatch):
+    monkeypatch.setattr(config, "CLASSIFIER_MODE", "llm")
+    descriptions = generate_catalog(5, seed=7)['Description'].tolist()
+    expected = laptop_data_manager._classify_descriptions(descriptions, max_workers=1, batch_size=1)
+
+    def damage(response):
+        response = dict(response)
+        del response["1"] # Omitted
+        response["2"] = dict(response["2"], **{"GPU intensity": "ultra"}) # Invalid value
+        response["3"] = "high" # Not a classification at all
+        return response
+
+    single_rows = _damaging_batches(monkeypatch, damage)
+    results = laptop_data_manager._classify_descriptions(descriptions, max_workers=1, batch_size=5)
+    assert results == expected
+    # Only the damaged entries were asked again, one request each; ids 0 and 4 were kept from the batch
+    assert len(single_rows) == 3
+    assert [any(descriptions[i] in row for row in single_rows) for i in range(5)] == [False, True, True, True, False]
+
+
+def test_failed_batch_reply_falls_back_for_every_row(fake_llm, monkeypatch):
+    monkeypatch.setattr(config, "CLASSIFIER_MODE", "llm")
+    descriptions = generate_catalog(4, seed=8)['Description'].tolist()
+    expected = laptop_data_manager._classify_descriptions(descriptions, max_workers=1, batch_size=1)
+    single_rows = _damaging_batches(monkeypatch, lambda response: {"error": "Failed to parse JSON", "raw_content": "{garbled"})
+    assert laptop_data_manager._classify_descriptions(descriptions, max_workers=1, batch_size=4) == expected
+    assert len(single_rows) == 4
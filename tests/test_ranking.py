@@ -0,0 +1,51 @@
+# tests/test_ranking.py
+import gc
+import weakref
+import numpy as np
+import pytest
+import chatbot_functions
+import ranking
+
+
+@pytest.mark.parametrize("limit", [1, 3, 5, 7])
+def test_pages_cover_every_position_once(limit):
+    rnd = np.random.default_rng(0)
+    positions = rnd.permutation(200).astype(np.int32)
+    scores = rnd.choice(np.float32([0.2, 0.5, 0.5, 0.8]), size=200) # Mostly ties
+    seen, offset = [], 0
+    while True:
+        page, page_scores = ranking.top_k(positions, scores, offset, limit)
+        if not len(page):
+            break
+        seen.extend(page.tolist())
+        offset += len(page)
+    assert sorted(seen) == list(range(200))
+    order = np.lexsort((positions, -scores))
+    assert seen == positions[order].tolist() # Best first, ties in catalog order
+
+
+def test_recommendation_pages_repeat_no_laptop(catalog):
+    seen, offset = [], 0
+    while offset is not None:
+        result = chatbot_functions._recommend_laptops_by_criteria(personas=["Student"], offset=offset)
+        assert result["status"] == "success"
+        seen.extend(laptop["Description"] for laptop in result["data"])
+        offset = result["next_offset"]
+    assert len(seen) == len(set(seen)) == result["count"]
+
+
+def test_ranking_cache_drops_replaced_index():
+    class Index:
+        pass
+
+    cache = ranking.RankingCache(max_entries=4)
+    old, new = Index(), Index()
+    cache.put(old, "key", np.arange(3), np.ones(3))
+    assert cache.get(old, "key")[0].tolist() == [0, 1, 2]
+    assert cache.get(new, "key") is None
+    cache.put(new, "key", np.arange(2), np.ones(2))
+    assert len(cache) == 1 and cache.get(old, "key") is None
+    alive = weakref.ref(old)
+    del old
+    gc.collect()
+    assert alive() is None # Not kept alive by the cache
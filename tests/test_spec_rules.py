@@ -0,0 +1,64 @@
+# tests/test_spec_rules.py
+import itertools
+import pytest
+import spec_rules
+
+
+@pytest.mark.parametrize("key, description, expected", [
+    ("GPU intensity", "NVIDIA GeForce RTX 4060 with 8 GB VRAM", "high"),
+    ("GPU intensity", "AMD Radeon RX 6800M graphics", "high"),
+    ("GPU intensity", "NVIDIA GeForce MX 550 graphics", "medium"),
+    ("GPU intensity", "GTX 1650 for light gaming", "medium"),
+    ("GPU intensity", "Intel UHD Graphics", "low"),
+    ("GPU intensity", "Intel Iris Xe graphics", "low"),
+    ("GPU intensity", "a capable graphics card", None),
+    ("Display quality", "15.6 inch 3840x2160 panel", "high"),
+    ("Display quality", "1920x1080 OLED display", "high"),
+    ("Display quality", "1920 x 1080 display at 144Hz", "high"),
+    ("Display quality", "Full HD IPS display", "medium"),
+    ("Display quality", "1920x1080 display", "medium"),
+    ("Display quality", "1366x768 display", "low"),
+    ("Display quality", "a bright display", None),
+    ("Portability", "weighs just 1.2 kg", "high"),
+    ("Portability", "weighs 1.8kg", "medium"),
+    ("Portability", "2.51 kg chassis", "medium"),
+    ("Portability", "a 2.9 kg gaming laptop", "low"),
+    ("Portability", "lightweight design", None),
+    ("Multitasking", "8GB RAM", "low"),
+    ("Multitasking", "16 GB DDR5 RAM", "medium"),
+    ("Multitasking", "32 GB of memory", "high"),
+    ("Multitasking", "18GB unified memory", "medium"),
+    ("Multitasking", "plenty of memory", None),
+    ("Processing speed", "Intel Core i7-12700H processor", "high"),
+    ("Processing speed", "AMD Ryzen 9 7940HS", "high"),
+    ("Processing speed", "Apple M2 Pro chip", "high"),
+    ("Processing speed", "Intel Core i5 processor", "medium"),
+    ("Processing speed", "Apple M1 chip", "medium"),
+    ("Processing speed", "Intel Celeron N4020", "low"),
+    ("Processing speed", "Intel Core i3 processor", None), # Depends on the generation: left to the LLM
+])
+def test_classify_specs(key, description, expected):
+    assert spec_rules.classify_specs(description)[key] == expected
+
+
+def test_classify_specs_without_description():
+    assert spec_rules.classify_specs(float("nan")) == {key: None for key in spec_rules.LAP_SPEC_KEYS}
+
+
+def test_persona_lookup_covers_every_combination():
+    combos = list(itertools.product(spec_rules.SPEC_VALUES, repeat=len(spec_rules.LAP_SPEC_KEYS)))
+    assert len(combos) == len(spec_rules.PERSONA_LOOKUP) == 243
+    for combo in combos:
+        assert spec_rules.PERSONA_LOOKUP[combo] == spec_rules._personas_for(*combo)
+        specs = dict(zip(spec_rules.LAP_SPEC_KEYS, combo))
+        assert spec_rules.lookup_personas(specs) == spec_rules._personas_for(*combo)
+
+
+def test_lookup_personas_needs_fully_rated_specs():
+    specs = dict.fromkeys(spec_rules.LAP_SPEC_KEYS, "medium")
+    assert spec_rules.lookup_personas(dict(specs, Portability="unknown")) is None
+    assert spec_rules.lookup_personas({}) is None
+    assert spec_rules.lookup_personas(None) is None
+    personas = spec_rules.lookup_personas(specs)
+    personas.append("mutated")
+    assert "mutated" not in spec_rules.lookup_personas(specs) # Callers get a copy of the table entry
@@ -0,0 +1,61 @@
+# tests/test_tool_dispatch.py
+import asyncio
+import threading
+import time
+import pytest
+import config
+import metrics
+import tool_dispatch
+
+
+def _call(name, arguments="{}", call_id="call_1"):
+    return {"id": call_id, "function": {"name": name, "arguments": arguments}}
+
+
+@pytest.fixture
+def slow_tools(monkeypatch):
+    monkeypatch.setattr(config, "TOOL_TIMEOUTS", {"slow": 0.1})
+    release = threading.Event()
+    yield {"slow": lambda: release.wait(5) and {"status": "late"}, "fast": lambda: {"status": "success"}}
+    release.set() # Let the abandoned worker finish
+
+
+@pytest.mark.parametrize("names", [["slow"], ["slow", "fast"]])
+def test_timeout_applies_to_every_call(slow_tools, names):
+    calls = [_call(name, call_id=f"call_{i}") for i, name in enumerate(names)]
+    start = time.monotonic()
+    results = tool_dispatch.dispatch_tool_calls(calls, slow_tools)
+    assert time.monotonic() - start < 2
+    assert [r["tool_call_id"] for r in results] == [c["id"] for c in calls]
+    assert "did not finish" in results[0]["data"]["error"]
+    if len(names) > 1:
+        assert results[1]["data"] == {"status": "success"}
+
+
+def test_tool_errors_are_returned_as_results():
+    results = tool_dispatch.dispatch_tool_calls([_call("missing"), _call("fast", "{not json", "call_2")], {"fast": lambda: {}})
+    assert "Unknown function" in results[0]["data"]["error"]
+    assert "Invalid arguments" in results[1]["data"]["error"]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_timed_out_call_is_counted_once(monkeypatch, use_async):
+    monkeypatch.setattr(config, "TOOL_TIMEOUTS", {"slow": 0.1})
+    release, finished = threading.Event(), threading.Event()
+
+    def slow():
+        release.wait(5)
+        finished.set()
+        return {"status": "late"}
+
+    metrics.reset()
+    calls, tools = [_call("slow"), _call("fast", call_id="call_2")], {"slow": slow, "fast": lambda: {"status": "success"}}
+    if use_async:
+        asyncio.run(tool_dispatch.dispatch_tool_calls_async(calls, tools))
+    else:
+        tool_dispatch.dispatch_tool_calls(calls, tools)
+    release.set()
+    finished.wait(5)
+    time.sleep(0.1) # Let the abandoned worker return
+    counts = metrics.snapshot()["counters"]["tool_calls_total"]
+    assert counts == {(("status", "timeout"), ("tool", "slow")): 1, (("status", "ok"), ("tool", "fast")): 1}
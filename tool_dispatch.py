@@ -0,0 +1,130 @@
+# tool_dispatch.py
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import config
+import chatbot_functions
+import metrics
+import result_encoder
+
+logger = logging.getLogger(__name__)
+
+# Shared pool for tool execution; tools are read-only lookups over the shared catalog
+_executor = ThreadPoolExecutor(max_workers=config.TOOL_DISPATCH_WORKERS, thread_name_prefix="tool")
+
+
+def tool_call_fields(tool_call):
+    """(id, name, arguments) for an SDK tool-call object or the equivalent dict."""
+    if isinstance(tool_call, dict):
+        function = tool_call.get("function", {})
+        return tool_call.get("id"), function.get("name"), function.get("arguments")
+    return tool_call.id, tool_call.function.name, tool_call.function.arguments
+
+def tool_timeout(function_name):
+    return config.TOOL_TIMEOUTS.get(function_name, config.TOOL_TIMEOUT_SECONDS)
+
+def run_tool(function_name, arguments, implementations=None):
+    """Runs one model-requested tool call and returns its result dict (errors are returned as dicts too)."""
+    data = _traced_tool(function_name, arguments, implementations)
+    _count_call(function_name, data)
+    return data
+
+def _traced_tool(function_name, arguments, implementations):
+    with metrics.span("tool", tool=function_name):
+        return _run_tool(function_name, arguments, implementations)
+
+def _count_call(function_name, data):
+    failed = isinstance(data, dict) and "error" in data
+    metrics.inc("tool_calls_total", tool=function_name, status="error" if failed else "ok")
+
+def _run_tool(function_name, arguments, implementations):
+    implementations = implementations or chatbot_functions.get_tool_implementations_map()
+    function_to_call = implementations.get(function_name)
+    if not function_to_call:
+        logger.warning("The model asked for an unknown action: %s", function_name)
+        return {"error": f"Unknown function '{function_name}' requested by model."}
+    try:
+        function_args = json.loads(arguments) if arguments else {}
+        logger.info("Calling function: %s with args: %s", function_name, function_args)
+        return function_to_call(**function_args)
+    except json.JSONDecodeError:
+        error_msg = f"Invalid arguments format provided by model for {function_name}."
+        logger.warning(error_msg)
+        return {"error": error_msg, "arguments_received": arguments}
+    except TypeError as e:
+        error_msg = f"Argument mismatch for {function_name}: {e}"
+        logger.warning(error_msg)
+        return {"error": error_msg, "arguments_received": arguments}
+    except Exception as e:
+        error_msg = f"An unexpected error occurred while executing {function_name}: {e}"
+        logger.exception(error_msg)
+        return {"error": error_msg}
+
+def _timeout_result(function_name):
+    metrics.inc("tool_calls_total", tool=function_name, status="timeout")
+    logger.warning("%s timed out after %ss", function_name, tool_timeout(function_name))
+    return {"error": f"{function_name} did not finish within {tool_timeout(function_name)} seconds."}
+
+def _result(tool_call_id, function_name, data):
+    """Tool result: `data` for control logic, `message` (encoded once) for the conversation history."""
+    return {
+        "tool_call_id": tool_call_id,
+        "name": function_name,
+        "data": data,
+        "message": {"role": "tool", "tool_call_id": tool_call_id, "name": function_name, "content": result_encoder.encode_tool_result(function_name, data)},
+    }
+
+
+def dispatch_tool_calls(tool_calls, implementations=None):
+    """Runs all tool calls of one assistant turn concurrently; results come back in the order of `tool_calls`.
+
+    Each call gets its own timeout (config.TOOL_TIMEOUTS / TOOL_TIMEOUT_SECONDS); a call that does not
+    finish in time yields an error result instead of holding up the turn (its worker thread cannot be
+    interrupted and finishes in the background).
+    """
+    calls = [tool_call_fields(tool_call) for tool_call in tool_calls]
+    # A single call goes through the pool as well: running it inline would leave it without a timeout
+    start = time.monotonic()
+    # Each call runs in a copy of the caller's context, so its spans land in the current turn trace.
+    # Calls are counted here, once: a call that timed out is not counted again when its thread finishes.
+    futures = [_executor.submit(contextvars.copy_context().run, _traced_tool, name, arguments, implementations) for _, name, arguments in calls]
+    results = []
+    for (tool_call_id, function_name, _), future in zip(calls, futures):
+        remaining = start + tool_timeout(function_name) - time.monotonic()
+        try:
+            data = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            future.cancel()
+            data = _timeout_result(function_name)
+        else:
+            _count_call(function_name, data)
+        results.append(_result(tool_call_id, function_name, data))
+    return results
+
+async def dispatch_tool_calls_async(tool_calls, implementations=None):
+    """Asyncio version of dispatch_tool_calls for the async engine; runs on the same thread pool."""
+    loop = asyncio.get_running_loop()
+    calls = [tool_call_fields(tool_call) for tool_call in tool_calls]
+
+    async def run_one(tool_call_id, function_name, arguments):
+        future = loop.run_in_executor(_executor, contextvars.copy_context().run, _traced_tool, function_name, arguments, implementations)
+        try:
+            data = await asyncio.wait_for(future, tool_timeout(function_name))
+        except asyncio.TimeoutError:
+            data = _timeout_result(function_name)
+        else:
+            _count_call(function_name, data)
+        return _result(tool_call_id, function_name, data)
+
+    return list(await asyncio.gather(*(run_one(*call) for call in calls)))
+
+def find_goodbye(results):
+    """Returns the goodbye message if one of the results ended the conversation, else None."""
+    for result in results:
+        data = result["data"]
+        if result["name"] == "end_conversation" and isinstance(data, dict) and data.get("status") == "ended":
+            return data.get("message", "Goodbye!")
+    return None